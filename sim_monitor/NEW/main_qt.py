@@ -13,14 +13,15 @@ from PyQt5.QtWidgets import (
     QMenu, QMessageBox, QFileDialog
 )
 from PyQt5.QtGui import QFont, QIcon, QPixmap
-from PyQt5.QtCore import Qt, QTimer, QTime, QDate
+from PyQt5.QtCore import Qt, QTimer, QTime, QDate, QMetaObject
 
 from edit_layout_dialog import EditLayoutDialog
-from simulator_card import SimulatorCard
+from simulator_card import SimulatorCard, clear_pixmap_cache
 
 from utils.config_io import load_cfg, save_cfg
 from utils.layout_io import write_layout, read_layout, CFG_DIR, list_layout_files
-from utils.db import get_conn, init_db
+from utils.db import init_db
+from utils.db_poller import start_db_poller, stop_db_poller
 from utils.debug_panel import DebugControlPanel
 from utils.serial_handler_qt import set_debug_mode, serial_debug
 
@@ -91,6 +92,8 @@ class MainWindow(QMainWindow):
         self.sim_map = {}
         self.layout_map = {}
         self.layout_path = None
+        self.last_snapshot = None       # newest FleetSnapshot from the poller
+        self._screen_hooked = False
 
         # App config (includes debug_mode and active_layout)
         self.cfg = load_cfg()
@@ -204,9 +207,11 @@ class MainWindow(QMainWindow):
         clock_timer.timeout.connect(self.update_datetime)
         clock_timer.start(1000)
 
-        self.refresh_timer = QTimer(self)
-        self.refresh_timer.timeout.connect(self.refresh_from_db)
-        self.refresh_timer.start(1000)
+        # DB reads happen on the poller's thread; snapshots arrive queued,
+        # only when the DB changed (PRAGMA data_version)
+        self.db_thread, self.db_poller = start_db_poller(
+            self, self.apply_snapshot, on_error=self.on_poll_failed
+        )
 
         # Apply debug mode
         self.apply_debug_mode(self.debug_mode, persist=False)
@@ -273,6 +278,11 @@ class MainWindow(QMainWindow):
             self.simulator_cards[sim_id] = card
             self.grid_layout.addWidget(card, row, col)
 
+        # New cards start blank and the next snapshot only comes on a DB
+        # change: fill them from the last one now
+        if self.last_snapshot is not None:
+            self.apply_snapshot(self.last_snapshot)
+
     # ---------------------------------------------------------
     #   TIME / CLOCK
     # ---------------------------------------------------------
@@ -282,37 +292,41 @@ class MainWindow(QMainWindow):
         self.date_label.setText(today.toString("ddd dd MMM yyyy"))
         self.clock_label.setText(now.toString("HH:mm:ss AP"))
 
+        # Snapshots only arrive on DB changes; time-based text (elapsed
+        # motion) is re-rendered here -- a no-op for cards that did not change
+        for card in self.simulator_cards.values():
+            card.update_display()
+
     # ---------------------------------------------------------
     #   DB REFRESH
     # ---------------------------------------------------------
     def refresh_from_db(self):
-        """Fetch latest state from SQLite and update cards + receiver label."""
+        """Ask the poller for a snapshot now (e.g. after a local DB write)."""
+        QMetaObject.invokeMethod(self.db_poller, "poll", Qt.QueuedConnection)
+
+    def on_poll_failed(self, message: str):
+        print(f"[DB] refresh_from_db error: {message}")
+
+    def apply_snapshot(self, snapshot):
+        """Apply a FleetSnapshot from the poller thread to cards + receiver label (no DB access)."""
         try:
-            conn = get_conn()
-            cur = conn.cursor()
+            previous, self.last_snapshot = self.last_snapshot, snapshot
+            receiver_online, sims = snapshot.receiver_online, snapshot.sims
 
-            # Receiver status
-            cur.execute("SELECT receiver_online FROM system_status WHERE id=1")
-            row = cur.fetchone()
-            receiver_online = bool(row[0]) if row else False
+            if previous is None or previous.receiver_online != receiver_online:
+                if receiver_online:
+                    self.receiver_label.setText("Receiver: ONLINE")
+                    self.receiver_label.setStyleSheet("color: #00FF7F;")
+                else:
+                    self.receiver_label.setText("Receiver: OFFLINE")
+                    self.receiver_label.setStyleSheet("color: #FF6347;")
 
-            if receiver_online:
-                self.receiver_label.setText("Receiver: ONLINE")
-                self.receiver_label.setStyleSheet("color: #00FF7F;")
-            else:
-                self.receiver_label.setText("Receiver: OFFLINE")
-                self.receiver_label.setStyleSheet("color: #FF6347;")
+            if self.debug_mode:
+                self.mode_label.setText(f"MODE: DEBUG  DB {snapshot.latency_ms:.0f} ms")
 
             # Per-sim updates
             for sim_id, card in self.simulator_cards.items():
-
-                # 1. Sim state
-                cur.execute("""
-                    SELECT motion_state, ramp_state, online, last_update_ts
-                    FROM simulators
-                    WHERE sim_id=?
-                """, (sim_id,))
-                s = cur.fetchone()
+                s = sims.get(sim_id)
                 if not s:
                     # never seen in DB → treat as offline
                     card.update_from_db(
@@ -326,41 +340,21 @@ class MainWindow(QMainWindow):
                     )
                     continue
 
-                motion_state, ramp_state, online_flag, _ = s
+                motion_state, ramp_state, online_flag, _, motion_start_ts, last_end_ts, last_duration = s
                 effective_online = bool(online_flag) and receiver_online
 
-                # 2. Active motion record (optional)
-                cur.execute("SELECT start_ts FROM active_motion WHERE sim_id=?", (sim_id,))
-                am = cur.fetchone()
-                in_motion = am is not None
-                motion_start_ts = am[0] if am else None
-
-                # 3. Most recent historical motion session (optional)
-                cur.execute("""
-                    SELECT end_ts, duration_sec
-                    FROM motion_sessions
-                    WHERE sim_id=?
-                    ORDER BY end_ts DESC
-                    LIMIT 1
-                """, (sim_id,))
-                hist = cur.fetchone()
-                last_end_ts = hist[0] if hist else None
-                last_duration = hist[1] if hist else None
-
-                # 4. Update the card
                 card.update_from_db(
                     motion=motion_state,
                     ramp=ramp_state,
                     online=effective_online,
-                    in_motion=in_motion,
+                    in_motion=motion_start_ts is not None,
                     motion_start_ts=motion_start_ts,
                     last_end_ts=last_end_ts,
                     last_duration=last_duration,
                 )
 
-            conn.close()
         except Exception as exc:
-            print(f"[DB] refresh_from_db error: {exc}")
+            print(f"[DB] apply_snapshot error: {exc}")
 
 
     # ---------------------------------------------------------
@@ -451,7 +445,21 @@ class MainWindow(QMainWindow):
         elif key == Qt.Key_S:
             self.open_settings()
 
+    def showEvent(self, event):
+        super().showEvent(event)
+        # windowHandle() exists once shown; moving to another screen can change the DPI
+        handle = self.windowHandle()
+        if handle is not None and not self._screen_hooked:
+            handle.screenChanged.connect(self.on_screen_changed)
+            self._screen_hooked = True
+
+    def on_screen_changed(self, screen):
+        clear_pixmap_cache()
+        for card in self.simulator_cards.values():
+            card.refresh_pixmap()
+
     def closeEvent(self, event):
+        stop_db_poller(self.db_thread, self.db_poller)
         QApplication.quit()
         event.accept()
 
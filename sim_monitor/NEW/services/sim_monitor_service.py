@@ -3,31 +3,98 @@
 Sim Monitor Service (Pi5)
 -------------------------
 Reads ESP32 Receiver serial output and writes to SQLite.
+One process can own several receivers (RECEIVER_PORTS); each port gets its own
+reader thread and all of them feed a single DB writer.
 
 Expected receiver frames (CSV):
   R,1
   O,<sid>,<0|1>     (accepts O or 0)
   S,<sid>,<motion>,<ramp>,<seq>
 
-Receiver ONLINE logic:
+Receiver ONLINE logic (per port, stored in the receivers table):
   - If PORT_OPEN_COUNTS_AS_ONLINE: online immediately on port open
   - OR any serial bytes received (even noise) keeps it online
+  - system_status id=1 mirrors "any receiver online" for the GUI
 
-Receiver OFFLINE logic:
+Receiver OFFLINE logic (per port):
   - No serial bytes received for RECEIVER_TIMEOUT seconds
   - OR serial exception / disconnect
 
+Rollups (utils.rollups):
+  - a closed motion session is added to usage_hourly / usage_daily in the
+    same commit, split across bucket boundaries
+
+Retention (utils.retention):
+  - every RETENTION_INTERVAL_SEC, while the writer queue is idle, a
+    background thread moves motion_sessions older than RETENTION_DAYS into
+    monthly archive files and runs incremental_vacuum
+
+Event log (utils.events):
+  - every motion / ramp / online transition and receiver outage is appended
+    to the events table (WITHOUT ROWID, clustered on sim_id, ts_ms), one
+    batched insert per tick
+
+Sequence tracking (utils.seq_tracker):
+  - S-frame seq is tracked per sender with 16-bit wraparound
+  - Duplicates (e.g. heard by two receivers) and stale reorders are dropped
+    before they touch the DB
+  - Loss / duplicate / reorder / gap counters go to link_stats every
+    LINK_STATS_INTERVAL_SEC
+
+Serial reading:
+  - READER_MODE "bulk" drains the OS buffer in one read per poll and frames
+    lines incrementally (utils.serial_reader); timers run off time.monotonic()
+    every POLL_SEC instead of waiting on a readline() timeout
+
 Auto-reconnect:
   - On serial errors, close and reopen after RECONNECT_DELAY_SEC
+  - A reader whose device node is gone (USB reset / unplug) exits; every
+    PORT_RESCAN_SEC the main loop re-resolves ports and starts readers for
+    ones that appeared (e.g. the receiver coming back as /dev/ttyUSB1)
+
+Capture / replay:
+  - `sim_monitor_service.py run --capture DIR` appends every raw line to
+    rotating binary capture files (utils.capture)
+  - `sim_monitor_service.py replay FILES --speed 1|N|max --db X`
+    feeds them back through the real decoder + DB path into X, which is
+    required and may not be the live sim_monitor.db (replayed sessions
+    and events would mix with real ones)
+  - `sim_monitor_service.py replay FILES --pty` writes them into a pty
+
+Schema:
+  - init_db() at startup applies pending migrations (utils.migrations,
+    PRAGMA user_version); readers are started first so no serial data is
+    lost while a long migration runs
+
+DB writes (two stages):
+  - Reader stage (reader threads + this loop): decode, seq, cache; never
+    waits on SQLite
+  - Writer stage: utils.db_writer.DBWriter thread on one long-lived
+    connection, group-committed every DB_FLUSH_INTERVAL_SEC or DB_BATCH_SIZE
+    mutations, flushed on shutdown
+  - The queue between them is bounded (DB_MAX_ORDERED ordered ops); while the
+    writer lags, latest-state rows coalesce per sim_id / port and motion
+    start/stop edges stay queued in order
+  - Filtered through an in-memory StateCache (utils.state_cache): only real
+    transitions and throttled last-seen refreshes reach SQLite
 """
 
-import time, re, sys, pathlib
+import time, sys, pathlib, queue, threading
 
 ROOT = pathlib.Path(__file__).resolve().parent.parent
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from utils.db import get_conn, init_db
+from utils import db
+from utils.db import init_db, close_thread_conns
+from utils.db_writer import DBWriter
+from utils.state_cache import StateCache
+from utils.protocol import decode_frame, OnlineFrame, StateFrame
+from utils.serial_reader import BulkLineReader, ReadlineReader
+from utils.seq_tracker import SeqTracker, ACCEPT
+from utils.capture import CaptureWriter, iter_capture, list_captures
+from utils import retention, rollups
+from utils.events import EventLog, insert_events, EV_MOTION, EV_RAMP, EV_ONLINE, EV_RECEIVER, RECEIVER_SIM_ID
 
 try:
     import serial, serial.tools.list_ports
@@ -35,254 +102,623 @@ except ImportError:
     serial = None
 
 
-# -----------------------------
-# Receiver CSV protocol
-# -----------------------------
-RECV_RE   = re.compile(r"^R,1$")
-ONLINE_RE = re.compile(r"^[O0],(\d+),(0|1)$")                  # O or 0
-STATE_RE  = re.compile(r"^S,(\d+),(\d+),(\d+),(\d+)$")         # sid,motion,ramp,seq
-
-
 # -----------------------------
 # Config
 # -----------------------------
 BAUD = 115200
-PREFERRED_PORT = "/dev/ttyUSB0"     # "" to force autoscan
-SERIAL_TIMEOUT = 1.0
+RECEIVER_PORTS = ["/dev/ttyUSB0"]   # one reader thread per port; [] to force autoscan
+AUTOSCAN_ALL = False               # autoscan: open every port that opens (else just the first)
+SERIAL_TIMEOUT = 1.0               # readline mode only
+
+# Reader mode (utils.serial_reader)
+#   "bulk":     select + os.readv whatever is buffered, incremental line framing
+#   "readline": legacy one-line-per-call with SERIAL_TIMEOUT
+READER_MODE = "bulk"
+POLL_SEC = 0.1                     # max wait per poll; timers run at least this often
 
 RECEIVER_TIMEOUT = 20.0            # seconds of *no serial bytes* => receiver offline
-SENDER_TIMEOUT   = 180.0           # seconds since last_update_ts => sender offline
+SENDER_TIMEOUT   = 180.0           # seconds since last frame => sender offline (deadline heap)
 
 PORT_OPEN_COUNTS_AS_ONLINE = True
 RECONNECT_DELAY_SEC = 2.0
+PORT_RESCAN_SEC = 5.0              # look for new / re-enumerated receiver ports this often
 
 # Optional helper for some USB serial adapters
 FORCE_PORT_DTR_RTS = False
 
+# Write-behind DB writer (group commit)
+DB_FLUSH_INTERVAL_SEC = 0.5        # commit queued mutations at least this often
+DB_BATCH_SIZE = 200                # ...or as soon as this many are queued
+DB_MAX_ORDERED = 10000             # ordered ops (edges, sessions) queued before the reader stage blocks
+STATS_INTERVAL_SEC = 60.0          # print writer commit latency this often
+LINK_STATS_INTERVAL_SEC = 300.0    # persist per-sender seq counters this often
+
+# Capture files are flushed to disk this often
+CAPTURE_FLUSH_SEC = 1.0
+
+# Retention (utils.retention): archive old motion_sessions on a background thread
+RETENTION_DAYS = 365               # motion_sessions kept in the hot DB
+RETENTION_INTERVAL_SEC = 6 * 3600  # how often to look for rows past the horizon
+
+# Replay: timers are ticked at least this often (captured clock) across idle gaps
+REPLAY_TICK_SEC = 1.0
+
 
 # -----------------------------
-# DB helpers
+# DB helpers (queued on the write-behind DBWriter)
+#   latest-state rows (simulators / receivers / system_status) are merged per
+#   key and coalesce while the writer lags; motion edges, sessions and
+#   link_stats are ordered and never merged
 # -----------------------------
-def update_receiver_status(online: bool, *, ts: float | None = None):
+def _upsert_rows(cur, table: str, key_col: str, items: list):
+    """DBWriter apply fn: one executemany per distinct set of merged columns."""
+    groups = {}
+    for key, fields in items:
+        cols = tuple(sorted(fields))
+        groups.setdefault(cols, []).append((key, *(fields[c] for c in cols)))
+    for cols, rows in groups.items():
+        marks = ", ".join("?" * (len(cols) + 1))
+        sets = ", ".join(f"{c}=excluded.{c}" for c in cols)
+        cur.executemany(f"""
+            INSERT INTO {table} ({key_col}, {", ".join(cols)})
+            VALUES ({marks})
+            ON CONFLICT({key_col}) DO UPDATE SET {sets}
+        """, rows)
+
+
+def _apply_simulators(cur, items: list):
+    _upsert_rows(cur, "simulators", "sim_id", items)
+
+
+def _apply_receivers(cur, items: list):
+    _upsert_rows(cur, "receivers", "port", items)
+
+
+def _apply_system_status(cur, items: list):
+    for _, fields in items:
+        cur.execute(
+            "UPDATE system_status SET receiver_online=?, last_seen=? WHERE id=1",
+            (fields["receiver_online"], fields["last_seen"])
+        )
+
+
+def update_receiver_status(writer: DBWriter, online: bool, *, ts: float | None = None):
+    now = int(ts if ts is not None else time.time())
+    writer.merge(_apply_system_status, 1, receiver_online=1 if online else 0, last_seen=now)
+
+
+def update_port_status(writer: DBWriter, port: str, online: bool, *, ts: float | None = None):
     now = int(ts if ts is not None else time.time())
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        "UPDATE system_status SET receiver_online=?, last_seen=? WHERE id=1",
-        (1 if online else 0, now)
-    )
-    conn.commit()
-    conn.close()
+    writer.merge(_apply_receivers, port, online=1 if online else 0, last_seen=now)
 
 
-def update_sender(sim_id: int, motion: int, ramp: int, *, ts: float | None = None):
+def update_sender(writer: DBWriter, sim_id: int, motion: int, ramp: int, *, ts: float | None = None):
     now = int(ts if ts is not None else time.time())
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO simulators (sim_id, motion_state, ramp_state, last_update_ts, online)
-        VALUES (?, ?, ?, ?, 1)
-        ON CONFLICT(sim_id) DO UPDATE SET
-            motion_state=excluded.motion_state,
-            ramp_state=excluded.ramp_state,
-            last_update_ts=excluded.last_update_ts,
-            online=1
-    """, (sim_id, motion, ramp, now))
-    conn.commit()
-    conn.close()
-
-
-def set_sender_online_flag(sim_id: int, online: bool, *, ts: float | None = None):
+    writer.merge(_apply_simulators, sim_id, motion_state=motion, ramp_state=ramp, last_update_ts=now, online=1)
+
+
+def set_sender_online_flag(writer: DBWriter, sim_id: int, online: bool, *, ts: float | None = None):
     now = int(ts if ts is not None else time.time())
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO simulators (sim_id, last_update_ts, online)
-        VALUES (?, ?, ?)
-        ON CONFLICT(sim_id) DO UPDATE SET
-            last_update_ts=excluded.last_update_ts,
-            online=excluded.online
-    """, (sim_id, now, 1 if online else 0))
-    conn.commit()
-    conn.close()
-
-
-def handle_motion(sim_id: int, motion_state: int, *, ts: float | None = None):
+    writer.merge(_apply_simulators, sim_id, last_update_ts=now, online=1 if online else 0)
+
+
+def handle_motion(writer: DBWriter, sim_id: int, edge, *, ts: float | None = None):
     """
     Motion sessions start when motion_state == 2 (In Operation / red).
+    edge comes from StateCache.motion_edge(): ("start", ts) or ("stop", start_ts).
+    Edges are ordered writes: a lagging writer never coalesces them away.
     """
-    conn = get_conn()
-    cur = conn.cursor()
-
-    cur.execute("SELECT start_ts FROM active_motion WHERE sim_id=?", (sim_id,))
-    row = cur.fetchone()
-    in_motion = row is not None
-
     now = int(ts if ts is not None else time.time())
+    kind, start = edge
 
-    if motion_state == 2 and not in_motion:
-        cur.execute(
+    if kind == "start":
+        writer.execute(
             "INSERT OR REPLACE INTO active_motion (sim_id, start_ts) VALUES (?, ?)",
             (sim_id, now)
         )
+        return
 
-    if motion_state != 2 and in_motion:
-        start = row[0]
-        duration = now - start
-        cur.execute("""
-            INSERT INTO motion_sessions (sim_id, start_ts, end_ts, duration_sec)
-            VALUES (?, ?, ?, ?)
-        """, (sim_id, start, now, duration))
-        cur.execute("DELETE FROM active_motion WHERE sim_id=?", (sim_id,))
+    writer.call(rollups.record_session, sim_id, start, now)
+    writer.execute("DELETE FROM active_motion WHERE sim_id=?", (sim_id,))
 
-    conn.commit()
-    conn.close()
 
+def write_link_stats(writer: DBWriter, seq: SeqTracker, window_start: float, window_end: float):
+    for sim_id, received, lost, dups, reordered, gaps, restarts in seq.take_window():
+        writer.execute("""
+            INSERT OR REPLACE INTO link_stats
+                (sim_id, window_start, window_end, received, lost, duplicates, reordered, gaps, restarts)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (sim_id, int(window_start), int(window_end), received, lost, dups, reordered, gaps, restarts))
 
-def check_sender_timeouts():
-    now = int(time.time())
-    conn = get_conn()
-    cur = conn.cursor()
 
-    cur.execute("SELECT sim_id, last_update_ts FROM simulators")
-    for sim_id, last_ts in cur.fetchall():
-        if last_ts is None:
-            continue
-        if now - last_ts > int(SENDER_TIMEOUT):
-            cur.execute("UPDATE simulators SET online=0 WHERE sim_id=?", (sim_id,))
+def check_sender_timeouts(writer: DBWriter, cache: StateCache, *, now: float | None = None) -> list:
+    """Senders whose deadline passed; committed together in one executemany."""
+    expired = cache.expire_senders(int(now if now is not None else time.time()))
+    for sim_id in expired:
+        writer.merge(_apply_simulators, sim_id, online=0)
+    return expired
+
 
-    conn.commit()
-    conn.close()
+def flush_events(writer: DBWriter, events: EventLog):
+    """Everything logged since the last call, as one ordered executemany op."""
+    if len(events):
+        writer.call(insert_events, events.take())
 
 
 # -----------------------------
 # Serial open helpers
 # -----------------------------
-def open_serial_port():
+def open_serial_port(dev: str):
     if serial is None:
         raise RuntimeError("pyserial not installed")
 
-    def _open(dev: str):
-        s = serial.Serial(dev, BAUD, timeout=SERIAL_TIMEOUT)
-        if FORCE_PORT_DTR_RTS:
-            try:
-                s.dtr = True
-                s.rts = True
-            except Exception:
-                pass
-        return s
-
-    if PREFERRED_PORT:
+    s = serial.Serial(dev, BAUD, timeout=SERIAL_TIMEOUT)
+    if FORCE_PORT_DTR_RTS:
         try:
-            return _open(PREFERRED_PORT)
+            s.dtr = True
+            s.rts = True
         except Exception:
             pass
+    return s
+
 
+def resolve_receiver_ports(active=()) -> list:
+    """
+    Ports to start readers for: RECEIVER_PORTS that exist, else autoscan
+    (first port, or all with AUTOSCAN_ALL). Ports in `active` already have a
+    reader; they are skipped and never probed (opening them again can reset
+    the ESP32 via DTR).
+    """
+    if serial is None:
+        raise RuntimeError("pyserial not installed")
+
+    active = set(active)
+    ports = [p for p in RECEIVER_PORTS if pathlib.Path(p).exists()]
+    if ports:
+        return [p for p in ports if p not in active]
+    if active and not AUTOSCAN_ALL:
+        return []
+
+    found = []
     for p in serial.tools.list_ports.comports():
+        if p.device in active:
+            continue
         try:
-            return _open(p.device)
+            open_serial_port(p.device).close()
         except Exception:
             continue
-
-    raise RuntimeError("No serial ports available")
+        found.append(p.device)
+        if not AUTOSCAN_ALL:
+            break
+    return found
 
 
 # -----------------------------
-# Main loop with auto-reconnect
+# Per-port reader thread
 # -----------------------------
-def run_service():
-    init_db()
-    update_receiver_status(False)
-
-    while True:
-        ser = None
-        receiver_online = False
-        last_serial_activity_ts = 0.0
-        last_timeout_check = 0.0
+class PortReader(threading.Thread):
+    """
+    Owns one serial port: open, read, reconnect. Posts events to the shared
+    inbox consumed by run_service():
+      ("open",  port, ts, mono_ns, None)
+      ("data",  port, ts, mono_ns, [raw lines])   # [] => bytes but no complete line yet
+      ("error", port, ts, mono_ns, message)
+    """
 
-        try:
-            ser = open_serial_port()
-            now = time.time()
-            print(f"[SimMonitorService] Opened serial port {ser.port}")
+    def __init__(self, port: str, inbox: queue.Queue, stop: threading.Event):
+        super().__init__(name=f"reader-{port}", daemon=True)
+        self.port = port
+        self.inbox = inbox
+        self.stop = stop
 
+    def run(self):
+        while not self.stop.is_set():
+            ser = None
             try:
-                ser.reset_input_buffer()
-            except Exception:
-                pass
+                ser = open_serial_port(self.port)
+                print(f"[SimMonitorService] Opened serial port {self.port} ({READER_MODE} reader)")
+
+                try:
+                    ser.reset_input_buffer()
+                except Exception:
+                    pass
+
+                reader = BulkLineReader(ser) if READER_MODE == "bulk" else ReadlineReader(ser)
+                self.inbox.put(("open", self.port, time.time(), time.monotonic_ns(), None))
+
+                while not self.stop.is_set():
+                    if reader.poll(POLL_SEC):
+                        self.inbox.put(("data", self.port, time.time(), time.monotonic_ns(), list(reader.frames())))
+
+            except Exception as e:
+                self.inbox.put(("error", self.port, time.time(), time.monotonic_ns(), str(e)))
+
+            finally:
+                try:
+                    if ser:
+                        ser.close()
+                except Exception:
+                    pass
+
+            self.stop.wait(RECONNECT_DELAY_SEC)
+            if not pathlib.Path(self.port).exists():
+                # re-enumerated under another name (or unplugged): the rescan takes over
+                print(f"[SimMonitorService] {self.port} is gone; reader stopped")
+                return
+
+
+def start_new_readers(readers: dict, inbox: queue.Queue, stop: threading.Event) -> list:
+    """Drop readers that exited, start one per newly resolved port; returns the ports started."""
+    for port in [p for p, r in readers.items() if not r.is_alive()]:
+        del readers[port]
+    try:
+        ports = resolve_receiver_ports(active=readers)
+    except Exception as e:
+        print(f"[SimMonitorService] Serial error: {e}")
+        return []
+    for port in ports:
+        readers[port] = PortReader(port, inbox, stop)
+        readers[port].start()
+    return ports
 
-            if PORT_OPEN_COUNTS_AS_ONLINE:
-                receiver_online = True
-                last_serial_activity_ts = now
-                update_receiver_status(True, ts=now)
-
-            while True:
-                raw = ser.readline()
-                now = time.time()
-
-                # periodic sender timeout cleanup
-                if now - last_timeout_check > 5.0:
-                    check_sender_timeouts()
-                    last_timeout_check = now
-
-                if not raw:
-                    if receiver_online and last_serial_activity_ts and (now - last_serial_activity_ts > RECEIVER_TIMEOUT):
-                        receiver_online = False
-                        update_receiver_status(False, ts=now)
-                        print(f"[SimMonitorService] Receiver OFFLINE (no serial bytes for {RECEIVER_TIMEOUT}s)")
-                    continue
-
-                # any bytes => activity
-                last_serial_activity_ts = now
-                if not receiver_online:
-                    receiver_online = True
-                    print("[SimMonitorService] Receiver ONLINE (serial activity resumed)")
-                update_receiver_status(True, ts=now)
-
-                line = raw.decode(errors="ignore").strip()
-                if not line:
-                    continue
-
-                mR = RECV_RE.match(line)
-                mO = ONLINE_RE.match(line)
-                mS = STATE_RE.match(line)
-
-                if not (mR or mO or mS):
-                    continue
-
-                if mR:
-                    continue
-
-                if mO:
-                    sid = int(mO.group(1))
-                    online = int(mO.group(2))
-                    set_sender_online_flag(sid, bool(online), ts=now)
-                    continue
-
-                if mS:
-                    sid = int(mS.group(1))
-                    motion = int(mS.group(2))
-                    ramp = int(mS.group(3))
-                    update_sender(sid, motion, ramp, ts=now)
-                    handle_motion(sid, motion, ts=now)
-
-        except KeyboardInterrupt:
-            print("[SimMonitorService] Stopped by user")
-            break
 
-        except Exception as e:
-            now = time.time()
-            print(f"[SimMonitorService] Serial error: {e}")
-            update_receiver_status(False, ts=now)
+# -----------------------------
+# Ingest: receiver events -> cache / seq -> DB writer
+# -----------------------------
+class IngestService:
+    """
+    Everything between the serial readers and SQLite. Shared by the live
+    service and by replay, which drives it with the capture's own clock:
+      on_event(event, mono, now)  one PortReader event
+      tick(mono, now)             timers (receiver/sender timeouts, flush, stats)
+    """
 
+    def __init__(self, writer: DBWriter, *, capture: CaptureWriter | None = None, report: bool = True,
+                 retention_days: float | None = RETENTION_DAYS):
+        self.writer = writer
+        self.capture = capture
+        self.report = report
+        self.retention_days = retention_days
+        self.retention_thread = None
+
+        self.cache = StateCache(sender_timeout=SENDER_TIMEOUT)
+        self.seq = SeqTracker()
+        self.events = EventLog()
+        self.lines = 0
+
+        self.last_activity = {}                 # port -> mono of last bytes
+        self.last_stats = None
+        self.last_link = None
+        self.last_capture_flush = None
+        self.last_retention = None
+        self.link_window_start = None
+
+    def start(self, mono: float, now: float):
+        conn = db.get_conn()
+        try:
+            self.cache.warm(conn)
+        finally:
+            conn.close()
+
+        # Nothing is online until a port opens / talks
+        for port in list(self.cache.ports):
+            self.set_port_online(port, False, now)
+        if self.cache.receiver(False, int(now)):
+            update_receiver_status(self.writer, False, ts=now)
+        self.writer.flush()
+
+        self.last_stats = self.last_link = self.last_capture_flush = mono
+        self.last_retention = mono - RETENTION_INTERVAL_SEC     # first pass once ingest is idle
+        self.link_window_start = now
+
+    # ------------------------------------------------------------------
+    def on_event(self, event, mono: float, now: float):
+        kind, port, ts, mono_ns, payload = event
+
+        if kind == "data":
+            self.last_activity[port] = mono
+            if self.report and not self.cache.ports.get(port, (False,))[0]:
+                print(f"[SimMonitorService] Receiver {port} ONLINE (serial activity)")
+            self.set_port_online(port, True, ts)
+            for raw in payload:
+                if self.capture is not None:
+                    self.capture.write(port, mono_ns, raw)
+                self.handle_line(raw, ts)
+
+        elif kind == "open":
+            if PORT_OPEN_COUNTS_AS_ONLINE:
+                self.last_activity[port] = mono
+                self.set_port_online(port, True, ts)
+
+        elif kind == "error":
+            print(f"[SimMonitorService] Serial error on {port}: {payload}")
+            self.last_activity.pop(port, None)
+            self.set_port_online(port, False, ts)
+            self.writer.flush()
+
+    def handle_line(self, raw: bytes, now: float):
+        """Decode one receiver line and queue whatever DB writes it implies."""
+        self.lines += 1
+        cache = self.cache
+        writer = self.writer
+
+        # Receiver CSV protocol (utils.protocol); rejects and R,1 carry no state
+        frame = decode_frame(raw)
+        ftype = type(frame)
+
+        if ftype is OnlineFrame:
+            sid = frame.sid
+            prev = cache.sims.get(sid)
+            was_online = prev.online if prev is not None else None
+            if cache.sender_online(sid, frame.online, int(now)):
+                set_sender_online_flag(writer, sid, frame.online, ts=now)
+            if was_online != frame.online:
+                self.events.add(sid, EV_ONLINE, was_online, frame.online, now)
+            return
+
+        if ftype is StateFrame:
+            sid = frame.sid
+            # duplicates (overlapping receivers / relays) and stale reorders stop here
+            if self.seq.check(sid, frame.seq, now) != ACCEPT:
+                return
+            motion = frame.motion
+            ramp = frame.ramp
+            prev = cache.sims.get(sid)
+            if prev is not None:
+                old_motion, old_ramp, was_online = prev.motion, prev.ramp, prev.online
+            else:
+                old_motion = old_ramp = was_online = None
+            if cache.sender_state(sid, motion, ramp, int(now)):
+                update_sender(writer, sid, motion, ramp, ts=now)
+                events = self.events
+                if old_motion != motion:
+                    events.add(sid, EV_MOTION, old_motion, motion, now)
+                if old_ramp != ramp:
+                    events.add(sid, EV_RAMP, old_ramp, ramp, now)
+                if not was_online:
+                    events.add(sid, EV_ONLINE, was_online, True, now)
+            edge = cache.motion_edge(sid, motion, int(now))
+            if edge:
+                handle_motion(writer, sid, edge, ts=now)
+
+    def set_port_online(self, port: str, online: bool, now: float):
+        """Per-port receiver flag + the aggregate system_status row the GUI reads."""
+        cache = self.cache
+        if cache.receiver_port(port, online, int(now)):
+            update_port_status(self.writer, port, online, ts=now)
+        was_online = cache.receiver_online
+        if cache.receiver(cache.any_receiver_online(), int(now)):
+            update_receiver_status(self.writer, cache.receiver_online, ts=now)
+        if was_online != cache.receiver_online:
+            self.events.add(RECEIVER_SIM_ID, EV_RECEIVER, was_online, cache.receiver_online, now)
+
+    # ------------------------------------------------------------------
+    def tick(self, mono: float, now: float):
+        # per-port receiver timeout
+        for port, seen in list(self.last_activity.items()):
+            if mono - seen > RECEIVER_TIMEOUT:
+                del self.last_activity[port]
+                self.set_port_online(port, False, now)
+                if self.report:
+                    print(f"[SimMonitorService] Receiver {port} OFFLINE (no serial bytes for {RECEIVER_TIMEOUT}s)")
+
+        # sender timeouts: O(1) unless a deadline actually passed
+        for sim_id in check_sender_timeouts(self.writer, self.cache, now=now):
+            self.events.add(sim_id, EV_ONLINE, True, False, now)
+
+        # transitions logged since the last tick -> one batched insert
+        flush_events(self.writer, self.events)
+
+        # group commit runs on the writer thread; capture flush + stats report here
+        if self.capture is not None and mono - self.last_capture_flush >= CAPTURE_FLUSH_SEC:
+            self.capture.flush()
+            self.last_capture_flush = mono
+        if self.report and mono - self.last_stats >= STATS_INTERVAL_SEC:
+            print(f"[SimMonitorService] {self.stats()}")
+            self.last_stats = mono
+
+        # per-sender link quality window
+        if mono - self.last_link >= LINK_STATS_INTERVAL_SEC:
+            write_link_stats(self.writer, self.seq, self.link_window_start, now)
+            self.link_window_start = now
+            self.last_link = mono
+
+        # retention: only started while the writer queue is empty
+        if (self.retention_days is not None and mono - self.last_retention >= RETENTION_INTERVAL_SEC
+                and self.writer.pending == 0
+                and not (self.retention_thread and self.retention_thread.is_alive())):
+            self.last_retention = mono
+            self.retention_thread = threading.Thread(target=self._run_retention, args=(now,),
+                                                     name="retention", daemon=True)
+            self.retention_thread.start()
+
+    def _run_retention(self, now: float):
+        busy = lambda: self.writer.pending >= self.writer.batch_size
+        try:
+            result = retention.run_retention(days=self.retention_days, now=now, should_yield=busy)
+            if result["moved"] and self.report:
+                print(f"[SimMonitorService] Retention: {result}")
+        except Exception as e:
+            print(f"[SimMonitorService] Retention failed: {e}")
         finally:
+            close_thread_conns()
+
+    def close(self, now: float):
+        """Final link stats, everything offline, flush on shutdown."""
+        write_link_stats(self.writer, self.seq, self.link_window_start, now)
+        for port in list(self.cache.ports):
+            update_port_status(self.writer, port, False, ts=now)
+        update_receiver_status(self.writer, False, ts=now)
+        if self.cache.receiver_online:
+            self.events.add(RECEIVER_SIM_ID, EV_RECEIVER, True, False, now)
+        flush_events(self.writer, self.events)
+        self.writer.close()
+        if self.capture is not None:
+            self.capture.close()
+
+    def stats(self) -> str:
+        return (f"DB writer {self.writer.stats()} cache {self.cache.stats()} seq {self.seq.stats()} "
+                f"events {self.events.logged}")
+
+
+# -----------------------------
+# Main loop: N reader threads -> one writer
+# -----------------------------
+def run_service(capture_dir: str | None = None):
+    inbox = queue.Queue()
+    stop = threading.Event()
+    readers = {}
+    ingest = None
+
+    try:
+        while not start_new_readers(readers, inbox, stop):
+            print("[SimMonitorService] No serial ports available")
+            time.sleep(RECONNECT_DELAY_SEC)
+
+        # Schema migrations run while the readers already buffer lines in the inbox
+        init_db()
+        writer = DBWriter(flush_interval=DB_FLUSH_INTERVAL_SEC, batch_size=DB_BATCH_SIZE, max_ordered=DB_MAX_ORDERED)
+        capture = CaptureWriter(capture_dir) if capture_dir else None
+        ingest = IngestService(writer, capture=capture)
+        ingest.start(time.monotonic(), time.time())
+        if capture is not None:
+            print(f"[SimMonitorService] Capturing raw receiver lines to {capture.dir}")
+
+        last_rescan = time.monotonic()
+        while True:
             try:
-                if ser:
-                    ser.close()
-            except Exception:
-                pass
+                event = inbox.get(timeout=POLL_SEC)
+            except queue.Empty:
+                event = None
+
+            mono = time.monotonic()
+            now = time.time()
+            if event is not None:
+                ingest.on_event(event, mono, now)
+            ingest.tick(mono, now)
+
+            if mono - last_rescan >= PORT_RESCAN_SEC:
+                last_rescan = mono
+                start_new_readers(readers, inbox, stop)
+
+    except KeyboardInterrupt:
+        print("[SimMonitorService] Stopped by user")
+
+    finally:
+        stop.set()
+        for r in readers.values():
+            r.join(timeout=POLL_SEC * 5)
+
+        # flush on shutdown
+        if ingest is not None:
+            ingest.close(time.time())
+            print(f"[SimMonitorService] {ingest.stats()}")
 
-        time.sleep(RECONNECT_DELAY_SEC)
+
+# -----------------------------
+# Replay of capture files
+# -----------------------------
+def replay(paths: list, *, speed: float = 1.0, use_pty: bool = False):
+    """
+    Feed capture files back at 1x, Nx or max speed (speed <= 0).
+      in-process: through IngestService -> real decoder + DB path, using the
+                  captured clock so timeouts and sessions match the original
+      use_pty:    write the raw lines into a pty for an external service/GUI
+    """
+    records = iter_capture(paths)
+
+    if use_pty:
+        import pty, tty, os
+        master, slave = pty.openpty()
+        tty.setraw(slave)
+        print(f"[Replay] Writing to {os.ttyname(slave)} (point RECEIVER_PORTS at it)")
+        sink = lambda port, mono, now, raw: os.write(master, raw + b"\n")
+        ingest = None
+    else:
+        init_db()
+        writer = DBWriter(flush_interval=DB_FLUSH_INTERVAL_SEC, batch_size=DB_BATCH_SIZE, max_ordered=DB_MAX_ORDERED)
+        ingest = IngestService(writer, report=False, retention_days=None)
+        sink = None
+
+    t_real0 = time.perf_counter()
+    first_mono = None
+    last_tick = None
+    mono = now = 0.0
+    count = 0
+
+    try:
+        for port, mono_ns, wall_ns, raw in records:
+            mono = mono_ns / 1e9
+            now = wall_ns / 1e9
+
+            if first_mono is None:
+                first_mono = last_tick = mono
+                if ingest is not None:
+                    ingest.start(mono, now)
+
+            # pace against the captured clock
+            if speed > 0:
+                delay = (mono - first_mono) / speed - (time.perf_counter() - t_real0)
+                if delay > 0:
+                    time.sleep(delay)
+
+            if ingest is not None:
+                # timers that would have fired during the gap
+                while mono - last_tick >= REPLAY_TICK_SEC:
+                    last_tick += REPLAY_TICK_SEC
+                    ingest.tick(last_tick, now - (mono - last_tick))
+                ingest.on_event(("data", port, now, mono_ns, [raw]), mono, now)
+                ingest.tick(mono, now)
+            else:
+                sink(port, mono, now, raw)
+            count += 1
+
+    except KeyboardInterrupt:
+        print("[Replay] Stopped by user")
+
+    finally:
+        elapsed = time.perf_counter() - t_real0
+        if ingest is not None and first_mono is not None:
+            ingest.close(now)
+            print(f"[Replay] {ingest.stats()}")
+        span = (mono - first_mono) if first_mono is not None else 0.0
+        rate = count / elapsed if elapsed > 0 else 0.0
+        print(f"[Replay] {count} lines, {span:.1f}s captured in {elapsed:.2f}s ({rate:,.0f} lines/sec)")
+
+
+def main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Sim Monitor receiver ingest service")
+    sub = ap.add_subparsers(dest="cmd")
+
+    run = sub.add_parser("run", help="run the service (default)")
+    run.add_argument("--capture", metavar="DIR", help="also append raw receiver lines to rotating capture files in DIR")
+
+    rp = sub.add_parser("replay", help="replay capture files through the decoder + DB path")
+    rp.add_argument("files", nargs="+", help="capture files, or a capture directory")
+    rp.add_argument("--speed", default="1", help="1, N (e.g. 10) or max")
+    rp.add_argument("--pty", action="store_true", help="write into a pty instead of replaying in-process")
+    rp.add_argument("--db", help="scratch SQLite file to replay into (required unless --pty)")
+
+    args = ap.parse_args(argv)
+
+    if args.cmd == "replay":
+        if not args.pty:
+            if not args.db:
+                rp.error("in-process replay needs --db SCRATCH.db (it must not write into the live sim_monitor.db)")
+            if pathlib.Path(args.db).resolve() == db.DB_PATH.resolve():
+                rp.error(f"--db {args.db} is the live database; replay into a scratch file")
+            db.DB_PATH = pathlib.Path(args.db)
+        paths = []
+        for f in args.files:
+            p = pathlib.Path(f)
+            paths.extend(list_captures(p) if p.is_dir() else [p])
+        speed = 0.0 if args.speed == "max" else float(args.speed)
+        replay(paths, speed=speed, use_pty=args.pty)
+    else:
+        run_service(capture_dir=getattr(args, "capture", None))
 
 
 if __name__ == "__main__":
-    run_service()
\ No newline at end of file
+    main()
@@ -1,4 +1,5 @@
-import time
+import time, weakref
+from typing import NamedTuple
 
 from PyQt5.QtWidgets import (
     QWidget, QLabel, QVBoxLayout, QFrame,
@@ -7,7 +8,7 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtGui import (
     QPixmap, QFont, QRegion, QPainterPath, QPainter, QColor, QBrush
 )
-from PyQt5.QtCore import Qt, QRectF, QTimer
+from PyQt5.QtCore import Qt, QRectF, QTimer, QObject
 import os
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 IMAGES_DIR = os.path.join(BASE_DIR, "images")
@@ -25,28 +26,162 @@ SIM_IMAGES = {
 }
 
 
+# Decoded + scaled SIM_IMAGES, shared by every card:
+# (image key, logical size, device pixel ratio) -> QPixmap (implicitly shared)
+_pixmap_cache = {}
+
+
+def scaled_pixmap(key: str, size: int, dpr: float = 1.0) -> QPixmap:
+    """SIM_IMAGES[key] fitted in size x size logical px; read from disk and scaled once per key."""
+    cache_key = (key, size, dpr)
+    pixmap = _pixmap_cache.get(cache_key)
+    if pixmap is None:
+        path = SIM_IMAGES.get(key)
+        pixmap = QPixmap()
+        if path:
+            physical = int(round(size * dpr))
+            pixmap = QPixmap(path).scaled(physical, physical, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            pixmap.setDevicePixelRatio(dpr)
+        _pixmap_cache[cache_key] = pixmap
+    return pixmap
+
+
+def clear_pixmap_cache():
+    """Drop every cached pixmap (screen / DPI change); cards then call refresh_pixmap()."""
+    _pixmap_cache.clear()
+
+
+# Status bar look per style id: (background, text colour)
+STATUS_STYLES = {
+    "offline": ("#bbb", "black"),
+    "ramp-alert": ("orange", "black"),
+    "operation": ("red", "white"),
+    "standby": ("green", "white"),
+    "unknown": ("gray", "white"),
+    "ramping": ("yellow", "black"),
+    "ramp-up": ("purple", "white"),
+}
+
+STATUS_CSS = {
+    style_id: f"""
+        background-color: {bg};
+        color: {fg};
+        padding: 8px 16px;
+        border-radius: 6px;
+    """
+    for style_id, (bg, fg) in STATUS_STYLES.items()
+}
+
+
+class CardView(NamedTuple):
+    """Everything a card shows; apply_view() touches only the fields that changed."""
+    image_key: str          # SIM_IMAGES key
+    status_text: str
+    style_id: str           # STATUS_STYLES key
+    animated: bool          # striped status bar
+    overlay: bool           # gray offline overlay (and no drop shadow)
+    motion_text: str
+    compact: bool           # motion history shown -> shorter image
+
+
+# Striped "ramping" animation: one clock for every bar, stripes from a tile
+STRIPE_SPACING = 20     # px between stripes (= tile width)
+STRIPE_WIDTH = 10
+STRIPE_ALPHA = 77       # white at 30 %
+STRIPE_TICK_MS = 60     # ~16 FPS
+STRIPE_STEP = 2         # px per tick
+
+_stripe_brushes = {}    # bar height -> QBrush(tile)
+
+
+def stripe_brush(height: int) -> QBrush:
+    """Tiled brush of 30° stripes, one STRIPE_SPACING-wide tile rendered once per bar height."""
+    brush = _stripe_brushes.get(height)
+    if brush is None:
+        height = max(1, height)
+        tile = QPixmap(STRIPE_SPACING, height)
+        tile.fill(Qt.transparent)
+        painter = QPainter(tile)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(255, 255, 255, STRIPE_ALPHA))
+        # stripes lean left by up to `height` px; start one period early, end past the slant
+        for x in range(-STRIPE_SPACING, STRIPE_SPACING + height + 1, STRIPE_SPACING):
+            painter.save()
+            painter.translate(x, 0)
+            painter.rotate(30)
+            painter.drawRect(0, -height, STRIPE_WIDTH, height * 3)
+            painter.restore()
+        painter.end()
+        brush = _stripe_brushes[height] = QBrush(tile)
+    return brush
+
+
+class StripeClock(QObject):
+    """
+    Shared animation clock: one timer advances the stripe offset and
+    repaints every registered bar in one pass. Bars register only while
+    animating AND shown, so the timer stops when nothing is ramping or the
+    window is hidden / minimized.
+    """
+    def __init__(self):
+        super().__init__()
+        self.offset = 0
+        self._bars = weakref.WeakSet()
+        self._timer = QTimer(self)
+        self._timer.setInterval(STRIPE_TICK_MS)
+        self._timer.timeout.connect(self._tick)
+
+    def add(self, bar):
+        self._bars.add(bar)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def discard(self, bar):
+        self._bars.discard(bar)
+        if not self._bars:
+            self._timer.stop()
+
+    def _tick(self):
+        self.offset = (self.offset + STRIPE_STEP) % STRIPE_SPACING
+        for bar in list(self._bars):
+            bar.update()
+
+
+_stripe_clock = None
+
+
+def stripe_clock() -> StripeClock:
+    global _stripe_clock
+    if _stripe_clock is None:
+        _stripe_clock = StripeClock()
+    return _stripe_clock
+
+
 class AnimatedStatusBar(QLabel):
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.offset = 0
         self.animation_enabled = False
 
-        self._timer = QTimer(self)
-        self._timer.timeout.connect(self._update_offset)
-        self._timer.setInterval(60)  # ~30 FPS
-
     def enable_animation(self, enable: bool = True):
+        if enable == self.animation_enabled:
+            return
         self.animation_enabled = enable
-        if enable:
-            self._timer.start()
+        if enable and self.isVisible() and not self.window().isMinimized():
+            stripe_clock().add(self)
         else:
-            self._timer.stop()
-            self.update()
-
-    def _update_offset(self):
-        self.offset = (self.offset + 2) % 20
+            stripe_clock().discard(self)
         self.update()
 
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.animation_enabled:
+            stripe_clock().add(self)
+
+    def hideEvent(self, event):
+        # also sent (spontaneously) when the window is minimized
+        super().hideEvent(event)
+        stripe_clock().discard(self)
+
     def paintEvent(self, event):
         super().paintEvent(event)
 
@@ -54,24 +189,9 @@ class AnimatedStatusBar(QLabel):
             return
 
         painter = QPainter(self)
-        painter.setOpacity(0.30)
-        brush = QBrush(QColor("white"))
-        painter.setBrush(brush)
-        painter.setPen(Qt.NoPen)
-        painter.setClipRect(self.rect())
-
-        w = self.width()
-        h = self.height()
-        spacing = 20
-        stripe_width = 10
-
-        for x in range(-40, w, spacing):
-            x_pos = x + self.offset
-            painter.save()
-            painter.translate(x_pos, 0)
-            painter.rotate(30)
-            painter.drawRect(0, -h, stripe_width, h * 3)
-            painter.restore()
+        painter.setBrushOrigin(stripe_clock().offset, 0)
+        painter.fillRect(self.rect(), stripe_brush(self.height()))
+        painter.end()
 
 
 class SimulatorCard(QWidget):
@@ -81,6 +201,12 @@ class SimulatorCard(QWidget):
       • Motion + ramp states
       • Ramp disconnect logic
       • Motion history (current + last session)
+
+    Rendering is diff-based: compute_view() derives an immutable CardView
+    from the state, apply_view() compares it with the one on screen and
+    only makes the widget calls for fields that differ. A steady card costs
+    one tuple comparison per refresh (plus the elapsed-time text while in
+    motion).
     """
     def __init__(self, sim_id, name=None, *, scale: float = 1.0):
         super().__init__()
@@ -112,6 +238,9 @@ class SimulatorCard(QWidget):
         self.last_motion_end = None
         self.last_motion_duration = None
 
+        # View-model currently on screen (None: nothing applied yet)
+        self._view = None
+
         # Overall size
         self.setFixedSize(int(310 * self.scale), int(450 * self.scale))
 
@@ -152,12 +281,12 @@ class SimulatorCard(QWidget):
         card_layout.setSpacing(int(12 * self.scale))
         card_layout.setAlignment(Qt.AlignTop | Qt.AlignHCenter)
 
-        # Drop shadow
-        shadow = QGraphicsDropShadowEffect(self)
-        shadow.setOffset(0, int(3 * self.scale))
-        shadow.setBlurRadius(int(14 * self.scale))
-        shadow.setColor(Qt.gray)
-        self.card.setGraphicsEffect(shadow)
+        # Drop shadow (created once; offline just disables it)
+        self.shadow = QGraphicsDropShadowEffect(self)
+        self.shadow.setOffset(0, int(3 * self.scale))
+        self.shadow.setBlurRadius(int(14 * self.scale))
+        self.shadow.setColor(Qt.gray)
+        self.card.setGraphicsEffect(self.shadow)
 
         # Title
         self.title = QLabel(self.name)
@@ -170,7 +299,6 @@ class SimulatorCard(QWidget):
         self.image.setAlignment(Qt.AlignHCenter | Qt.AlignBottom)
         self.image.setFixedHeight(int(295 * self.scale))
         self.image.setStyleSheet("padding-top: 10px;")
-        self.image.setPixmap(self.get_pixmap("offline"))
         card_layout.addWidget(self.image)
         
         # Motion history label
@@ -184,15 +312,9 @@ class SimulatorCard(QWidget):
         outer_layout.addWidget(self.card)
 
         # Status bar
-        self.status_bar = AnimatedStatusBar("DISCONNECTED")
+        self.status_bar = AnimatedStatusBar()
         self.status_bar.setAlignment(Qt.AlignCenter)
         self.status_bar.setFont(QFont("Arial", int(16 * self.scale), QFont.Bold))
-        self.status_bar.setStyleSheet("""
-            background-color: #bbb;
-            color: black;
-            padding: 8px 6px;
-            border-radius: 6px;
-        """)
         card_layout.addWidget(self.status_bar)
 
 
@@ -208,7 +330,6 @@ class SimulatorCard(QWidget):
         self.overlay.hide()
 
         self.update_display()
-        self.update_motion_label()
 
     # ------------------------------------------------------------------
     # Geometry / overlay mask
@@ -227,16 +348,6 @@ class SimulatorCard(QWidget):
         self.overlay.setGeometry(0, 0, self.card.width(), self.card.height())
         self.apply_overlay_mask()
 
-    def adjust_image_height_for_history(self):
-        """Shrink the image if motion history exists; full size if none yet."""
-        if (self.in_motion and self.motion_start_ts) or \
-        (self.last_motion_end and self.last_motion_duration):
-            # Has current or historical motion → shrink
-            self.image.setFixedHeight(int(300 * self.scale))
-        else:
-            # No motion recorded yet → full height
-            self.image.setFixedHeight(int(325 * self.scale))
-
     # ------------------------------------------------------------------
     # DB → UI entry point
     # ------------------------------------------------------------------
@@ -252,7 +363,7 @@ class SimulatorCard(QWidget):
         last_duration,
     ):
         """
-        Main entry point used by MainWindow.refresh_from_db().
+        Main entry point used by MainWindow.apply_snapshot().
         """
         self.motion_state = motion
         self.ramp_state = ramp
@@ -271,9 +382,8 @@ class SimulatorCard(QWidget):
                 self.ramp_disconnected = False
                 self.force_label_override = False
 
-        # This also updates display
-        self.set_offline(not online)
-        self.update_motion_label()
+        self.offline = not online
+        self.update_display()
 
     # ------------------------------------------------------------------
     # Ramp disconnect logic
@@ -292,201 +402,117 @@ class SimulatorCard(QWidget):
 
     # ------------------------------------------------------------------
     def get_pixmap(self, key: str) -> QPixmap:
-        path = SIM_IMAGES.get(key)
-        if path:
-            return QPixmap(path).scaled(
-                int(330 * self.scale),
-                int(330 * self.scale),
-                Qt.KeepAspectRatio,
-                Qt.SmoothTransformation,
-            )
-        return QPixmap()
+        return scaled_pixmap(key, int(330 * self.scale), self.devicePixelRatioF())
+
+    def refresh_pixmap(self):
+        """Re-fetch the current image after clear_pixmap_cache() (new screen / DPI)."""
+        if self._view is not None:
+            self.image.setPixmap(self.get_pixmap(self._view.image_key))
 
     # ------------------------------------------------------------------
     # Main visual state machine
     # ------------------------------------------------------------------
-    def update_display(self):
-        if self.offline:
-            self.image.setPixmap(self.get_pixmap("offline"))
-            self.status_bar.setText("DISCONNECTED")
-            self.status_bar.setStyleSheet("""
-                background-color: #bbb;
-                color: black;
-                padding: 8px 16px;
-                border-radius: 6px;
-            """)
-            self.status_bar.enable_animation(False)
-            self.overlay.show()
-            self.overlay.raise_()
-            return
+    def compute_view(self, now: float | None = None) -> CardView:
+        """Pure function of the card state -> what should be on screen."""
+        motion_text = self.motion_text(now)
+        compact = bool(motion_text)
 
-        self.overlay.hide()
+        if self.offline:
+            return CardView("offline", "DISCONNECTED", "offline", False, True, motion_text, compact)
 
         # RAMP DISCONNECTED VISUALS
         if self.ramp_disconnected:
             key = "motion-on-no-ramp" if self.motion_state == 2 else "at-home-no-ramp"
-            self.image.setPixmap(self.get_pixmap(key))
-
             if self.force_label_override:
-                self.status_bar.setText("Ramp Disconnected")
-                self.status_bar.setStyleSheet("""
-                    background-color: orange;
-                    color: black;
-                    padding: 8px 16px;
-                    border-radius: 6px;
-                """)
-                self.status_bar.enable_animation(False)
-                return
-            else:
+                text, style = "Ramp Disconnected", "ramp-alert"
+            elif self.motion_state == 2:
                 # Fallback label after 5s, based on motion
-                if self.motion_state == 2:
-                    self.status_bar.setText("In Operation (No Ramp)")
-                    self.status_bar.setStyleSheet("""
-                        background-color: red;
-                        color: white;
-                        padding: 8px 16px;
-                        border-radius: 6px;
-                    """)
-                    self.status_bar.enable_animation(False)
-                elif self.motion_state == 1:
-                    self.status_bar.setText("Standby (No Ramp)")
-                    self.status_bar.setStyleSheet("""
-                        background-color: green;
-                        color: white;
-                        padding: 8px 16px;
-                        border-radius: 6px;
-                    """)
-                    self.status_bar.enable_animation(False)
-                else:
-                    self.status_bar.setText("Unknown (No Ramp)")
-                    self.status_bar.setStyleSheet("""
-                        background-color: gray;
-                        color: white;
-                        padding: 8px 16px;
-                        border-radius: 6px;
-                    """)
-                    self.status_bar.enable_animation(False)
-                return
+                text, style = "In Operation (No Ramp)", "operation"
+            elif self.motion_state == 1:
+                text, style = "Standby (No Ramp)", "standby"
+            else:
+                text, style = "Unknown (No Ramp)", "unknown"
+            return CardView(key, text, style, False, False, motion_text, compact)
 
         # NORMAL STATES
+        animated = False
         if self.motion_state == 2:
-            self.image.setPixmap(self.get_pixmap("motion-on"))
-            self.status_bar.setText("In Operation")
-            self.status_bar.setStyleSheet("""
-                background-color: red;
-                color: white;
-                padding: 8px 16px;
-                border-radius: 6px;
-            """)
-            self.status_bar.enable_animation(False)
-
+            key, text, style = "motion-on", "In Operation", "operation"
         elif self.motion_state == 1:
             if self.ramp_state == 0:
-                self.image.setPixmap(self.get_pixmap("ramping"))
-                self.status_bar.setText("RAMPING")
-                self.status_bar.setStyleSheet("""
-                    background-color: yellow;
-                    color: black;
-                    padding: 8px 16px;
-                    border-radius: 6px;
-                """)
-                self.status_bar.enable_animation(True)
-
+                key, text, style = "ramping", "RAMPING", "ramping"
+                animated = True
             elif self.ramp_state == 1:
-                self.image.setPixmap(self.get_pixmap("ramping"))
-                self.status_bar.setText("Ramp Up")
-                self.status_bar.setStyleSheet("""
-                    background-color: purple;
-                    color: white;
-                    padding: 8px 16px;
-                    border-radius: 6px;
-                """)
-                self.status_bar.enable_animation(False)
-
+                key, text, style = "ramping", "Ramp Up", "ramp-up"
             elif self.ramp_state == 2:
-                self.image.setPixmap(self.get_pixmap("at-home"))
-                self.status_bar.setText("Standby")
-                self.status_bar.setStyleSheet("""
-                    background-color: green;
-                    color: white;
-                    padding: 8px 16px;
-                    border-radius: 6px;
-                """)
-                self.status_bar.enable_animation(False)
-
+                key, text, style = "at-home", "Standby", "standby"
             else:
-                self.image.setPixmap(self.get_pixmap("at-home"))
-                self.status_bar.setText("Standby")
-                self.status_bar.setStyleSheet("""
-                    background-color: gray;
-                    color: white;
-                    padding: 8px 16px;
-                    border-radius: 6px;
-                """)
-                self.status_bar.enable_animation(False)
-
+                key, text, style = "at-home", "Standby", "unknown"
         else:
             # motion_state == 0 or unknown
-            self.image.setPixmap(self.get_pixmap("at-home"))
-            self.status_bar.setText("Idle / Not in Motion")
-            self.status_bar.setStyleSheet("""
-                background-color: gray;
-                color: white;
-                padding: 8px 16px;
-                border-radius: 6px;
-            """)
-            self.status_bar.enable_animation(False)
+            key, text, style = "at-home", "Idle / Not in Motion", "unknown"
+        return CardView(key, text, style, animated, False, motion_text, compact)
+
+    def apply_view(self, view: CardView):
+        """Apply only what differs from the view currently on screen."""
+        old = self._view
+        if view == old:
+            return
+
+        if old is None or view.image_key != old.image_key:
+            self.image.setPixmap(self.get_pixmap(view.image_key))
+        if old is None or view.status_text != old.status_text:
+            self.status_bar.setText(view.status_text)
+        if old is None or view.style_id != old.style_id:
+            self.status_bar.setStyleSheet(STATUS_CSS[view.style_id])
+        if old is None or view.animated != old.animated:
+            self.status_bar.enable_animation(view.animated)
+        if old is None or view.overlay != old.overlay:
+            if view.overlay:
+                self.overlay.show()
+                self.overlay.raise_()
+            else:
+                self.overlay.hide()
+            self.shadow.setEnabled(not view.overlay)
+        if old is None or view.motion_text != old.motion_text:
+            self.motion_label.setText(view.motion_text)
+        if old is None or view.compact != old.compact:
+            # Shrink the image if motion history exists; full size if none yet
+            self.image.setFixedHeight(int((300 if view.compact else 325) * self.scale))
+
+        self._view = view
+
+    def update_display(self):
+        self.apply_view(self.compute_view())
 
     # ------------------------------------------------------------------
     # Motion history text
     # ------------------------------------------------------------------
-    def update_motion_label(self):
+    def motion_text(self, now: float | None = None) -> str:
         if self.in_motion and self.motion_start_ts:
-            elapsed = max(0, int(time.time()) - int(self.motion_start_ts))
+            now = time.time() if now is None else now
+            elapsed = max(0, int(now) - int(self.motion_start_ts))
             h, rem = divmod(elapsed, 3600)
             m, s = divmod(rem, 60)
             start_local = time.strftime("%H:%M:%S", time.localtime(self.motion_start_ts))
-            self.motion_label.setText(
+            return (
                 f"In motion for {h:02d}:{m:02d}:{s:02d}\n"
                 f"Started at {start_local}"
             )
 
-        else:
-            if self.last_motion_end and self.last_motion_duration:
-                h, rem = divmod(int(self.last_motion_duration), 3600)
-                m, s = divmod(rem, 60)
-                end_local = time.strftime("%H:%M:%S", time.localtime(self.last_motion_end))
-                self.motion_label.setText(
-                    f"Last in motion at {end_local}\n"
-                    f"Duration {h:02d}:{m:02d}:{s:02d}"
-                )
-            else:
-                self.motion_label.setText("")
-
-        # Adjust image height after every motion label update
-        self.adjust_image_height_for_history()
-
-
+        if self.last_motion_end and self.last_motion_duration:
+            h, rem = divmod(int(self.last_motion_duration), 3600)
+            m, s = divmod(rem, 60)
+            end_local = time.strftime("%H:%M:%S", time.localtime(self.last_motion_end))
+            return (
+                f"Last in motion at {end_local}\n"
+                f"Duration {h:02d}:{m:02d}:{s:02d}"
+            )
+        return ""
 
     # ------------------------------------------------------------------
     # Offline / online transitions
     # ------------------------------------------------------------------
     def set_offline(self, offline: bool = True):
         self.offline = offline
-
-        if offline:
-            self.overlay.show()
-            self.overlay.raise_()
-            self.status_bar.enable_animation(False)
-            # Remove drop shadow
-            self.card.setGraphicsEffect(None)
-        else:
-            self.overlay.hide()
-            # Restore drop shadow
-            shadow = QGraphicsDropShadowEffect(self)
-            shadow.setOffset(0, int(3 * self.scale))
-            shadow.setBlurRadius(int(14 * self.scale))
-            shadow.setColor(Qt.gray)
-            self.card.setGraphicsEffect(shadow)
-
         self.update_display()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: utils.protocol.decode_frame vs the old three-regex chain.
+
+Usage (from sim_monitor/NEW):
+  python testing/bench_protocol.py [frames]
+"""
+
+import re, sys, time, random, pathlib
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from utils.protocol import decode_frame, Reject
+
+
+# The previous per-line path: decode to str, then run all three regexes
+RECV_RE   = re.compile(r"^R,1$")
+ONLINE_RE = re.compile(r"^[O0],(\d+),(0|1)$")
+STATE_RE  = re.compile(r"^S,(\d+),(\d+),(\d+),(\d+)$")
+
+
+def regex_path(raw: bytes):
+    line = raw.decode(errors="ignore").strip()
+    if not line:
+        return None
+    mR = RECV_RE.match(line)
+    mO = ONLINE_RE.match(line)
+    mS = STATE_RE.match(line)
+    if mR:
+        return ("R",)
+    if mO:
+        return ("O", int(mO.group(1)), int(mO.group(2)))
+    if mS:
+        return ("S", int(mS.group(1)), int(mS.group(2)), int(mS.group(3)), int(mS.group(4)))
+    return None
+
+
+def decoder_path(raw: bytes):
+    f = decode_frame(raw)
+    return None if isinstance(f, Reject) else f
+
+
+def make_lines(n: int):
+    rnd = random.Random(42)
+    lines = []
+    for i in range(n):
+        r = rnd.random()
+        sid = rnd.randint(1, 64)
+        if r < 0.80:
+            lines.append(f"S,{sid},{rnd.randint(1, 2)},{rnd.randint(0, 2)},{i & 0xFFFF}\n".encode())
+        elif r < 0.95:
+            lines.append(f"O,{sid},{rnd.randint(0, 1)}\n".encode())
+        elif r < 0.98:
+            lines.append(b"R,1\n")
+        else:
+            lines.append(b"\x00garbage,line\r\n")
+    return lines
+
+
+def bench(fn, lines, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for raw in lines:
+            fn(raw)
+        best = min(best, time.perf_counter() - t0)
+    return len(lines) / best
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    lines = make_lines(n)
+
+    rx = bench(regex_path, lines)
+    dx = bench(decoder_path, lines)
+
+    print(f"frames:         {n}")
+    print(f"regex chain:    {rx:,.0f} frames/sec")
+    print(f"decode_frame:   {dx:,.0f} frames/sec")
+    print(f"speedup:        {dx / rx:.2f}x")
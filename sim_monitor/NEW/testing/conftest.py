@@ -0,0 +1,22 @@
+"""
+Shared fixtures for the tests in testing/ (from sim_monitor/NEW: python -m pytest testing)
+"""
+
+import sys, pathlib
+
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from utils import db
+
+
+@pytest.fixture
+def scratch_db(tmp_path, monkeypatch):
+    """A fresh, migrated sim_monitor.db in tmp_path; yields its pooled read-write connection."""
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "sim_monitor.db")
+    db.init_db()
+    yield db.get_conn()
+    db.close_thread_conns()
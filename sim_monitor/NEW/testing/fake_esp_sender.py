@@ -6,9 +6,13 @@ PORT = sys.argv[1] if len(sys.argv) > 1 else "/dev/pts/6"
 BAUD = 115200
 
 ser = serial.Serial(PORT, BAUD)
+seq = {}
 
+# Receiver CSV protocol: S,<sid>,<motion>,<ramp>,<seq>
+# (for larger fleets / fault injection use testing/fleet_sim.py)
 def send(sim_id, ramp, motion):
-    msg = f"[DATA] Received from Sender ID {sim_id}: RampState={ramp}, MotionState={motion}, Seq=1\n"
+    seq[sim_id] = (seq.get(sim_id, 0) + 1) & 0xFFFF
+    msg = f"S,{sim_id},{motion},{ramp},{seq[sim_id]}\n"
     ser.write(msg.encode())
     ser.flush()
     print("Sent:", msg.strip())
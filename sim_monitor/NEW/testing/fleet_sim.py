@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Synthetic ESP32 fleet for load testing (R/O/S CSV protocol)
+-----------------------------------------------------------
+Simulates hundreds of senders behind one receiver:
+
+  • each sender sends O,<sid>,1 on boot, then S,<sid>,<motion>,<ramp>,<seq>
+    every --period seconds (+/- --jitter)
+  • motion/ramp follow the real cycle with random dwell times:
+      Standby (1,2) -> Ramping (1,0) -> Ramp Up (1,1) -> In Operation (2,1)
+      -> Ramp Up (1,1) -> Ramping (1,0) -> Standby (1,2)
+  • the receiver adds R,1 every 5 s
+  • faults: --drop (seq still advances), --dup (same line twice),
+    --garbage (noise lines)
+
+Modes:
+  pty     create a pty pair and write to it; point the service / GUI at the
+          printed slave path
+  port    write to an existing serial device / pty (--port)
+  stdout  print the stream
+  inproc  feed sim_monitor_service.IngestService directly (real decoder +
+          DB path) into a scratch --db, which is required and may not be the
+          live sim_monitor.db; with --speed max this is the ingest
+          throughput benchmark
+
+The offered rate (lines/sec) is reported every second and at the end.
+
+Usage (from sim_monitor/NEW):
+  python testing/fleet_sim.py --sims 300 --period 2 --mode pty
+  python testing/fleet_sim.py --sims 500 --duration 3600 --speed max --mode inproc --db /tmp/bench.db
+"""
+
+import os, sys, time, heapq, random, argparse, pathlib
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+# (motion, ramp, min dwell, max dwell) in cycle order
+CYCLE = [
+    (1, 2, 60.0, 600.0),     # Standby
+    (1, 0, 5.0, 20.0),       # Ramping (up)
+    (1, 1, 10.0, 60.0),      # Ramp Up
+    (2, 1, 300.0, 3600.0),   # In Operation
+    (1, 1, 10.0, 60.0),      # Ramp Up
+    (1, 0, 5.0, 20.0),       # Ramping (down)
+]
+
+RECEIVER_PERIOD = 5.0
+GARBAGE = [b"\x00\xff\xfe", b"S,,,,", b"O,abc,1", b"ets Jul 29 2019 12:21:46", b"S,1,2,1,"]
+
+
+class SimSender:
+    __slots__ = ("sid", "phase", "phase_until", "seq", "booted")
+
+    def __init__(self, sid: int, rnd: random.Random):
+        self.sid = sid
+        self.phase = rnd.randrange(len(CYCLE))
+        self.phase_until = 0.0
+        self.seq = rnd.randrange(0x10000)
+        self.booted = False
+
+    def advance(self, t: float, rnd: random.Random):
+        if t >= self.phase_until:
+            if self.phase_until:
+                self.phase = (self.phase + 1) % len(CYCLE)
+            lo, hi = CYCLE[self.phase][2], CYCLE[self.phase][3]
+            self.phase_until = t + rnd.uniform(lo, hi)
+
+    def state_line(self) -> bytes:
+        motion, ramp = CYCLE[self.phase][0], CYCLE[self.phase][1]
+        self.seq = (self.seq + 1) & 0xFFFF
+        return b"S,%d,%d,%d,%d" % (self.sid, motion, ramp, self.seq)
+
+
+class Fleet:
+    def __init__(self, sims: int, *, period: float, jitter: float, drop: float, dup: float,
+                 garbage: float, seed: int = 1, first_sid: int = 1):
+        self.rnd = random.Random(seed)
+        self.period = period
+        self.jitter = jitter
+        self.drop = drop
+        self.dup = dup
+        self.garbage = garbage
+
+        self.senders = [SimSender(first_sid + i, self.rnd) for i in range(sims)]
+        # stagger boots across one period
+        self.heap = [(self.rnd.uniform(0, period), i) for i in range(sims)]
+        heapq.heapify(self.heap)
+        self.next_receiver = 0.0
+
+        self.offered = 0
+        self.dropped = 0
+
+    def _next_period(self) -> float:
+        return self.period * (1.0 + self.rnd.uniform(-self.jitter, self.jitter))
+
+    def lines_until(self, t_end: float):
+        """Yield (t, line) for everything scheduled before t_end (virtual seconds)."""
+        rnd = self.rnd
+        heap = self.heap
+        while heap and heap[0][0] < t_end:
+            if self.next_receiver <= heap[0][0]:
+                t = self.next_receiver
+                self.next_receiver += RECEIVER_PERIOD
+                self.offered += 1
+                yield t, b"R,1"
+                continue
+
+            t, i = heapq.heappop(heap)
+            s = self.senders[i]
+            heapq.heappush(heap, (t + self._next_period(), i))
+
+            if not s.booted:
+                s.booted = True
+                self.offered += 1
+                yield t, b"O,%d,1" % s.sid
+
+            s.advance(t, rnd)
+            line = s.state_line()
+
+            if rnd.random() < self.drop:
+                self.dropped += 1
+                continue
+            self.offered += 1
+            yield t, line
+            if rnd.random() < self.dup:
+                self.offered += 1
+                yield t, line
+            if rnd.random() < self.garbage:
+                self.offered += 1
+                yield t, rnd.choice(GARBAGE)
+
+
+def open_sink(args):
+    """Returns (write_lines(list[bytes]), close())."""
+    if args.mode == "pty":
+        import pty, tty
+        master, slave = pty.openpty()
+        tty.setraw(slave)
+        print(f"[FleetSim] pty ready: {os.ttyname(slave)}")
+        return (lambda lines: os.write(master, b"\n".join(lines) + b"\n")), (lambda: os.close(master))
+
+    if args.mode == "port":
+        if not args.port:
+            raise SystemExit("--port is required for --mode port")
+        fd = os.open(args.port, os.O_WRONLY | os.O_NOCTTY)
+        return (lambda lines: os.write(fd, b"\n".join(lines) + b"\n")), (lambda: os.close(fd))
+
+    out = sys.stdout.buffer
+    return (lambda lines: (out.write(b"\n".join(lines) + b"\n"), out.flush())), (lambda: None)
+
+
+def run_inproc(fleet: Fleet, args):
+    from utils import db
+    db.DB_PATH = pathlib.Path(args.db)
+    from services.sim_monitor_service import IngestService
+    from utils.db_writer import DBWriter
+
+    db.init_db()
+    ingest = IngestService(DBWriter(), report=False, retention_days=None)
+    wall0 = time.time()
+    ingest.start(0.0, wall0)
+
+    step = 0.1
+    t = 0.0
+    t_real0 = time.perf_counter()
+    last_report = t_real0
+    last_offered = 0
+    try:
+        while t < args.duration:
+            t_next = t + step
+            batch = [line for _, line in fleet.lines_until(t_next)]
+            now = wall0 + t_next
+            if batch:
+                ingest.on_event(("data", "fleet", now, int(t_next * 1e9), batch), t_next, now)
+            ingest.tick(t_next, now)
+            t = t_next
+
+            if args.speed > 0:
+                delay = t / args.speed - (time.perf_counter() - t_real0)
+                if delay > 0:
+                    time.sleep(delay)
+            real = time.perf_counter()
+            if real - last_report >= 1.0:
+                print(f"[FleetSim] t={t:,.0f}s offered {(fleet.offered - last_offered) / (real - last_report):,.0f} lines/sec")
+                last_report, last_offered = real, fleet.offered
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ingest.close(wall0 + t)
+        print(f"[FleetSim] {ingest.stats()}")
+    return t
+
+
+def run_stream(fleet: Fleet, args):
+    write, close = open_sink(args)
+    step = 0.05
+    t = 0.0
+    t_real0 = time.perf_counter()
+    last_report = t_real0
+    last_offered = 0
+    try:
+        while t < args.duration:
+            t_next = t + step
+            batch = [line for _, line in fleet.lines_until(t_next)]
+            if batch:
+                write(batch)
+            t = t_next
+
+            if args.speed > 0:
+                delay = t / args.speed - (time.perf_counter() - t_real0)
+                if delay > 0:
+                    time.sleep(delay)
+            real = time.perf_counter()
+            if real - last_report >= 1.0 and args.mode != "stdout":
+                print(f"[FleetSim] t={t:,.0f}s offered {(fleet.offered - last_offered) / (real - last_report):,.0f} lines/sec")
+                last_report, last_offered = real, fleet.offered
+    except KeyboardInterrupt:
+        pass
+    finally:
+        close()
+    return t
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Synthetic ESP32 fleet (R/O/S CSV)")
+    ap.add_argument("--sims", type=int, default=100)
+    ap.add_argument("--first-sid", type=int, default=1)
+    ap.add_argument("--period", type=float, default=2.0, help="heartbeat period per sender (s)")
+    ap.add_argument("--jitter", type=float, default=0.2, help="+/- fraction of period")
+    ap.add_argument("--drop", type=float, default=0.0, help="probability a frame is lost")
+    ap.add_argument("--dup", type=float, default=0.0, help="probability a frame is delivered twice")
+    ap.add_argument("--garbage", type=float, default=0.0, help="probability of a noise line after a frame")
+    ap.add_argument("--duration", type=float, default=float("inf"), help="virtual seconds to run")
+    ap.add_argument("--speed", default="1", help="1, N or max")
+    ap.add_argument("--mode", choices=["pty", "port", "stdout", "inproc"], default="pty")
+    ap.add_argument("--port", help="device for --mode port")
+    ap.add_argument("--db", help="scratch SQLite file for --mode inproc (required)")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args(argv)
+    args.speed = 0.0 if args.speed == "max" else float(args.speed)
+    if args.speed <= 0 and args.duration == float("inf") and args.mode == "inproc":
+        raise SystemExit("--speed max needs a --duration")
+    if args.mode == "inproc":
+        from utils import db
+        if not args.db:
+            ap.error("--mode inproc needs --db SCRATCH.db (it must not write into the live sim_monitor.db)")
+        if pathlib.Path(args.db).resolve() == db.DB_PATH.resolve():
+            ap.error(f"--db {args.db} is the live database; use a scratch file")
+
+    fleet = Fleet(args.sims, period=args.period, jitter=args.jitter, drop=args.drop, dup=args.dup,
+                  garbage=args.garbage, seed=args.seed, first_sid=args.first_sid)
+
+    t_real0 = time.perf_counter()
+    t = run_inproc(fleet, args) if args.mode == "inproc" else run_stream(fleet, args)
+    elapsed = time.perf_counter() - t_real0
+
+    print(f"[FleetSim] {args.sims} sims, {t:,.0f}s simulated in {elapsed:.2f}s: "
+          f"{fleet.offered:,} lines offered ({fleet.offered / elapsed:,.0f} lines/sec), "
+          f"{fleet.dropped:,} dropped", file=sys.stderr if args.mode == "stdout" else sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Occupancy: windowed blocks add up to the single-pass matrix."""
+from utils import analytics
+
+
+def _matrix(blocks):
+    rows = None
+    for _, block in blocks:
+        block = [list(r) for r in block]
+        rows = block if rows is None else [a + b for a, b in zip(rows, block)]
+    return rows or []
+
+
+def test_windows_match_whole_range(monkeypatch):
+    start = 1_700_000_000
+    end = start + 6 * 3600 + 17
+    per_sim = analytics.merge_by_sim([
+        (1, start + 5, start + 45),                 # inside one bin
+        (1, start + 100, start + 4000),             # spans windows
+        (2, start, end),                            # whole range
+        (3, start + 3599, start + 3601),
+        (3, start + 3660, start + 3720),            # exactly one bin
+        (4, end - 30, end),
+    ])
+    total = sum(e - s for ivs in per_sim.values() for s, e in ivs)
+
+    sim_ids, whole = analytics.occupancy_matrix(per_sim, start, end, bin_sec=60)
+    whole = [list(r) for r in whole]
+    assert sim_ids == [1, 2, 3, 4]
+    assert len(whole[0]) == 361
+    assert sum(map(sum, whole)) == total
+    assert whole[1][:3] == [60, 60, 60] and whole[1][-1] == 17
+
+    for window_bins in (1, 7, 64, 1000):
+        ids, windows = analytics.occupancy_windows(per_sim, start, end, bin_sec=60, window_bins=window_bins)
+        seen = []
+        blocks = []
+        for b0, block in windows:
+            seen.append(b0)
+            assert len(block[0]) <= window_bins
+            blocks.append((b0, block))
+        assert ids == sim_ids
+        assert seen == list(range(0, 361, window_bins))
+        assert _matrix(blocks) == whole
+
+    monkeypatch.setattr(analytics, "OCCUPANCY_WINDOW_CELLS", 40)
+    _, windows = analytics.occupancy_windows(per_sim, start, end, bin_sec=60)
+    assert [b0 for b0, _ in windows][:3] == [0, 10, 20]     # 40 cells / 4 sims
@@ -0,0 +1,51 @@
+"""Bulk import loads in short chunk transactions; rollups and last_session stay exact."""
+import csv
+import sqlite3
+
+from utils import bulk_import, db, rollups
+
+
+def test_load_releases_the_write_lock_between_chunks(scratch_db, tmp_path, monkeypatch):
+    t0 = 1_700_000_000
+    src = tmp_path / "sessions.csv"
+    with open(src, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["sim_id", "start_ts", "end_ts"])
+        for i in range(1000):
+            w.writerow([i % 4 + 1, t0 + i * 600, t0 + i * 600 + 300 + i])
+
+    live = sqlite3.connect(db.DB_PATH, timeout=0, isolation_level=None)
+    between = []
+
+    def other_writer(_):                        # the service's writer, with no patience at all
+        live.execute("BEGIN IMMEDIATE")
+        live.execute(
+            "INSERT INTO motion_sessions (sim_id, start_ts, end_ts, duration_sec) VALUES (9, ?, ?, 60)",
+            (t0 + len(between), t0 + len(between) + 60)
+        )
+        rollups.add_session(live, 9, t0 + len(between), t0 + len(between) + 60)
+        live.execute("COMMIT")
+        between.append(1)
+
+    monkeypatch.setattr(bulk_import, "LOAD_CHUNK_ROWS", 128)
+    monkeypatch.setattr(bulk_import.time, "sleep", other_writer)
+    result = bulk_import.bulk_import(src, conn=scratch_db, archives=False)
+    live.close()
+
+    assert result["inserted"] == 1000
+    assert len(between) == 8                    # 1000 rows / 128 per chunk
+    assert scratch_db.execute("SELECT COUNT(*) FROM motion_sessions").fetchone()[0] == 1008
+
+    last = dict(scratch_db.execute("SELECT sim_id, end_ts FROM last_session"))
+    for sim in range(1, 5):
+        i = max(i for i in range(1000) if i % 4 + 1 == sim)
+        assert last[sim] == t0 + i * 600 + 300 + i
+
+    live_usage = {t: scratch_db.execute(f"SELECT * FROM {t} ORDER BY 1, 2").fetchall()
+                  for t in ("usage_hourly", "usage_daily")}
+    rollups.rebuild(scratch_db, include_archives=False)
+    assert live_usage == {t: scratch_db.execute(f"SELECT * FROM {t} ORDER BY 1, 2").fetchall()
+                          for t in ("usage_hourly", "usage_daily")}
+
+    again = bulk_import.bulk_import(src, conn=scratch_db, archives=False)
+    assert again["already_stored"] == 1000 and again["inserted"] == 0
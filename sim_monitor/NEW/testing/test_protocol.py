@@ -0,0 +1,27 @@
+"""
+Receiver CSV frame decoder (from sim_monitor/NEW: python -m pytest testing)
+"""
+
+from utils.protocol import (decode_frame, ReceiverFrame, OnlineFrame, StateFrame, Reject,
+                            REJECT_UNKNOWN, REJECT_VALUE, REJECT_INT)
+
+
+def test_frames():
+    assert decode_frame(b"R,1\n") == ReceiverFrame()
+    assert decode_frame(b"O,12,1\r\n") == OnlineFrame(12, True)
+    assert decode_frame(b"O,12,0") == OnlineFrame(12, False)
+    assert decode_frame(b"S,3,2,1,65535") == StateFrame(3, 2, 1, 65535)
+
+
+def test_rejects():
+    assert decode_frame(b"") == Reject("empty", b"")
+    assert decode_frame(b"O,12,2").reason == REJECT_VALUE
+    assert decode_frame(b"S,1,2,x,4").reason == REJECT_INT
+    assert decode_frame(b"X,1").reason == REJECT_UNKNOWN
+
+
+def test_zero_online_frames():
+    # the service has always accepted "0," for "O,"; the Qt reader has not
+    assert decode_frame(b"0,12,1") == OnlineFrame(12, True)
+    assert decode_frame(b"0,12,1", zero_online=False).reason == REJECT_UNKNOWN
+    assert decode_frame(b"O,12,1", zero_online=False) == OnlineFrame(12, True)
@@ -0,0 +1,78 @@
+"""
+Retention moves into monthly archives (from sim_monitor/NEW: python -m pytest testing)
+"""
+
+import calendar, sqlite3
+
+import pytest
+
+from utils import retention
+
+MONTH = calendar.timegm((2024, 3, 1, 0, 0, 0))
+NOW = calendar.timegm((2025, 6, 1, 0, 0, 0))
+ROWS = 3000
+
+
+def _fill(conn, n=ROWS):
+    conn.executemany(
+        "INSERT INTO motion_sessions (sim_id, start_ts, end_ts, duration_sec) VALUES (?, ?, ?, ?)",
+        [(i % 7, MONTH + i * 60, MONTH + i * 60 + 30, 30) for i in range(n)]
+    )
+    conn.commit()
+
+
+def _archive(tmp_path, trigger_sql):
+    """Pre-create the March 2024 archive month with a trigger that sabotages the copy."""
+    path = retention.archive_path(MONTH, tmp_path / "archive")
+    path.parent.mkdir()
+    arch = sqlite3.connect(path)
+    arch.execute(retention.ARCHIVE_TABLE_SQL.format(schema="main"))
+    arch.execute(trigger_sql)
+    arch.commit()
+    arch.close()
+    return path
+
+
+def _count(conn, table="motion_sessions"):
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def _archived(path):
+    arch = sqlite3.connect(path)
+    try:
+        return _count(arch)
+    finally:
+        arch.close()
+
+
+def test_moves_all_rows(scratch_db, tmp_path):
+    _fill(scratch_db)
+    result = retention.run_retention(scratch_db, days=30, now=NOW, directory=tmp_path / "archive",
+                                     batch_rows=700, pause=0)
+    assert result["moved"] == ROWS and result["kept"] == 0
+    assert _count(scratch_db) == 0
+    assert _archived(retention.archive_path(MONTH, tmp_path / "archive")) == ROWS
+
+
+def test_failed_archive_write_keeps_rows(scratch_db, tmp_path):
+    _fill(scratch_db)
+    _archive(tmp_path, """
+        CREATE TRIGGER fail BEFORE INSERT ON motion_sessions
+        BEGIN SELECT RAISE(FAIL, 'disk I/O error'); END
+    """)
+    with pytest.raises(sqlite3.DatabaseError):
+        retention.run_retention(scratch_db, days=30, now=NOW, directory=tmp_path / "archive", pause=0)
+    assert _count(scratch_db) == ROWS
+
+
+def test_rows_missing_from_archive_stay_in_main(scratch_db, tmp_path):
+    # the archive "commits" but only holds every other row: the rest must not be deleted
+    _fill(scratch_db)
+    path = _archive(tmp_path, """
+        CREATE TRIGGER lose AFTER INSERT ON motion_sessions WHEN NEW.id % 2 = 0
+        BEGIN DELETE FROM motion_sessions WHERE id = NEW.id; END
+    """)
+    result = retention.run_retention(scratch_db, days=30, now=NOW, directory=tmp_path / "archive",
+                                     batch_rows=700, pause=0)
+    assert result["moved"] == ROWS // 2 and result["kept"] == ROWS // 2
+    assert _count(scratch_db) + _archived(path) == ROWS
@@ -0,0 +1,68 @@
+"""
+usage_hourly / usage_daily stay in step with motion_sessions whichever path
+closes the session (from sim_monitor/NEW: python -m pytest testing)
+"""
+
+import time
+
+import pytest
+
+from utils import rollups
+
+T0 = 1_717_000_000            # 2024-05-29, 1600 s into an hour
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [T0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    return now
+
+
+def _tables(conn):
+    return {table: conn.execute(f"SELECT * FROM {table} ORDER BY sim_id, bucket_start").fetchall()
+            for table, _, _ in rollups.GRANULARITIES.values()}
+
+
+def _assert_rollups_match_history(conn, sessions: int, seconds: int):
+    live = _tables(conn)
+    assert sum(r[3] for r in live["usage_hourly"]) == sessions
+    assert sum(r[2] for r in live["usage_hourly"]) == seconds
+    assert sum(r[2] for r in live["usage_daily"]) == seconds
+    rollups.rebuild(conn)
+    assert _tables(conn) == live                    # same as recomputing from motion_sessions
+
+
+def test_record_session_splits_buckets(scratch_db):
+    rollups.record_session(scratch_db, 3, T0, T0 + 5000)
+    scratch_db.commit()
+    assert scratch_db.execute("SELECT sim_id, duration_sec FROM motion_sessions").fetchall() == [(3, 5000)]
+    assert len(_tables(scratch_db)["usage_hourly"]) == 2         # 1600 s + 5000 s crosses one hour
+    _assert_rollups_match_history(scratch_db, 1, 5000)
+
+
+def test_qt_serial_reader_path(scratch_db, clock):
+    from utils.serial_handler_qt import _db_update_sim_state
+
+    _db_update_sim_state(scratch_db, 5, 1, 1)       # motion 1 => in motion (Qt reader mapping)
+    clock[0] += 4000
+    _db_update_sim_state(scratch_db, 5, 2, 1)
+    _assert_rollups_match_history(scratch_db, 1, 4000)
+
+
+def test_debug_panel_paths(scratch_db, clock):
+    pytest.importorskip("PyQt5")
+    from utils.debug_panel import DebugControlPanel
+
+    scratch_db.execute("INSERT INTO simulators (sim_id, motion_state, ramp_state, online, last_update_ts) "
+                       "VALUES (9, 1, 1, 1, ?)", (T0,))
+    scratch_db.commit()
+
+    DebugControlPanel.sim_start_motion(None, 9)
+    clock[0] += 1800
+    DebugControlPanel.sim_stop_motion(None, 9)
+    clock[0] += 600
+    DebugControlPanel.sim_start_motion(None, 9)
+    clock[0] += 7200
+    DebugControlPanel.set_sender_online(None, 9, False)
+    _assert_rollups_match_history(scratch_db, 2, 1800 + 7200)
@@ -0,0 +1,46 @@
+"""
+StateCache write/suppress decisions and counters
+(from sim_monitor/NEW: python -m pytest testing)
+"""
+
+from utils.state_cache import StateCache
+
+
+def feed_s_frame(cache, sim_id, motion, ramp, ts):
+    """What IngestService.handle_line does with an accepted S frame."""
+    wrote = cache.sender_state(sim_id, motion, ramp, ts)
+    edge = cache.motion_edge(sim_id, motion, ts)
+    return wrote, edge
+
+
+def test_s_frames_counted_once():
+    cache = StateCache(last_seen_refresh=15)
+    assert feed_s_frame(cache, 1, 1, 2, 100) == (True, None)            # first sight
+    assert feed_s_frame(cache, 1, 1, 2, 101) == (False, None)           # unchanged
+    assert feed_s_frame(cache, 1, 2, 1, 102) == (True, ("start", 102))  # motion starts
+    assert feed_s_frame(cache, 1, 2, 1, 103) == (False, None)
+    assert feed_s_frame(cache, 1, 1, 1, 110) == (True, ("stop", 102))   # motion stops
+    assert feed_s_frame(cache, 1, 1, 1, 126) == (True, None)            # last_seen refresh due
+
+    stats = cache.stats()
+    assert stats["written"] == 4
+    assert stats["suppressed"] == 2
+    assert stats["written"] + stats["suppressed"] == 6                  # one per frame
+    assert stats["suppressed_pct"] == 33.3
+
+
+def test_receiver_activity_counted_once():
+    cache = StateCache(last_seen_refresh=15)
+    for ts in (100, 101, 102):
+        cache.receiver_port("/dev/ttyUSB0", True, ts)
+        cache.receiver(cache.any_receiver_online(), ts)
+    assert cache.receiver_online is True
+    assert (cache.written, cache.suppressed) == (1, 2)
+
+
+def test_expired_senders_count_as_writes():
+    cache = StateCache(last_seen_refresh=15, sender_timeout=60)
+    cache.sender_online(7, True, 100)
+    assert cache.expire_senders(159) == []
+    assert cache.expire_senders(160) == [7]
+    assert (cache.written, cache.suppressed) == (2, 0)
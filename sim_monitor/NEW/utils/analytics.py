@@ -0,0 +1,396 @@
+# utils/analytics.py
+"""
+Fleet utilization analytics (sweep line)
+----------------------------------------
+Works on motion intervals (sim_id, start, end) read ONCE from
+motion_sessions + active_motion (open sessions end "now"), clipped to the
+requested range and merged per sim (merge_by_sim), which every metric takes:
+
+  • concurrency   sort the 2n endpoints once (ends before starts at equal
+                  time, intervals are half-open) and sweep: peak number of
+                  sims in motion, when, and seconds spent at each N-way level
+                  -- O(n log n)
+  • idle gaps     per sim, merge overlapping intervals and measure the gaps
+                  between them (count / total / longest / median)
+  • shifts        utilization % per shift (local-time windows such as
+                  day=6-14) = motion seconds inside the shift windows /
+                  (window seconds * fleet size), two-pointer per sim
+  • occupancy     (sims x bins) matrix of motion seconds per bin (default one
+                  minute), built from a difference array: boundary bins get
+                  partial seconds, full bins come from one cumulative sum.
+                  NumPy does it vectorized when installed; otherwise a pure
+                  Python path gives the same numbers. occupancy_windows()
+                  builds it a window of bins at a time (about
+                  OCCUPANCY_WINDOW_CELLS sims x bins), so a year of minute
+                  bins never sits in memory; --matrix streams the windows
+                  to CSV, one row per bin (bin_start, then one column per sim).
+
+--archives also reads retention archives (utils.retention.attach_history).
+
+CLI (from sim_monitor/NEW):
+  python -m utils.analytics --from 2025-01-01 --to 2026-01-01
+        [--shifts day=6-14,swing=14-22,night=22-6] [--fleet N]
+        [--matrix occupancy.csv --bin 60] [--archives] [--db FILE]
+"""
+
+import time, datetime, pathlib
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+DEFAULT_SHIFTS = "day=6-14,swing=14-22,night=22-6"
+MAX_REPORT_LEVELS = 20         # concurrency levels are grouped into bands beyond this
+OCCUPANCY_WINDOW_CELLS = 2_000_000   # sims x bins per occupancy window (int64: 16 MB)
+
+
+# -----------------------------
+# Loading
+# -----------------------------
+def load_intervals(conn, start_ts: int, end_ts: int, *, now: float | None = None, archives: bool = False) -> list:
+    """[(sim_id, start, end)] overlapping [start_ts, end_ts), clipped to it."""
+    now = int(now if now is not None else time.time())
+    table = "motion_sessions"
+    if archives:
+        from utils import retention
+        table = retention.attach_history(conn, start_ts, end_ts)
+
+    rows = conn.execute(f"""
+        SELECT sim_id, start_ts, end_ts FROM {table}
+        WHERE end_ts > ? AND start_ts < ?
+        UNION ALL
+        SELECT sim_id, start_ts, ? FROM active_motion
+        WHERE start_ts < ?
+    """, (start_ts, end_ts, now, end_ts)).fetchall()
+
+    out = []
+    for sim_id, s, e in rows:
+        if s is None or e is None:
+            continue
+        s = max(int(s), start_ts)
+        e = min(int(e), end_ts)
+        if e > s:
+            out.append((sim_id, s, e))
+    return out
+
+
+def merge_by_sim(intervals) -> dict:
+    """{sim_id: [(start, end), ...]} sorted, overlapping/adjacent intervals merged."""
+    per = {}
+    for sim_id, s, e in intervals:
+        per.setdefault(sim_id, []).append((s, e))
+    for sim_id, ivs in per.items():
+        ivs.sort()
+        merged = [list(ivs[0])]
+        for s, e in ivs[1:]:
+            if s <= merged[-1][1]:
+                if e > merged[-1][1]:
+                    merged[-1][1] = e
+            else:
+                merged.append([s, e])
+        per[sim_id] = [tuple(iv) for iv in merged]
+    return per
+
+
+# -----------------------------
+# Concurrency sweep
+# -----------------------------
+def concurrency(per_sim: dict) -> dict:
+    """
+    Sweep over sorted endpoints of merge_by_sim() output (a sim's own
+    overlapping sessions count once).
+    Returns {"peak": n, "peak_at": ts, "seconds_at": {n: seconds}}.
+    """
+    events = []
+    for ivs in per_sim.values():
+        for s, e in ivs:
+            events.append((s, 1))
+            events.append((e, -1))
+    events.sort()                               # (t, -1) before (t, +1)
+
+    seconds_at = {}
+    level = peak = 0
+    peak_at = None
+    prev_t = None
+    for t, delta in events:
+        if prev_t is not None and t > prev_t:
+            seconds_at[level] = seconds_at.get(level, 0) + (t - prev_t)
+        level += delta
+        if level > peak:
+            peak, peak_at = level, t
+        prev_t = t
+    seconds_at.pop(0, None)
+    return {"peak": peak, "peak_at": peak_at, "seconds_at": dict(sorted(seconds_at.items()))}
+
+
+# -----------------------------
+# Idle gaps
+# -----------------------------
+def idle_gaps(per_sim: dict) -> dict:
+    """{sim_id: {"gaps", "idle_sec", "longest_sec", "median_sec"}} between a sim's sessions."""
+    out = {}
+    for sim_id, ivs in per_sim.items():
+        gaps = sorted(ivs[i + 1][0] - ivs[i][1] for i in range(len(ivs) - 1))
+        out[sim_id] = {
+            "gaps": len(gaps),
+            "idle_sec": sum(gaps),
+            "longest_sec": gaps[-1] if gaps else 0,
+            "median_sec": gaps[len(gaps) // 2] if gaps else 0,
+        }
+    return out
+
+
+# -----------------------------
+# Shift utilization
+# -----------------------------
+def parse_shifts(spec: str) -> list:
+    """"day=6-14,night=22-6" -> [("day", 6, 14), ("night", 22, 6)] (local hours)."""
+    shifts = []
+    for part in spec.split(","):
+        name, hours = part.split("=")
+        a, b = hours.split("-")
+        shifts.append((name.strip(), int(a), int(b)))
+    return shifts
+
+
+def shift_windows(start_ts: int, end_ts: int, from_hour: int, to_hour: int) -> list:
+    """Local-time [start, end) windows of one shift, clipped to the range."""
+    windows = []
+    day = datetime.date.fromtimestamp(start_ts) - datetime.timedelta(days=1)
+    last = datetime.date.fromtimestamp(end_ts)
+    while day <= last:
+        ws = datetime.datetime(day.year, day.month, day.day, from_hour)
+        end_day = day if to_hour > from_hour else day + datetime.timedelta(days=1)
+        we = datetime.datetime(end_day.year, end_day.month, end_day.day, to_hour)
+        s = max(int(ws.timestamp()), start_ts)
+        e = min(int(we.timestamp()), end_ts)
+        if e > s:
+            windows.append((s, e))
+        day += datetime.timedelta(days=1)
+    return windows
+
+
+def _overlap(ivs: list, windows: list) -> int:
+    """Seconds of sorted, disjoint ivs inside sorted, disjoint windows (two pointers)."""
+    total = i = j = 0
+    while i < len(ivs) and j < len(windows):
+        s = max(ivs[i][0], windows[j][0])
+        e = min(ivs[i][1], windows[j][1])
+        if e > s:
+            total += e - s
+        if ivs[i][1] <= windows[j][1]:
+            i += 1
+        else:
+            j += 1
+    return total
+
+
+def shift_utilization(per_sim: dict, start_ts: int, end_ts: int, shifts: list, fleet_size: int) -> dict:
+    """{shift: {"motion_sec", "window_sec", "utilization_pct"}} across the fleet."""
+    out = {}
+    for name, a, b in shifts:
+        windows = shift_windows(start_ts, end_ts, a, b)
+        window_sec = sum(e - s for s, e in windows)
+        motion = sum(_overlap(ivs, windows) for ivs in per_sim.values())
+        capacity = window_sec * max(1, fleet_size)
+        out[name] = {
+            "motion_sec": motion,
+            "window_sec": window_sec,
+            "utilization_pct": round(100.0 * motion / capacity, 2) if capacity else 0.0,
+        }
+    return out
+
+
+# -----------------------------
+# Occupancy matrix
+# -----------------------------
+def occupancy_windows(per_sim: dict, start_ts: int, end_ts: int, *, bin_sec: int = 60,
+                      sims: list | None = None, window_bins: int | None = None):
+    """
+    (sim_ids, windows): windows yields (first_bin, block) in bin order, with
+    block[row][b] = motion seconds of sim_ids[row] in bin first_bin + b,
+    i.e. [start_ts + (first_bin+b)*bin_sec, +bin_sec). Each block covers
+    window_bins bins (default OCCUPANCY_WINDOW_CELLS / sims) and is built
+    only when the previous one has been consumed.
+    """
+    sim_ids = sorted(set(sims) if sims is not None else per_sim)
+    row_of = {sid: r for r, sid in enumerate(sim_ids)}
+    n_bins = max(0, -(-(end_ts - start_ts) // bin_sec))
+    if window_bins is None:
+        window_bins = max(1, OCCUPANCY_WINDOW_CELLS // max(1, len(sim_ids)))
+
+    ivs = []                                    # (start offset, end offset, row) by start
+    for sid, merged in per_sim.items():
+        r = row_of.get(sid)
+        if r is None:
+            continue
+        ivs.extend((s - start_ts, e - start_ts, r) for s, e in merged)
+    ivs.sort()
+    build = _occupancy_numpy if np is not None else _occupancy_python
+
+    def windows():
+        nxt, active = 0, []
+        for b0 in range(0, n_bins, window_bins):
+            n = min(window_bins, n_bins - b0)
+            lo, hi = b0 * bin_sec, (b0 + n) * bin_sec
+            while nxt < len(ivs) and ivs[nxt][0] < hi:
+                active.append(ivs[nxt])
+                nxt += 1
+            # clip to the window; offsets relative to its first bin
+            rows = [r for _, _, r in active]
+            s_off = [max(s, lo) - lo for s, _, _ in active]
+            e_off = [min(e, hi) - lo for _, e, _ in active]
+            active = [iv for iv in active if iv[1] > hi]
+            yield b0, build(len(sim_ids), n, bin_sec, rows, s_off, e_off)
+
+    return sim_ids, windows()
+
+
+def occupancy_matrix(per_sim: dict, start_ts: int, end_ts: int, *, bin_sec: int = 60, sims: list | None = None):
+    """
+    (sim_ids, matrix) with matrix[row][bin] = motion seconds of sim_ids[row]
+    in [start_ts + bin*bin_sec, +bin_sec). numpy.ndarray when NumPy is
+    installed, else a list of lists. Holds the whole range; long ranges
+    should go through occupancy_windows().
+    """
+    sim_ids, windows = occupancy_windows(per_sim, start_ts, end_ts, bin_sec=bin_sec, sims=sims)
+    blocks = [block for _, block in windows]
+    if np is not None:
+        if not blocks:
+            return sim_ids, np.zeros((len(sim_ids), 0), dtype=np.int64)
+        return sim_ids, np.concatenate(blocks, axis=1)
+    matrix = [[] for _ in sim_ids]
+    for block in blocks:
+        for row, part in zip(matrix, block):
+            row.extend(part)
+    return sim_ids, matrix
+
+
+def _occupancy_numpy(n_rows, n_bins, bin_sec, rows, s_off, e_off):
+    occ = np.zeros((n_rows, n_bins + 1), dtype=np.int64)
+    if not rows:
+        return occ[:, :n_bins]
+    r = np.asarray(rows, dtype=np.int64)
+    s = np.asarray(s_off, dtype=np.int64)
+    e = np.asarray(e_off, dtype=np.int64)
+    sb, eb = s // bin_sec, e // bin_sec
+
+    same = sb == eb
+    np.add.at(occ, (r[same], sb[same]), (e - s)[same])
+
+    r, s, e, sb, eb = r[~same], s[~same], e[~same], sb[~same], eb[~same]
+    np.add.at(occ, (r, sb), (sb + 1) * bin_sec - s)          # partial first bin
+    np.add.at(occ, (r, eb), e - eb * bin_sec)                # partial last bin
+
+    # full bins sb+1 .. eb-1 through a difference array + one in-place cumsum
+    full = np.zeros_like(occ)
+    inner = eb > sb + 1
+    np.add.at(full, (r[inner], sb[inner] + 1), bin_sec)
+    np.add.at(full, (r[inner], eb[inner]), -bin_sec)
+    occ += np.cumsum(full, axis=1, out=full)
+    return occ[:, :n_bins]
+
+
+def _occupancy_python(n_rows, n_bins, bin_sec, rows, s_off, e_off):
+    occ = [[0] * (n_bins + 1) for _ in range(n_rows)]
+    full = [[0] * (n_bins + 1) for _ in range(n_rows)]
+    for r, s, e in zip(rows, s_off, e_off):
+        sb, eb = s // bin_sec, e // bin_sec
+        if sb == eb:
+            occ[r][sb] += e - s
+            continue
+        occ[r][sb] += (sb + 1) * bin_sec - s
+        occ[r][eb] += e - eb * bin_sec
+        if eb > sb + 1:
+            full[r][sb + 1] += bin_sec
+            full[r][eb] -= bin_sec
+    for r in range(n_rows):
+        row, acc = occ[r], 0
+        for b, d in enumerate(full[r]):
+            acc += d
+            row[b] += acc
+        del row[n_bins:]
+    return occ
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+def _parse_day(text: str) -> int:
+    return int(datetime.datetime.strptime(text, "%Y-%m-%d").timestamp())
+
+
+def _fmt_dur(sec: float) -> str:
+    return f"{sec / 3600:,.1f} h"
+
+
+def main(argv=None):
+    import argparse, csv
+    from utils import db
+
+    ap = argparse.ArgumentParser(description="Fleet concurrency / utilization over a date range")
+    ap.add_argument("--from", dest="start", required=True, help="YYYY-MM-DD (local, inclusive)")
+    ap.add_argument("--to", dest="end", required=True, help="YYYY-MM-DD (local, exclusive)")
+    ap.add_argument("--shifts", default=DEFAULT_SHIFTS, help="name=H-H,... local hours")
+    ap.add_argument("--fleet", type=int, help="fleet size for utilization (default: rows in simulators)")
+    ap.add_argument("--matrix", metavar="CSV", help="write the per-bin occupancy matrix")
+    ap.add_argument("--bin", type=int, default=60, help="occupancy bin size in seconds")
+    ap.add_argument("--archives", action="store_true", help="include retention archive files")
+    ap.add_argument("--db", help="SQLite file (default sim_monitor.db)")
+    args = ap.parse_args(argv)
+
+    if args.db:
+        db.DB_PATH = pathlib.Path(args.db)
+    conn = db.get_conn(readonly=True)
+    start_ts, end_ts = _parse_day(args.start), _parse_day(args.end)
+
+    t0 = time.perf_counter()
+    intervals = load_intervals(conn, start_ts, end_ts, archives=args.archives)
+    t_load = time.perf_counter() - t0
+
+    fleet = args.fleet or conn.execute("SELECT COUNT(*) FROM simulators").fetchone()[0]
+    per_sim = merge_by_sim(intervals)
+    conc = concurrency(per_sim)
+    gaps = idle_gaps(per_sim)
+    shifts = shift_utilization(per_sim, start_ts, end_ts, parse_shifts(args.shifts), fleet)
+
+    print(f"[Analytics] {args.start} .. {args.end}: {len(intervals):,} intervals, fleet {fleet}")
+    peak_at = time.strftime("%Y-%m-%d %H:%M", time.localtime(conc["peak_at"])) if conc["peak_at"] else "-"
+    print(f"Peak concurrency: {conc['peak']} sims at {peak_at}")
+    band = max(1, -(-conc["peak"] // MAX_REPORT_LEVELS))
+    bands = {}
+    for n, sec in conc["seconds_at"].items():
+        lo = (n - 1) // band * band + 1
+        bands[lo] = bands.get(lo, 0) + sec
+    for lo, sec in bands.items():
+        label = f"{lo}" if band == 1 else f"{lo}-{lo + band - 1}"
+        print(f"  {label:>9s}-way: {sec / 60:12,.0f} min")
+    print("Utilization by shift:")
+    for name, u in shifts.items():
+        print(f"  {name:8s} {u['utilization_pct']:6.2f} %  ({_fmt_dur(u['motion_sec'])} of {_fmt_dur(u['window_sec'] * fleet)})")
+    print("Idle gaps per sim:")
+    for sid, g in sorted(gaps.items()):
+        print(f"  SIM {sid:3d}: {g['gaps']:5d} gaps, idle {_fmt_dur(g['idle_sec'])}, "
+              f"longest {_fmt_dur(g['longest_sec'])}, median {g['median_sec'] / 60:,.0f} min")
+
+    if args.matrix:
+        sim_ids, windows = occupancy_windows(per_sim, start_ts, end_ts, bin_sec=args.bin)
+        n_bins = 0
+        with open(args.matrix, "w", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(["bin_start"] + sim_ids)
+            for b0, block in windows:                   # one row per bin, window by window
+                cols = block.T.tolist() if np is not None else zip(*block)
+                for b, col in enumerate(cols, b0):
+                    w.writerow([start_ts + b * args.bin] + list(col))
+                    n_bins += 1
+        print(f"[Analytics] Occupancy matrix {n_bins} bins x {len(sim_ids)} sims -> {args.matrix}")
+
+    print(f"[Analytics] load {t_load:.2f}s, total {time.perf_counter() - t0:.2f}s "
+          f"({'numpy' if np is not None else 'pure python'} occupancy)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+# utils/bulk_import.py
+"""
+Bulk import of historical motion_sessions
+-----------------------------------------
+Re-creates history on a new Pi, or merges an old Pi's history, from a CSV
+file (utils.export output or any file with sim_id,start_ts,end_ts
+[,duration_sec] columns, epoch seconds) or another sim_monitor.db.
+
+  1. stage    rows stream in (fetchmany / csv reader) and go into a TEMP
+              table keyed (sim_id, start_ts) with executemany, BATCH_ROWS
+              per transaction -- duplicates inside the input collapse here
+  2. dedup    staged rows already present in motion_sessions (or in a
+              retention archive month) are deleted from the stage
+  3. load     LOAD_CHUNK_ROWS stage rows at a time, in stage key order,
+              each chunk its own short write transaction on the live DB:
+                • rows go into motion_sessions with executemany; indexes
+                  and the last_session trigger stay in place (the service
+                  reads and writes between chunks)
+                • the usage rollups get the same rows (rollups.add_sessions)
+              A chunk commits its sessions and their rollups together. The
+              write lock is released between chunks (LOAD_PAUSE_SEC), so
+              the service's DB writer only ever waits for one chunk, well
+              inside its busy timeout. An interrupted import keeps the
+              chunks already committed; running it again de-duplicates
+              them and loads the rest.
+
+Source ids are not kept; imported rows get new ids.
+
+CLI (from sim_monitor/NEW):
+  python -m utils.bulk_import old_pi.db | sessions.csv [--dry-run] [--no-archives] [--db FILE]
+"""
+
+import csv, sqlite3, time, pathlib
+
+from utils import db, rollups
+
+
+BATCH_ROWS = 50000             # staged rows per transaction / fetchmany
+LOAD_CHUNK_ROWS = 5000         # rows per load transaction (bounds the writer's wait)
+LOAD_PAUSE_SEC = 0.01          # let other writers in between load chunks
+LOAD_CACHE_KIB = 64 * 1024     # page cache for index maintenance during the load
+
+_STAGE_SQL = """
+CREATE TEMP TABLE IF NOT EXISTS _import (
+    sim_id INTEGER NOT NULL,
+    start_ts INTEGER NOT NULL,
+    end_ts INTEGER NOT NULL,
+    duration_sec INTEGER,
+    PRIMARY KEY (sim_id, start_ts)
+) WITHOUT ROWID
+"""
+
+
+# -----------------------------
+# Sources
+# -----------------------------
+def _clean(sim_id, start_ts, end_ts, duration_sec=None):
+    """(sim_id, start_ts, end_ts, duration_sec) as ints, or None for an unusable row."""
+    try:
+        sim_id, start_ts, end_ts = int(sim_id), int(float(start_ts)), int(float(end_ts))
+    except (TypeError, ValueError):
+        return None
+    if end_ts < start_ts:
+        return None
+    try:
+        duration_sec = int(float(duration_sec))
+    except (TypeError, ValueError):
+        duration_sec = end_ts - start_ts
+    return sim_id, start_ts, end_ts, duration_sec
+
+
+def read_csv(path, batch_rows: int = BATCH_ROWS):
+    """Yield (rows, skipped) batches from a CSV with a header row."""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        missing = {"sim_id", "start_ts", "end_ts"} - set(reader.fieldnames or ())
+        if missing:
+            raise ValueError(f"{path}: missing columns {sorted(missing)}")
+        rows, skipped = [], 0
+        for rec in reader:
+            row = _clean(rec["sim_id"], rec["start_ts"], rec["end_ts"], rec.get("duration_sec"))
+            if row is None:
+                skipped += 1
+                continue
+            rows.append(row)
+            if len(rows) >= batch_rows:
+                yield rows, skipped
+                rows, skipped = [], 0
+        if rows or skipped:
+            yield rows, skipped
+
+
+def read_db(path, batch_rows: int = BATCH_ROWS):
+    """Yield (rows, skipped) batches from another sim_monitor.db (opened read-only)."""
+    src = sqlite3.connect(f"{pathlib.Path(path).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        cur = src.execute("SELECT sim_id, start_ts, end_ts, duration_sec FROM motion_sessions")
+        while True:
+            batch = cur.fetchmany(batch_rows)
+            if not batch:
+                break
+            rows = [r for r in (_clean(*b) for b in batch) if r is not None]
+            yield rows, len(batch) - len(rows)
+    finally:
+        src.close()
+
+
+def read_source(path, batch_rows: int = BATCH_ROWS):
+    path = pathlib.Path(path)
+    with open(path, "rb") as f:
+        is_sqlite = f.read(16) == b"SQLite format 3\x00"
+    return read_db(path, batch_rows) if is_sqlite else read_csv(path, batch_rows)
+
+
+# -----------------------------
+# Import
+# -----------------------------
+def _stage(conn, batches) -> dict:
+    conn.execute(_STAGE_SQL)
+    conn.execute("DELETE FROM temp._import")
+    conn.commit()
+    read = skipped = 0
+    for rows, bad in batches:
+        skipped += bad
+        read += len(rows)
+        conn.executemany(
+            "INSERT OR IGNORE INTO temp._import (sim_id, start_ts, end_ts, duration_sec) VALUES (?, ?, ?, ?)",
+            rows
+        )
+        conn.commit()
+    staged = conn.execute("SELECT COUNT(*) FROM temp._import").fetchone()[0]
+    return {"read": read, "skipped": skipped, "duplicates_in_source": read - staged}
+
+
+def _dedup(conn, archives: bool) -> int:
+    """Drop staged rows already stored (hot DB, and archive months when asked); returns rows dropped."""
+    dropped = conn.execute("""
+        DELETE FROM temp._import
+        WHERE (sim_id, start_ts) IN (SELECT sim_id, start_ts FROM main.motion_sessions)
+    """).rowcount
+    conn.commit()
+
+    if archives:
+        from utils import retention
+        for path in retention.list_archives():
+            conn.execute("ATTACH DATABASE ? AS imp_arch", (str(path),))
+            try:
+                dropped += conn.execute("""
+                    DELETE FROM temp._import
+                    WHERE (sim_id, start_ts) IN (SELECT sim_id, start_ts FROM imp_arch.motion_sessions)
+                """).rowcount
+                conn.commit()
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                conn.execute("DETACH DATABASE imp_arch")
+    return dropped
+
+
+def _load(conn) -> int:
+    """Move the stage into motion_sessions, LOAD_CHUNK_ROWS per transaction; returns rows inserted."""
+    cache_size = conn.execute("PRAGMA cache_size").fetchone()[0]
+    conn.execute(f"PRAGMA cache_size={-LOAD_CACHE_KIB}")
+    inserted = 0
+    last = (-1 << 63, -1 << 63)
+    try:
+        while True:
+            rows = conn.execute("""
+                SELECT sim_id, start_ts, end_ts, duration_sec FROM temp._import
+                WHERE (sim_id, start_ts) > (?, ?)
+                ORDER BY sim_id, start_ts LIMIT ?
+            """, (*last, LOAD_CHUNK_ROWS)).fetchall()
+            if not rows:
+                break
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # trg_motion_sessions_last keeps last_session current row by row
+                conn.executemany(
+                    "INSERT INTO motion_sessions (sim_id, start_ts, end_ts, duration_sec) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                rollups.add_sessions(conn, [(sim_id, s, e) for sim_id, s, e, _ in rows])
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            inserted += len(rows)
+            last = rows[-1][:2]
+            if LOAD_PAUSE_SEC:
+                time.sleep(LOAD_PAUSE_SEC)
+    finally:
+        conn.execute(f"PRAGMA cache_size={cache_size}")
+    return inserted
+
+
+def bulk_import(source, *, conn=None, archives: bool = True, dry_run: bool = False,
+                batch_rows: int = BATCH_ROWS) -> dict:
+    """
+    Import motion_sessions rows from a CSV file or another sim_monitor.db,
+    skipping (sim_id, start_ts) pairs already present. Returns counters and
+    timings; "inserted" is 0 on a dry run.
+    """
+    conn = conn or db.get_conn()
+    if conn.in_transaction:
+        conn.commit()
+
+    t0 = time.perf_counter()
+    result = _stage(conn, read_source(source, batch_rows))
+    result["already_stored"] = _dedup(conn, archives)
+    t1 = time.perf_counter()
+
+    result["inserted"] = 0 if dry_run else _load(conn)
+    t2 = time.perf_counter()
+
+    conn.execute("DELETE FROM temp._import")
+    conn.commit()
+    result["stage_sec"] = round(t1 - t0, 2)
+    result["load_sec"] = round(t2 - t1, 2)
+    result["rows_per_sec"] = round(result["read"] / max(t2 - t0, 1e-9))
+    return result
+
+
+def main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Bulk-import motion_sessions from CSV or another sim_monitor.db")
+    ap.add_argument("source", help="CSV file or SQLite file")
+    ap.add_argument("--dry-run", action="store_true", help="stage and de-duplicate only, write nothing")
+    ap.add_argument("--no-archives", action="store_true", help="do not de-duplicate against archive months")
+    ap.add_argument("--db", help="SQLite file (default sim_monitor.db)")
+    args = ap.parse_args(argv)
+
+    if args.db:
+        db.DB_PATH = pathlib.Path(args.db)
+    db.init_db()
+
+    try:
+        result = bulk_import(args.source, archives=not args.no_archives, dry_run=args.dry_run)
+    except ValueError as e:
+        ap.error(str(e))
+    print(f"[Import] {args.source}: {result['read']:,} rows read, {result['skipped']:,} unusable, "
+          f"{result['duplicates_in_source']:,} duplicate in source, {result['already_stored']:,} already stored, "
+          f"{result['inserted']:,} inserted{' (dry run)' if args.dry_run else ''}")
+    print(f"[Import] stage {result['stage_sec']:.2f}s, load {result['load_sec']:.2f}s, "
+          f"{result['rows_per_sec']:,} rows/s")
+
+
+if __name__ == "__main__":
+    main()
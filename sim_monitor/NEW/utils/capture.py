@@ -0,0 +1,125 @@
+# utils/capture.py
+"""
+Raw receiver capture files
+--------------------------
+Compact binary log of every raw line the service receives, for offline
+replay of production incidents (see `sim_monitor_service.py replay`).
+
+File layout (little-endian):
+  header   "SMCAP1" | wall_ns i64 | mono_ns i64     (clock anchor at file open)
+  record   mono_ns i64 | kind u8 | port u8 | len u16 | payload[len]
+
+  kind 0 = LINE  payload is the raw line (no newline), port is a port index
+  kind 1 = PORT  payload is the port name for index `port` (once per file)
+
+Record timestamps are time.monotonic_ns(); wall time is recovered from the
+file's anchor. Files rotate at CAPTURE_MAX_BYTES and only the newest
+CAPTURE_KEEP files are kept.
+"""
+
+import struct, time, datetime, pathlib
+
+
+MAGIC = b"SMCAP1"
+_HEADER = struct.Struct("<6sqq")
+_RECORD = struct.Struct("<qBBH")
+
+KIND_LINE = 0
+KIND_PORT = 1
+
+CAPTURE_MAX_BYTES = 64 * 1024 * 1024
+CAPTURE_KEEP = 50
+
+
+def list_captures(directory) -> list:
+    return sorted(pathlib.Path(directory).glob("cap_*.bin"))
+
+
+class CaptureWriter:
+    def __init__(self, directory, *, max_bytes: int = CAPTURE_MAX_BYTES, keep: int = CAPTURE_KEEP):
+        self.dir = pathlib.Path(directory)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.keep = keep
+
+        self._f = None
+        self._size = 0
+        self._ports = {}                # port name -> index (per file)
+        self.records = 0
+        self.files = 0
+
+    def _open(self):
+        self.close()
+        name = datetime.datetime.now().strftime("cap_%Y%m%d_%H%M%S_%f.bin")
+        self.path = self.dir / name
+        self._f = open(self.path, "wb", buffering=64 * 1024)
+        self._f.write(_HEADER.pack(MAGIC, time.time_ns(), time.monotonic_ns()))
+        self._size = _HEADER.size
+        self._ports = {}
+        self.files += 1
+
+        # rotate out the oldest files
+        old = list_captures(self.dir)
+        for p in old[:max(0, len(old) - self.keep)]:
+            try:
+                p.unlink()
+            except OSError:
+                pass
+
+    def _record(self, mono_ns: int, kind: int, port: int, payload: bytes):
+        payload = payload[:0xFFFF]
+        self._f.write(_RECORD.pack(mono_ns, kind, port, len(payload)))
+        self._f.write(payload)
+        self._size += _RECORD.size + len(payload)
+
+    def write(self, port: str, mono_ns: int, line: bytes):
+        if self._f is None or self._size >= self.max_bytes:
+            self._open()
+
+        idx = self._ports.get(port)
+        if idx is None:
+            idx = self._ports[port] = len(self._ports) & 0xFF
+            self._record(mono_ns, KIND_PORT, idx, port.encode())
+
+        self._record(mono_ns, KIND_LINE, idx, line)
+        self.records += 1
+
+    def flush(self):
+        if self._f is not None:
+            self._f.flush()
+
+    def close(self):
+        if self._f is not None:
+            try:
+                self._f.close()
+            finally:
+                self._f = None
+
+
+def iter_capture(paths):
+    """
+    Yield (port, mono_ns, wall_ns, line) for every LINE record, file by file.
+    A truncated tail (service killed mid-write) ends that file quietly.
+    """
+    for path in paths:
+        with open(path, "rb") as f:
+            head = f.read(_HEADER.size)
+            if len(head) < _HEADER.size:
+                continue
+            magic, wall0, mono0 = _HEADER.unpack(head)
+            if magic != MAGIC:
+                raise ValueError(f"{path}: not a capture file")
+
+            ports = {}
+            while True:
+                rec = f.read(_RECORD.size)
+                if len(rec) < _RECORD.size:
+                    break
+                mono_ns, kind, port, n = _RECORD.unpack(rec)
+                payload = f.read(n)
+                if len(payload) < n:
+                    break
+                if kind == KIND_PORT:
+                    ports[port] = payload.decode(errors="replace")
+                elif kind == KIND_LINE:
+                    yield ports.get(port, str(port)), mono_ns, wall0 + (mono_ns - mono0), payload
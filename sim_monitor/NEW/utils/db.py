@@ -1,11 +1,88 @@
-import sqlite3, time, pathlib
+"""
+SQLite access for sim_monitor.db
+--------------------------------
+Three actors share one file: the ingest service's writer thread, the GUI
+refresh and the debug panel. Every connection is configured for that:
+
+  • journal_mode=WAL      readers never block the writer (and vice versa)
+  • synchronous=NORMAL    fsync at checkpoints, not on every commit
+  • busy_timeout          wait for a lock instead of "database is locked"
+  • mmap_size             reads served from the page cache
+  • auto_vacuum=INCREMENTAL (new files) so retention can hand pages back
+
+get_conn(readonly=False) hands out a pooled, thread-affine connection: each
+thread gets one read-write and/or one read-only connection per DB_PATH and
+keeps it for its lifetime. Callers keep the usual pattern -- close() just
+rolls back anything uncommitted and returns it to the pool. Read-only
+connections (mode=ro + query_only) are what the GUI should use to poll.
+
+close_thread_conns() really closes the calling thread's connections.
+
+init_db() creates the baseline tables; everything added since is a step in
+utils.migrations, applied on top via PRAGMA user_version.
+"""
+
+import sqlite3, time, pathlib, threading
+
+from utils.migrations import migrate
 
 DB_PATH = pathlib.Path(__file__).parent.parent / "sim_monitor.db"
 
+BUSY_TIMEOUT_MS = 5000
+MMAP_SIZE = 64 * 1024 * 1024
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() returns it to the thread's pool."""
+
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
 
-def get_conn():
-    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    return sqlite3.connect(DB_PATH)
+    def really_close(self):
+        super().close()
+
+
+_pool = threading.local()
+
+
+def _open(readonly: bool) -> PooledConnection:
+    if readonly:
+        conn = sqlite3.connect(f"{DB_PATH.resolve().as_uri()}?mode=ro", uri=True,
+                               factory=PooledConnection, timeout=BUSY_TIMEOUT_MS / 1000)
+        conn.execute("PRAGMA query_only=ON")
+    else:
+        DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+        fresh = not DB_PATH.exists()
+        conn = sqlite3.connect(DB_PATH, factory=PooledConnection, timeout=BUSY_TIMEOUT_MS / 1000)
+        if fresh:
+            # only takes effect before the first table; older DBs: utils.retention --enable-incremental-vacuum
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    return conn
+
+
+def get_conn(readonly: bool = False) -> PooledConnection:
+    conns = getattr(_pool, "conns", None)
+    if conns is None:
+        conns = _pool.conns = {}
+    key = (str(DB_PATH), readonly)
+    conn = conns.get(key)
+    if conn is None:
+        conn = conns[key] = _open(readonly)
+    return conn
+
+
+def close_thread_conns():
+    for conn in getattr(_pool, "conns", {}).values():
+        try:
+            conn.really_close()
+        except Exception:
+            pass
+    _pool.conns = {}
 
 
 def init_db():
@@ -47,10 +124,80 @@ def init_db():
     )
     """)
 
+    # Per-port receiver state (multi-receiver service); system_status id=1
+    # stays as the "any receiver online" flag the GUI reads
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS receivers (
+        port TEXT PRIMARY KEY,
+        online INTEGER,
+        last_seen INTEGER
+    )
+    """)
+
+    # ESP-NOW link quality per sender, one row per stats window
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS link_stats (
+        sim_id INTEGER,
+        window_start INTEGER,
+        window_end INTEGER,
+        received INTEGER,
+        lost INTEGER,
+        duplicates INTEGER,
+        reordered INTEGER,
+        gaps INTEGER,
+        restarts INTEGER,
+        PRIMARY KEY (sim_id, window_start)
+    )
+    """)
+
     cur.execute("""
         INSERT OR IGNORE INTO system_status (id, receiver_online, last_seen)
         VALUES (1, 0, 0)
     """)
 
     conn.commit()
+
+    # Indexes, derived tables, ... (PRAGMA user_version, utils.migrations)
+    migrate(conn)
     conn.close()
+
+
+# -----------------------------
+# GUI snapshot
+# -----------------------------
+def data_version(conn) -> int:
+    """
+    PRAGMA data_version: changes whenever ANOTHER connection commits to the
+    file. Only comparable on the same (persistent) connection; a read of the
+    WAL index, no table pages touched.
+    """
+    return conn.execute("PRAGMA data_version").fetchone()[0]
+
+
+_SNAPSHOT_SQL = """
+    SELECT st.receiver_online,
+           s.sim_id, s.motion_state, s.ramp_state, s.online, s.last_update_ts,
+           a.start_ts,
+           m.end_ts, m.duration_sec
+    FROM system_status st
+    LEFT JOIN simulators s
+    LEFT JOIN active_motion a ON a.sim_id = s.sim_id
+    LEFT JOIN last_session m ON m.sim_id = s.sim_id
+    WHERE st.id = 1
+"""
+
+
+def fleet_snapshot(conn=None):
+    """
+    Whole fleet in one query (one consistent read):
+      (receiver_online, {sim_id: (motion_state, ramp_state, online, last_update_ts,
+                                  motion_start_ts, last_end_ts, last_duration)})
+    Sims missing from the dict have never been seen.
+    """
+    if conn is None:
+        conn = get_conn(readonly=True)
+    rows = conn.execute(_SNAPSHOT_SQL).fetchall()
+
+    receiver_online = bool(rows[0][0]) if rows else False
+    sims = {r[1]: r[2:] for r in rows if r[1] is not None}
+    return receiver_online, sims
@@ -0,0 +1,169 @@
+# utils/db_poller.py
+"""
+Background fleet poller for the GUI
+-----------------------------------
+Keeps SQLite off the Qt GUI thread. DBPoller lives on its own QThread:
+
+  • it owns that thread's pooled read-only connection (utils.db.get_conn)
+  • change-driven: every CHECK_INTERVAL_MS it reads PRAGMA data_version on
+    that persistent connection (bumped by any other connection's commit,
+    i.e. the service's writer or the debug panel) and runs fleet_snapshot()
+    only when it moved -- a steady hangar costs one pragma per check, and a
+    change shows up within ~100 ms instead of up to 1 s
+  • a snapshot is still taken every FORCE_SNAPSHOT_MS as a safety net
+  • each snapshot is an immutable FleetSnapshot emitted through
+    snapshot_ready; the connection to MainWindow is queued, so the GUI only
+    ever applies finished snapshots
+  • a lock wait or slow SD-card read now delays a snapshot, not the clock,
+    the animations or input
+  • each snapshot carries its read latency; stats() has last / max / avg
+    plus checks vs snapshots, so storage stalls are visible
+
+Time-only changes (the "In motion for" counter) are not DB changes; the
+GUI re-renders those from its clock tick.
+
+Usage (MainWindow):
+    self.db_thread, self.db_poller = start_db_poller(self, self.apply_snapshot)
+    ...
+    stop_db_poller(self.db_thread, self.db_poller)
+"""
+
+import time, types
+from typing import NamedTuple
+
+from PyQt5.QtCore import QObject, QThread, QTimer, Qt, QMetaObject, pyqtSignal, pyqtSlot
+
+from utils.db import get_conn, close_thread_conns, fleet_snapshot, data_version
+
+
+CHECK_INTERVAL_MS = 100        # data_version check period
+FORCE_SNAPSHOT_MS = 30000      # full snapshot at least this often
+SLOW_POLL_MS = 250             # log snapshots slower than this
+
+
+class FleetSnapshot(NamedTuple):
+    receiver_online: bool
+    sims: types.MappingProxyType   # sim_id -> (motion, ramp, online, last_update_ts,
+                                   #            motion_start_ts, last_end_ts, last_duration)
+    taken_at: float                # time.time() when the read finished
+    latency_ms: float              # how long the read took
+    seq: int
+
+
+class DBPoller(QObject):
+    snapshot_ready = pyqtSignal(object)     # FleetSnapshot
+    poll_failed = pyqtSignal(str)
+
+    def __init__(self, *, interval_ms: int = CHECK_INTERVAL_MS, force_ms: int = FORCE_SNAPSHOT_MS):
+        super().__init__()
+        self.interval_ms = interval_ms
+        self.force_ms = force_ms
+        self._timer = None
+        self._version = None           # data_version seen at the last snapshot
+        self._last_snapshot = 0.0      # perf_counter of the last snapshot
+        self._failing = False          # report a failing check / poll once, not 10x a second
+        self.checks = 0
+        self.polls = 0
+        self.failures = 0
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+        self._total_ms = 0.0
+
+    @pyqtSlot()
+    def start(self):
+        # created here so the timer belongs to (and fires on) the poller's thread
+        self._timer = QTimer(self)
+        self._timer.setInterval(self.interval_ms)
+        self._timer.timeout.connect(self.check)
+        self._timer.start()
+        self.poll()
+
+    @pyqtSlot()
+    def stop(self):
+        if self._timer is not None:
+            self._timer.stop()
+        close_thread_conns()
+
+    @pyqtSlot()
+    def check(self):
+        """Timer tick: snapshot only if another connection committed (or the safety interval passed)."""
+        self.checks += 1
+        try:
+            version = data_version(get_conn(readonly=True))
+        except Exception as exc:
+            self.failures += 1
+            if not self._failing:
+                self._failing = True
+                self.poll_failed.emit(str(exc))
+            return
+        overdue = (time.perf_counter() - self._last_snapshot) * 1000.0 >= self.force_ms
+        if version != self._version or overdue:
+            self.poll()
+
+    @pyqtSlot()
+    def poll(self):
+        """Take and emit a snapshot now."""
+        t0 = time.perf_counter()
+        try:
+            conn = get_conn(readonly=True)
+            # version first: a commit landing during the read triggers one more snapshot
+            version = data_version(conn)
+            receiver_online, sims = fleet_snapshot(conn)
+        except Exception as exc:
+            self.failures += 1
+            self._version = None
+            if not self._failing:
+                self._failing = True
+                self.poll_failed.emit(str(exc))
+            return
+        self._version = version
+        self._failing = False
+        self._last_snapshot = time.perf_counter()
+        ms = (self._last_snapshot - t0) * 1000.0
+
+        self.polls += 1
+        self.last_ms = ms
+        self.max_ms = max(self.max_ms, ms)
+        self._total_ms += ms
+        if ms > SLOW_POLL_MS:
+            print(f"[DBPoller] slow poll: {ms:.0f} ms")
+
+        self.snapshot_ready.emit(FleetSnapshot(
+            receiver_online=receiver_online,
+            sims=types.MappingProxyType(sims),
+            taken_at=time.time(),
+            latency_ms=ms,
+            seq=self.polls,
+        ))
+
+    def stats(self) -> dict:
+        return {
+            "checks": self.checks,
+            "polls": self.polls,
+            "failures": self.failures,
+            "last_ms": round(self.last_ms, 2),
+            "max_ms": round(self.max_ms, 2),
+            "avg_ms": round(self._total_ms / self.polls, 2) if self.polls else 0.0,
+        }
+
+
+def start_db_poller(parent, on_snapshot, *, interval_ms: int = CHECK_INTERVAL_MS, on_error=None):
+    """Start a DBPoller on a new QThread; returns (thread, poller)."""
+    thread = QThread(parent)
+    thread.setObjectName("db-poller")
+    poller = DBPoller(interval_ms=interval_ms)
+    poller.moveToThread(thread)
+    thread.started.connect(poller.start)
+    poller.snapshot_ready.connect(on_snapshot, Qt.QueuedConnection)
+    if on_error is not None:
+        poller.poll_failed.connect(on_error, Qt.QueuedConnection)
+    thread.start()
+    return thread, poller
+
+
+def stop_db_poller(thread, poller, *, timeout_ms: int = 2000):
+    """Stop the timer and close the connection on the poller's thread, then end the thread."""
+    if thread.isRunning():
+        QMetaObject.invokeMethod(poller, "stop", Qt.BlockingQueuedConnection)
+        thread.quit()
+        thread.wait(timeout_ms)
@@ -0,0 +1,333 @@
+# utils/db_writer.py
+"""
+Write-behind DB writer for the Sim Monitor service
+--------------------------------------------------
+A writer THREAD that keeps ONE long-lived SQLite connection (its pooled
+utils.db connection) and group-commits whatever the reader stage queued.
+The reader stage never waits on SQLite I/O; a slow commit/fsync only makes
+the queue deeper.
+
+Two kinds of queued mutation:
+
+  ordered   execute(sql, params) / call(fn, *args)
+            Kept in order, never merged (motion start/stop edges, session
+            rows, stats rows). Bounded by max_ordered: when the writer lags
+            that far, producers block (backpressure) instead of dropping.
+
+  merged    merge(apply_fn, key, **fields)
+            Latest-state rows (one simulators row per sim_id, one receivers
+            row per port, ...). A pending entry for the same (apply_fn, key)
+            absorbs the new fields, so a lagging writer coalesces to the
+            latest state per key. At commit apply_fn(cur, [(key, fields), ...])
+            is called once per apply_fn.
+            Merged rows must live in tables the ordered ops do not touch,
+            because the two lists are applied independently.
+
+The queue is committed as a single transaction when:
+  • batch_size mutations are pending, OR
+  • flush_interval seconds have passed since the last commit, OR
+  • flush() / close() is called (shutdown)
+
+Failed commits:
+  • "database is locked" / busy: the batch is put back and retried after
+    flush_interval, at most MAX_ATTEMPTS commits in a row (STOP_ATTEMPTS
+    once close() was called, so shutdown always finishes); past that the
+    batch is quarantined
+  • any other error: the batch is re-run op by op, each in a SAVEPOINT; ops
+    that fail are quarantined, the rest commit -- one bad statement never
+    blocks the queue or takes good rows down with it
+Quarantined ops are logged and the last QUARANTINE_KEEP are kept in
+.quarantined as (ts, op, error) for inspection.
+
+stats(): commit latency (last / max / avg ms), queue depth, coalesced count,
+failed commits and quarantined ops.
+"""
+
+import sqlite3, time, threading
+from collections import deque
+
+from utils.db import get_conn, close_thread_conns
+
+
+FLUSH_INTERVAL_SEC = 0.5
+BATCH_SIZE = 200
+MAX_ORDERED = 10000
+MAX_ATTEMPTS = 24              # consecutive locked/busy commits before giving up (~2 min at 5 s busy_timeout)
+STOP_ATTEMPTS = 2              # same, once close() was called
+QUARANTINE_KEEP = 100
+
+_BUSY_CODES = {sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED}
+
+
+def _is_busy(exc: Exception) -> bool:
+    """True for lock contention (worth retrying), False for errors a retry will not fix."""
+    if not isinstance(exc, sqlite3.OperationalError):
+        return False
+    code = getattr(exc, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in _BUSY_CODES
+    msg = str(exc).lower()
+    return "locked" in msg or "busy" in msg
+
+
+def _describe(op) -> str:
+    if len(op) == 2:
+        return " ".join(op[0].split())[:80]
+    return getattr(op[0], "__name__", repr(op[0]))
+
+
+class DBWriter:
+    def __init__(self, *, flush_interval: float = FLUSH_INTERVAL_SEC, batch_size: int = BATCH_SIZE,
+                 max_ordered: int = MAX_ORDERED):
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, int(batch_size))
+        self.max_ordered = max(1, int(max_ordered))
+
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._drained = threading.Condition(self._lock)
+        self._ordered = []
+        self._merged = {}               # (apply_fn, key) -> fields
+        self._flush_requested = 0
+        self._flushed = 0
+        self._stop = False
+        self._attempts = 0              # consecutive deferred commits
+        self.quarantined = deque(maxlen=QUARANTINE_KEEP)
+
+        # Stats
+        self.commits = 0
+        self.ops_written = 0
+        self.failed_commits = 0
+        self.quarantined_ops = 0
+        self.coalesced = 0
+        self.blocked = 0
+        self.max_depth = 0
+        self.last_commit_ms = 0.0
+        self.max_commit_ms = 0.0
+        self._total_commit_ms = 0.0
+
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Producer side (reader stage)
+    # ------------------------------------------------------------------
+    def execute(self, sql: str, params=()):
+        self._put_ordered((sql, params))
+
+    def call(self, fn, *args, **kwargs):
+        self._put_ordered((fn, args, kwargs))
+
+    def _put_ordered(self, op):
+        with self._lock:
+            if len(self._ordered) >= self.max_ordered:
+                self.blocked += 1
+                self._wake.notify()
+                while len(self._ordered) >= self.max_ordered and not self._stop:
+                    self._drained.wait()
+            self._ordered.append(op)
+            self._queued()
+
+    def merge(self, apply_fn, key, **fields):
+        with self._lock:
+            slot = (apply_fn, key)
+            pending = self._merged.get(slot)
+            if pending is None:
+                self._merged[slot] = fields
+            else:
+                pending.update(fields)
+                self.coalesced += 1
+            self._queued()
+
+    def _queued(self):
+        # caller holds the lock
+        depth = len(self._ordered) + len(self._merged)
+        if depth > self.max_depth:
+            self.max_depth = depth
+        if depth >= self.batch_size:
+            self._wake.notify()
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._ordered) + len(self._merged)
+
+    def flush(self, timeout: float | None = None):
+        """Ask the writer thread to commit now and wait until it has."""
+        with self._lock:
+            self._flush_requested += 1
+            ticket = self._flush_requested
+            self._wake.notify()
+            self._drained.wait_for(lambda: self._flushed >= ticket or self._stop, timeout)
+
+    def close(self):
+        """Flush on shutdown, stop the thread and release the connection."""
+        with self._lock:
+            self._stop = True
+            self._wake.notify()
+        self._thread.join()
+
+    # ------------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------------
+    def _run(self):
+        conn = get_conn()
+        last_commit = time.monotonic()
+        try:
+            while True:
+                with self._lock:
+                    while not self._stop:
+                        depth = len(self._ordered) + len(self._merged)
+                        if self._flush_requested > self._flushed or depth >= self.batch_size:
+                            break
+                        wait = self.flush_interval - (time.monotonic() - last_commit)
+                        if depth and wait <= 0:
+                            break
+                        self._wake.wait(wait if depth else None)
+
+                    ordered, self._ordered = self._ordered, []
+                    merged, self._merged = self._merged, {}
+                    ticket = self._flush_requested
+                    stopping = self._stop
+                    self._drained.notify_all()
+
+                if (ordered or merged) and not self._commit(conn, ordered, merged):
+                    time.sleep(self.flush_interval)         # deferred: back off before retrying
+                last_commit = time.monotonic()
+
+                with self._lock:
+                    self._flushed = ticket
+                    self._drained.notify_all()
+                    if stopping and not self._ordered and not self._merged:
+                        break
+        finally:
+            close_thread_conns()
+
+    @staticmethod
+    def _ops(ordered: list, merged: dict):
+        """(op, rows) in apply order; merged rows become one call op per apply_fn."""
+        groups = {}
+        for (apply_fn, key), fields in merged.items():
+            groups.setdefault(apply_fn, []).append((key, fields))
+        for apply_fn, items in groups.items():
+            yield (apply_fn, (items,), {}), len(items)
+        for op in ordered:
+            yield op, 1
+
+    @staticmethod
+    def _apply(cur, op):
+        if len(op) == 2:
+            cur.execute(op[0], op[1])
+        else:
+            fn, args, kwargs = op
+            fn(cur, *args, **kwargs)
+
+    def _commit(self, conn, ordered: list, merged: dict) -> bool:
+        """Commit one batch; False means it was deferred (re-queued) and the caller should back off."""
+        t0 = time.perf_counter()
+        total = len(ordered) + len(merged)
+        cur = conn.cursor()
+        try:
+            if not conn.in_transaction:
+                cur.execute("BEGIN")
+            for op, _ in self._ops(ordered, merged):
+                self._apply(cur, op)
+            conn.commit()
+            written = total
+
+        except Exception as e:
+            self._rollback(conn)
+            self.failed_commits += 1
+            if _is_busy(e):
+                return self._defer(ordered, merged, e)
+            print(f"[DBWriter] Commit failed ({total} ops): {e}; retrying op by op")
+            try:
+                written = self._commit_isolated(conn, ordered, merged)
+            except Exception as e2:
+                self._rollback(conn)
+                if _is_busy(e2):
+                    return self._defer(ordered, merged, e2)
+                self._quarantine(self._ops(ordered, merged), e2)
+                return True
+
+        self._attempts = 0
+        ms = (time.perf_counter() - t0) * 1000.0
+        self.commits += 1
+        self.ops_written += written
+        self.last_commit_ms = ms
+        self.max_commit_ms = max(self.max_commit_ms, ms)
+        self._total_commit_ms += ms
+        return True
+
+    def _commit_isolated(self, conn, ordered: list, merged: dict) -> int:
+        """Apply each op in its own SAVEPOINT, quarantining the ones that fail; returns rows written."""
+        cur = conn.cursor()
+        cur.execute("BEGIN")
+        written = 0
+        for op, rows in self._ops(ordered, merged):
+            cur.execute("SAVEPOINT dbw_op")
+            try:
+                self._apply(cur, op)
+            except Exception as e:
+                if _is_busy(e):
+                    raise
+                cur.execute("ROLLBACK TO dbw_op")
+                self._quarantine([(op, rows)], e)
+            else:
+                written += rows
+            cur.execute("RELEASE dbw_op")
+        conn.commit()
+        return written
+
+    def _defer(self, ordered: list, merged: dict, exc: Exception) -> bool:
+        """Locked/busy: put the batch back for the next round, up to the attempt cap."""
+        self._attempts += 1
+        limit = STOP_ATTEMPTS if self._stop else MAX_ATTEMPTS
+        if self._attempts >= limit:
+            self._attempts = 0
+            print(f"[DBWriter] Still locked after {limit} attempts, giving up on {len(ordered) + len(merged)} ops")
+            self._quarantine(self._ops(ordered, merged), exc)
+            return True
+        with self._lock:
+            self._ordered[:0] = ordered
+            for slot, fields in merged.items():
+                newer = self._merged.get(slot)
+                self._merged[slot] = {**fields, **newer} if newer else fields
+        print(f"[DBWriter] Commit deferred ({len(ordered) + len(merged)} ops, attempt {self._attempts}/{limit}): {exc}")
+        return False
+
+    def _quarantine(self, ops, exc: Exception):
+        now = time.time()
+        total, first = 0, None
+        for op, rows in ops:
+            total += rows
+            first = first or op
+            self.quarantined.append((now, op, str(exc)))
+        self.quarantined_ops += total
+        if first is not None:
+            print(f"[DBWriter] Quarantined {total} op(s) [{_describe(first)}{', ...' if total > 1 else ''}]: {exc}")
+
+    @staticmethod
+    def _rollback(conn):
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+
+    # ------------------------------------------------------------------
+    # Stats
+    # ------------------------------------------------------------------
+    def stats(self) -> dict:
+        return {
+            "commits": self.commits,
+            "ops_written": self.ops_written,
+            "queue_depth": self.pending,
+            "max_depth": self.max_depth,
+            "coalesced": self.coalesced,
+            "blocked": self.blocked,
+            "failed_commits": self.failed_commits,
+            "quarantined_ops": self.quarantined_ops,
+            "last_commit_ms": round(self.last_commit_ms, 2),
+            "max_commit_ms": round(self.max_commit_ms, 2),
+            "avg_commit_ms": round(self._total_commit_ms / self.commits, 2) if self.commits else 0.0,
+        }
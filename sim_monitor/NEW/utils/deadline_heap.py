@@ -0,0 +1,64 @@
+# utils/deadline_heap.py
+"""
+Deadline min-heap for sender timeouts
+-------------------------------------
+arm(key, deadline) is O(1) when the deadline moves later (the usual case: a
+sender was heard again): it only records the key's new deadline. The heap
+holds one live entry per armed key; when that entry reaches the top and its
+key was re-armed later, it is pushed back with the current deadline instead
+of firing. Moving a deadline earlier pushes a new entry.
+
+pop_expired(now) therefore costs O(1) when nothing is due and
+O((expired + re-armed) * log n) otherwise -- independent of fleet size and
+frame rate.
+"""
+
+import heapq
+
+
+class DeadlineHeap:
+    def __init__(self):
+        self._heap = []                 # (deadline, key)
+        self._queued = {}               # key -> deadline of its live heap entry
+        self._deadline = {}             # key -> current deadline
+
+    def __len__(self):
+        return len(self._deadline)
+
+    def __contains__(self, key):
+        return key in self._deadline
+
+    def arm(self, key, deadline: float):
+        queued = self._queued.get(key)
+        if queued is None or deadline < queued:
+            heapq.heappush(self._heap, (deadline, key))
+            self._queued[key] = deadline
+        self._deadline[key] = deadline
+
+    def disarm(self, key):
+        # heap entry is discarded lazily when it surfaces
+        self._deadline.pop(key, None)
+
+    def next_deadline(self):
+        return self._heap[0][0] if self._heap else None
+
+    def pop_expired(self, now: float) -> list:
+        """Keys whose current deadline is <= now; they are disarmed."""
+        heap = self._heap
+        fired = []
+        while heap and heap[0][0] <= now:
+            queued, key = heapq.heappop(heap)
+            if self._queued.get(key) != queued:
+                continue                                # superseded entry
+            current = self._deadline.get(key)
+            if current is None:
+                del self._queued[key]                   # disarmed
+                continue
+            if current > now:
+                heapq.heappush(heap, (current, key))    # re-armed since push
+                self._queued[key] = current
+                continue
+            del self._queued[key]
+            del self._deadline[key]
+            fired.append(key)
+        return fired
@@ -12,6 +12,7 @@ from PyQt5.QtCore import Qt
 
 from utils.layout_io import CFG_DIR, list_layout_files, read_layout
 from utils.db import get_conn
+from utils.rollups import record_session
 
 
 class DebugControlPanel(QDialog):
@@ -190,12 +191,7 @@ class DebugControlPanel(QDialog):
             cur.execute("SELECT start_ts FROM active_motion WHERE sim_id=?", (sim_id,))
             row = cur.fetchone()
             if row:
-                start = row[0]
-                duration = now - start
-                cur.execute("""
-                    INSERT INTO motion_sessions (sim_id, start_ts, end_ts, duration_sec)
-                    VALUES (?, ?, ?, ?)
-                """, (sim_id, start, now, duration))
+                record_session(cur, sim_id, row[0], now)
                 cur.execute("DELETE FROM active_motion WHERE sim_id=?", (sim_id,))
 
             # 2. Mark sender offline (but preserve motion/ramp)
@@ -250,12 +246,7 @@ class DebugControlPanel(QDialog):
         cur.execute("SELECT start_ts FROM active_motion WHERE sim_id=?", (sim_id,))
         row = cur.fetchone()
         if row:
-            start = row[0]
-            duration = now - start
-            cur.execute("""
-                INSERT INTO motion_sessions (sim_id, start_ts, end_ts, duration_sec)
-                VALUES (?, ?, ?, ?)
-            """, (sim_id, start, now, duration))
+            record_session(cur, sim_id, row[0], now)
             cur.execute("DELETE FROM active_motion WHERE sim_id=?", (sim_id,))
 
         conn.commit()
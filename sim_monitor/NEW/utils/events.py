@@ -0,0 +1,75 @@
+# utils/events.py
+"""
+Append-only state event log
+---------------------------
+Every real transition the ingest service sees, one row each:
+
+  events(sim_id, ts_ms, kind, old, new)   WITHOUT ROWID, PK (sim_id, ts_ms, kind)
+
+  • clustered on (sim_id, ts_ms): "history of SIM-7 last week" is one
+    contiguous range scan, no rowid indirection
+  • kind / old / new are small integers; SQLite stores 0 and 1 in the record
+    header alone (no payload bytes), so a row is ~10-15 bytes
+  • old is NULL when the previous value is unknown (first frame ever)
+  • sim_id 0 is the receiver side (EV_RECEIVER: aggregate online flag)
+
+EventLog buffers rows in memory; take() hands them to the DB writer as a
+single executemany op per tick. ts_ms is nudged forward when two events of
+the same (sim_id, kind) land in the same millisecond, so nothing is dropped
+by the primary key.
+"""
+
+
+EV_MOTION = 1       # motion_state   old -> new
+EV_RAMP = 2         # ramp_state     old -> new
+EV_ONLINE = 3       # sender online  0/1
+EV_RECEIVER = 4     # receiver online (sim_id 0), 0/1
+
+KIND_NAMES = {EV_MOTION: "motion", EV_RAMP: "ramp", EV_ONLINE: "online", EV_RECEIVER: "receiver"}
+
+RECEIVER_SIM_ID = 0
+
+
+class EventLog:
+    def __init__(self):
+        self._rows = []
+        self._last_ms = {}              # (sim_id, kind) -> last ts_ms used
+        self.logged = 0
+
+    def add(self, sim_id: int, kind: int, old, new, ts: float):
+        ts_ms = int(ts * 1000)
+        key = (sim_id, kind)
+        last = self._last_ms.get(key)
+        if last is not None and ts_ms <= last:
+            ts_ms = last + 1
+        self._last_ms[key] = ts_ms
+        self._rows.append((sim_id, ts_ms, kind, None if old is None else int(old), int(new)))
+        self.logged += 1
+
+    def __len__(self):
+        return len(self._rows)
+
+    def take(self) -> list:
+        rows, self._rows = self._rows, []
+        return rows
+
+
+def insert_events(cur, rows: list):
+    """DBWriter op: one batched insert for a tick's worth of events."""
+    cur.executemany(
+        "INSERT OR IGNORE INTO events (sim_id, ts_ms, kind, old, new) VALUES (?, ?, ?, ?, ?)",
+        rows
+    )
+
+
+def sim_events(conn, sim_id: int, start_ts: float, end_ts: float, kind: int | None = None) -> list:
+    """(ts_ms, kind, old, new) for one sim in [start_ts, end_ts), oldest first."""
+    sql = """
+        SELECT ts_ms, kind, old, new FROM events
+        WHERE sim_id = ? AND ts_ms >= ? AND ts_ms < ?
+    """
+    params = [sim_id, int(start_ts * 1000), int(end_ts * 1000)]
+    if kind is not None:
+        sql += " AND kind = ?"
+        params.append(kind)
+    return conn.execute(sql + " ORDER BY ts_ms", params).fetchall()
@@ -0,0 +1,218 @@
+# utils/export.py
+"""
+Streaming export of sim_monitor.db history
+------------------------------------------
+Writes motion_sessions, simulators and active_motion for a date range to
+one file per table, in constant memory whatever the range:
+
+  • rows flow cursor.fetchmany(BATCH_ROWS) -> generator -> writer; nothing
+    ever holds more than one batch
+  • all three tables are read inside ONE read transaction on a read-only
+    pooled connection, i.e. a single WAL snapshot: the files agree with
+    each other, and the ingest writer is never blocked (it keeps appending
+    to the WAL while the export reads)
+  • formats: csv (always), parquet / arrow (Arrow IPC file) when pyarrow is
+    installed -- one row group / record batch per fetchmany batch
+  • files are written as <name>.part and renamed when complete
+
+Range semantics: motion_sessions rows with end_ts in [from, to) (served by
+idx_motion_sessions_end), active_motion rows started before `to`, and the
+whole simulators table (current state). --archives also reads retention
+archives (utils.retention.attach_history).
+
+CLI (from sim_monitor/NEW):
+  python -m utils.export --out export/ [--from 2025-01-01] [--to 2025-02-01]
+        [--format csv|parquet|arrow] [--tables motion_sessions,simulators]
+        [--archives] [--db FILE]
+"""
+
+import csv, time, datetime, pathlib
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from utils import db
+
+
+BATCH_ROWS = 10000
+FORMATS = ("csv", "parquet", "arrow")
+EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}
+
+# table -> (SELECT ... with {table} placeholder, params builder)
+QUERIES = {
+    "motion_sessions": (
+        "SELECT id, sim_id, start_ts, end_ts, duration_sec FROM {table} "
+        "WHERE end_ts >= ? AND end_ts < ? ORDER BY end_ts",
+        lambda start_ts, end_ts: (start_ts, end_ts),
+    ),
+    "simulators": (
+        "SELECT sim_id, motion_state, ramp_state, last_update_ts, online FROM simulators ORDER BY sim_id",
+        lambda start_ts, end_ts: (),
+    ),
+    "active_motion": (
+        "SELECT sim_id, start_ts FROM active_motion WHERE start_ts < ? ORDER BY sim_id",
+        lambda start_ts, end_ts: (end_ts,),
+    ),
+}
+
+
+# -----------------------------
+# Row streams
+# -----------------------------
+def iter_batches(cur, batch_rows: int = BATCH_ROWS):
+    """Yield lists of at most batch_rows rows until the cursor is drained."""
+    while True:
+        rows = cur.fetchmany(batch_rows)
+        if not rows:
+            return
+        yield rows
+
+
+def stream_table(conn, name: str, start_ts: int, end_ts: int, *, table: str | None = None,
+                 batch_rows: int = BATCH_ROWS):
+    """(columns, batch generator) for one exported table."""
+    sql, params = QUERIES[name]
+    cur = conn.execute(sql.format(table=table or name), params(start_ts, end_ts))
+    columns = [d[0] for d in cur.description]
+    return columns, iter_batches(cur, batch_rows)
+
+
+# -----------------------------
+# Writers
+# -----------------------------
+def _write_csv(path: pathlib.Path, columns: list, batches) -> int:
+    n = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(columns)
+        for rows in batches:
+            w.writerows(rows)
+            n += len(rows)
+    return n
+
+
+def _arrow_schema(columns: list):
+    # every exported column is an INTEGER column in SQLite
+    return pa.schema([(c, pa.int64()) for c in columns])
+
+
+def _record_batch(schema, rows: list):
+    return pa.record_batch([pa.array(col, type=pa.int64()) for col in zip(*rows)], schema=schema)
+
+
+def _write_parquet(path: pathlib.Path, columns: list, batches) -> int:
+    n = 0
+    schema = _arrow_schema(columns)
+    with pq.ParquetWriter(path, schema) as w:
+        for rows in batches:
+            w.write_batch(_record_batch(schema, rows))
+            n += len(rows)
+    return n
+
+
+def _write_arrow(path: pathlib.Path, columns: list, batches) -> int:
+    n = 0
+    schema = _arrow_schema(columns)
+    with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, schema) as w:
+        for rows in batches:
+            w.write_batch(_record_batch(schema, rows))
+            n += len(rows)
+    return n
+
+
+WRITERS = {"csv": _write_csv, "parquet": _write_parquet, "arrow": _write_arrow}
+
+
+# -----------------------------
+# Export
+# -----------------------------
+def export(out_dir, start_ts: int = 0, end_ts: int | None = None, *, fmt: str = "csv",
+           tables=tuple(QUERIES), archives: bool = False, batch_rows: int = BATCH_ROWS,
+           conn=None) -> dict:
+    """
+    Write each table to out_dir/<table>.<ext> from one read snapshot.
+    Returns {table: rows written}.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format {fmt!r}; expected one of {FORMATS}")
+    if fmt != "csv" and pa is None:
+        raise RuntimeError(f"{fmt} export needs pyarrow (pip install pyarrow); use --format csv")
+    unknown = set(tables) - set(QUERIES)
+    if unknown:
+        raise ValueError(f"unknown tables: {sorted(unknown)}")
+
+    end_ts = int(end_ts if end_ts is not None else time.time() + 1)
+    out_dir = pathlib.Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    conn = conn or db.get_conn(readonly=True)
+
+    if conn.in_transaction:
+        conn.rollback()
+    history = None
+    if archives:
+        from utils import retention
+        history = retention.attach_history(conn, start_ts, end_ts)      # ATTACH: outside the snapshot
+
+    written = {}
+    conn.execute("BEGIN")                       # snapshot starts at the first read, held until rollback
+    try:
+        for name in tables:
+            columns, batches = stream_table(
+                conn, name, start_ts, end_ts,
+                table=history if name == "motion_sessions" else None, batch_rows=batch_rows
+            )
+            path = out_dir / f"{name}{EXTENSIONS[fmt]}"
+            part = path.with_name(path.name + ".part")
+            try:
+                written[name] = WRITERS[fmt](part, columns, batches)
+            except BaseException:
+                part.unlink(missing_ok=True)
+                raise
+            part.replace(path)
+    finally:
+        conn.rollback()
+    return written
+
+
+def _parse_date(s: str) -> int:
+    return int(datetime.datetime.fromisoformat(s).timestamp())
+
+
+def main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Export motion history to CSV / Parquet / Arrow")
+    ap.add_argument("--out", required=True, help="output directory (one file per table)")
+    ap.add_argument("--from", dest="start", help="start date/time, local (default: beginning)")
+    ap.add_argument("--to", dest="end", help="end date/time, local, exclusive (default: now)")
+    ap.add_argument("--format", choices=FORMATS, default="csv")
+    ap.add_argument("--tables", default=",".join(QUERIES), help="comma-separated subset of tables")
+    ap.add_argument("--archives", action="store_true", help="include retention archive months")
+    ap.add_argument("--db", help="SQLite file (default sim_monitor.db)")
+    args = ap.parse_args(argv)
+
+    if args.db:
+        db.DB_PATH = pathlib.Path(args.db)
+
+    t0 = time.perf_counter()
+    try:
+        written = export(
+            args.out,
+            _parse_date(args.start) if args.start else 0,
+            _parse_date(args.end) if args.end else None,
+            fmt=args.format,
+            tables=[t.strip() for t in args.tables.split(",") if t.strip()],
+            archives=args.archives,
+        )
+    except (RuntimeError, ValueError) as e:
+        ap.error(str(e))
+    elapsed = time.perf_counter() - t0
+    total = sum(written.values())
+    print(f"[Export] {written} -> {args.out} ({args.format}, {elapsed:.2f}s, {total / max(elapsed, 1e-9):,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+# utils/migrations.py
+"""
+Schema migrations for sim_monitor.db
+------------------------------------
+PRAGMA user_version is the schema version. init_db() creates the baseline
+tables and then calls migrate(), which runs every step above the stored
+version in order:
+
+  • each step runs in one BEGIN IMMEDIATE transaction together with its
+    user_version bump, so it is applied completely or not at all
+  • the version is re-read inside that transaction, so the GUI and the
+    service starting together do not apply a step twice
+  • the runner claims the step in _migration_lock (owner token + heartbeat)
+    in that same transaction; a chunked step commits in between, and a
+    second runner that finds a fresh heartbeat waits for it instead of
+    entering the step too. A heartbeat older than LOCK_STALE_SEC is a
+    crashed runner and is taken over. The claim is removed together with
+    the version bump (or released on error)
+  • a DB newer than this code is left alone (warning only)
+
+To ship a schema change: append (version, description, fn) to MIGRATIONS.
+fn(conn) runs inside the open transaction and must not commit, except
+through build_index_chunked() or rollups.backfill() (chunked steps).
+migration_running() tells other maintenance (retention) to stay out of the
+way while a chunked step is between chunks.
+
+Index builds on big tables use build_index_chunked(): a plain CREATE INDEX
+holds the write lock (and grows the WAL) for the whole build. Instead the
+table is copied in CHUNK_ROWS rowid ranges, each its own short transaction,
+into a shadow table that already carries the indexes; triggers mirror
+concurrent inserts/updates/deletes, and a final quick swap renames the
+shadow into place. A build that was interrupted (crash, power cut) leaves
+the shadow and its mirror triggers behind, with the table's other indexes
+already moved onto the shadow; the next run drops those leftovers and
+rebuilds the moved indexes along with the new one.
+"""
+
+import re, time, uuid
+
+
+CHUNK_ROWS = 20000             # rows copied per transaction
+CHUNK_PAUSE_SEC = 0.01         # let other writers in between chunks
+LOCK_STALE_SEC = 30.0          # a step claim without a heartbeat this long is abandoned
+LOCK_WAIT_SEC = 0.5            # re-check period while another runner holds a step
+
+_LOCK_SQL = """
+CREATE TABLE IF NOT EXISTS _migration_lock (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL,
+    owner TEXT NOT NULL,
+    heartbeat REAL NOT NULL
+)
+"""
+
+
+# -----------------------------
+# Runner
+# -----------------------------
+def schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _claim(conn, version: int, owner: str, report: bool) -> bool:
+    """
+    Open the step's BEGIN IMMEDIATE transaction and claim it. Returns False
+    (no transaction open) if another process applied it meanwhile; waits
+    while another live runner holds it.
+    """
+    waiting = False
+    while True:
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        if version <= schema_version(conn):                 # applied by another process meanwhile
+            conn.rollback()
+            return False
+
+        conn.execute(_LOCK_SQL)
+        row = conn.execute("SELECT version, owner, heartbeat FROM _migration_lock WHERE id=1").fetchone()
+        if row is not None and row[1] != owner:
+            age = time.time() - row[2]
+            if age < LOCK_STALE_SEC:
+                conn.rollback()
+                if report and not waiting:
+                    print(f"[DB] Schema v{row[0]} is being applied by another process; waiting")
+                waiting = True
+                time.sleep(LOCK_WAIT_SEC)
+                continue
+            if report:
+                print(f"[DB] Taking over schema v{row[0]} (no heartbeat for {age:.0f}s)")
+
+        conn.execute(
+            "INSERT OR REPLACE INTO _migration_lock (id, version, owner, heartbeat) VALUES (1, ?, ?, ?)",
+            (int(version), owner, time.time())
+        )
+        return True
+
+
+def migration_running(conn) -> bool:
+    """True while some runner holds a live step claim (chunked steps commit in between)."""
+    if not _exists(conn, "table", "_migration_lock"):
+        return False
+    row = conn.execute("SELECT heartbeat FROM _migration_lock WHERE id=1").fetchone()
+    return row is not None and time.time() - row[0] < LOCK_STALE_SEC
+
+
+def _release(conn, owner: str):
+    """Best effort: drop our claim after a failed step (it may have been committed by a chunk)."""
+    try:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.execute("DELETE FROM _migration_lock WHERE owner=?", (owner,))
+        conn.commit()
+    except Exception:
+        pass
+
+
+def migrate(conn, *, report: bool = True) -> list:
+    """Apply pending MIGRATIONS; returns the versions applied."""
+    applied = []
+    latest = MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+    current = schema_version(conn)
+    if current > latest:
+        print(f"[DB] Schema v{current} is newer than this code (v{latest}); not migrating")
+        return applied
+
+    owner = uuid.uuid4().hex
+    for version, desc, fn in MIGRATIONS:
+        if version <= current:
+            continue
+        if not _claim(conn, version, owner, report):
+            continue
+
+        t0 = time.perf_counter()
+        try:
+            fn(conn)
+            if not conn.in_transaction:         # chunked steps end with the swap open
+                conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM _migration_lock WHERE owner=?", (owner,))
+            conn.execute(f"PRAGMA user_version={int(version)}")
+            conn.commit()
+        except BaseException:
+            _release(conn, owner)
+            raise
+
+        current = version
+        applied.append(version)
+        if report:
+            print(f"[DB] Migrated to schema v{version}: {desc} ({time.perf_counter() - t0:.2f}s)")
+
+    return applied
+
+
+# -----------------------------
+# Chunked index build
+# -----------------------------
+def _exists(conn, kind: str, name: str, table: str | None = None) -> bool:
+    if table is None:
+        sql, params = "SELECT 1 FROM sqlite_master WHERE type=? AND name=?", (kind, name)
+    else:
+        sql, params = "SELECT 1 FROM sqlite_master WHERE type=? AND name=? AND tbl_name=?", (kind, name, table)
+    return conn.execute(sql, params).fetchone() is not None
+
+
+def _claim_owner(conn) -> str | None:
+    """Owner token of the running step's claim (see migrate); None outside migrate()."""
+    if not _exists(conn, "table", "_migration_lock"):
+        return None
+    row = conn.execute("SELECT owner FROM _migration_lock WHERE id=1").fetchone()
+    return row[0] if row else None
+
+
+def _heartbeat(conn, owner: str | None):
+    """Refresh the step claim; fails if a stale-lock takeover gave it to another runner."""
+    if owner is None:
+        return
+    cur = conn.execute("UPDATE _migration_lock SET heartbeat=? WHERE id=1 AND owner=?", (time.time(), owner))
+    if cur.rowcount == 0:
+        raise RuntimeError("migration claim was taken over by another process")
+
+
+def _drop_leftovers(conn, table: str, shadow: str) -> list:
+    """
+    Undo an interrupted build: drop its mirror triggers and the shadow.
+    Returns (name, sql) of the indexes that had been moved onto the shadow,
+    pointed back at `table`, so the caller can rebuild them.
+    """
+    for trg in ("_mig_ins", "_mig_upd", "_mig_del"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trg}")
+    if not _exists(conn, "table", shadow):
+        return []
+    moved = [
+        (idx_name, _retarget(sql, "index", shadow, table))
+        for idx_name, sql in conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL", (shadow,)
+        ).fetchall()
+    ]
+    conn.execute(f"DROP TABLE {shadow}")
+    print(f"[DB] Cleaned up an interrupted index build on {table} ({len(moved)} index(es) to rebuild)")
+    return moved
+
+
+def _retarget(sql: str, kind: str, old: str, new: str) -> str:
+    """Point a CREATE TABLE / INDEX / TRIGGER statement from table `old` at `new`."""
+    if kind == "table":
+        pat = r'^(\s*CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?)["`\[]?' + re.escape(old) + r'["`\]]?'
+    else:
+        pat = r'(\bON\s+)["`\[]?' + re.escape(old) + r'["`\]]?(?=[\s(])'
+    return re.sub(pat, lambda m: m.group(1) + new, sql, count=1, flags=re.IGNORECASE)
+
+
+def build_index_chunked(conn, table: str, name: str, columns: str, *,
+                        chunk_rows: int = CHUNK_ROWS, pause: float = CHUNK_PAUSE_SEC):
+    """
+    CREATE INDEX name ON table (columns) without one long write transaction.
+    Call inside a migration step: intermediate chunks are committed, and it
+    returns with the final swap's transaction still open for the runner.
+    """
+    shadow = f"_{table}_migrating"
+    owner = _claim_owner(conn)
+    # the new index was on the shadow, if anywhere: it is rebuilt below
+    restore = [(idx, sql) for idx, sql in _drop_leftovers(conn, table, shadow)
+               if idx != name and not _exists(conn, "index", idx, table)]
+
+    n = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    if n <= chunk_rows or _exists(conn, "index", name, table):
+        for _, sql in restore:
+            conn.execute(sql)
+        if not _exists(conn, "index", name, table):
+            conn.execute(f"CREATE INDEX {name} ON {table} ({columns})")
+        return
+
+    info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    cols = [r[1] for r in info]
+    pks = [r for r in info if r[5]]
+    has_alias = len(pks) == 1 and pks[0][2].upper() == "INTEGER"
+    collist = ", ".join(cols if has_alias else ["rowid"] + cols)
+
+    table_sql = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (table,)
+    ).fetchone()[0]
+    index_sql = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL", (table,)
+    ).fetchall()
+    trigger_sql = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type='trigger' AND tbl_name=?", (table,)
+    ).fetchall()
+
+    # 1. shadow table with every index already in place + mirror triggers
+    conn.execute(_retarget(table_sql, "table", table, shadow))
+    for idx_name, sql in index_sql:
+        conn.execute(f"DROP INDEX {idx_name}")
+        conn.execute(_retarget(sql, "index", table, shadow))
+    for _, sql in restore:
+        conn.execute(_retarget(sql, "index", table, shadow))
+    conn.execute(f"CREATE INDEX {name} ON {shadow} ({columns})")
+
+    src = f"SELECT {collist} FROM {table} WHERE rowid = NEW.rowid"
+    conn.execute(f"""
+        CREATE TRIGGER _mig_ins AFTER INSERT ON {table}
+        BEGIN INSERT OR REPLACE INTO {shadow} ({collist}) {src}; END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER _mig_upd AFTER UPDATE ON {table}
+        BEGIN
+            DELETE FROM {shadow} WHERE rowid = OLD.rowid;
+            INSERT OR REPLACE INTO {shadow} ({collist}) {src};
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER _mig_del AFTER DELETE ON {table}
+        BEGIN DELETE FROM {shadow} WHERE rowid = OLD.rowid; END
+    """)
+    conn.commit()
+
+    # 2. copy in rowid chunks, each its own short transaction
+    last = -1 << 63
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        hi = conn.execute(
+            f"SELECT MAX(rowid) FROM (SELECT rowid FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?)",
+            (last, chunk_rows)
+        ).fetchone()[0]
+        if hi is None:
+            break                                           # transaction stays open for the swap
+        conn.execute(
+            f"INSERT OR IGNORE INTO {shadow} ({collist}) "
+            f"SELECT {collist} FROM {table} WHERE rowid > ? AND rowid <= ?",
+            (last, hi)
+        )
+        _heartbeat(conn, owner)
+        conn.commit()
+        last = hi
+        if pause:
+            time.sleep(pause)
+
+    # 3. swap (left open: the runner commits it with the version bump)
+    seq = None
+    if _exists(conn, "table", "sqlite_sequence"):
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name=?", (table,)).fetchone()
+        seq = row[0] if row else None
+
+    conn.execute(f"DROP TABLE {table}")                     # drops mirror + user triggers too
+    conn.execute("PRAGMA legacy_alter_table=ON")            # views may name the table mid-swap
+    try:
+        conn.execute(f"ALTER TABLE {shadow} RENAME TO {table}")
+    finally:
+        conn.execute("PRAGMA legacy_alter_table=OFF")
+    for _, sql in trigger_sql:
+        conn.execute(sql)
+
+    if seq is not None:
+        cur = conn.execute("UPDATE sqlite_sequence SET seq=MAX(seq, ?) WHERE name=?", (seq, table))
+        if cur.rowcount == 0:
+            conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table, seq))
+
+
+# -----------------------------
+# Steps
+# -----------------------------
+def _m1_sessions_sim_end_index(conn):
+    # Per-sim history lookups (latest session, backfill) are index seeks
+    build_index_chunked(conn, "motion_sessions", "idx_motion_sessions_sim_end", "sim_id, end_ts")
+
+
+def _m2_last_session(conn):
+    # Newest session per sim, kept current by trigger so the GUI does a
+    # primary-key lookup instead of searching motion_sessions
+    fresh = not _exists(conn, "table", "last_session")
+
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS last_session (
+        sim_id INTEGER PRIMARY KEY,
+        end_ts INTEGER,
+        duration_sec INTEGER
+    )
+    """)
+
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_motion_sessions_last
+    AFTER INSERT ON motion_sessions
+    BEGIN
+        INSERT INTO last_session (sim_id, end_ts, duration_sec)
+        VALUES (NEW.sim_id, NEW.end_ts, NEW.duration_sec)
+        ON CONFLICT(sim_id) DO UPDATE SET
+            end_ts=excluded.end_ts,
+            duration_sec=excluded.duration_sec
+        WHERE last_session.end_ts IS NULL OR excluded.end_ts >= last_session.end_ts;
+    END
+    """)
+
+    if fresh:
+        # One-off backfill from existing history (newest end_ts per sim)
+        conn.execute("""
+            INSERT OR REPLACE INTO last_session (sim_id, end_ts, duration_sec)
+            SELECT sim_id, MAX(end_ts), duration_sec
+            FROM motion_sessions
+            GROUP BY sim_id
+        """)
+
+
+def _m3_events(conn):
+    # Append-only transition log (utils.events), clustered for per-sim range scans
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS events (
+        sim_id INTEGER NOT NULL,
+        ts_ms INTEGER NOT NULL,
+        kind INTEGER NOT NULL,
+        old INTEGER,
+        new INTEGER NOT NULL,
+        PRIMARY KEY (sim_id, ts_ms, kind)
+    ) WITHOUT ROWID
+    """)
+
+
+def _m4_sessions_end_index(conn):
+    # Retention (utils.retention) finds rows past the horizon by end_ts
+    build_index_chunked(conn, "motion_sessions", "idx_motion_sessions_end", "end_ts")
+
+
+def _m5_rollups(conn):
+    # Hourly / daily utilization per sim (utils.rollups), seeded from history
+    for table in ("usage_hourly", "usage_daily"):
+        conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            sim_id INTEGER NOT NULL,
+            bucket_start INTEGER NOT NULL,
+            motion_seconds INTEGER NOT NULL DEFAULT 0,
+            session_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (sim_id, bucket_start)
+        ) WITHOUT ROWID
+        """)
+
+    from utils import rollups
+    owner = _claim_owner(conn)
+    rollups.backfill(conn, on_chunk=lambda: _heartbeat(conn, owner))
+
+
+MIGRATIONS = [
+    (1, "motion_sessions (sim_id, end_ts) index", _m1_sessions_sim_end_index),
+    (2, "last_session table + trigger (backfilled)", _m2_last_session),
+    (3, "events table (WITHOUT ROWID)", _m3_events),
+    (4, "motion_sessions (end_ts) index", _m4_sessions_end_index),
+    (5, "usage_hourly / usage_daily rollups (backfilled from history)", _m5_rollups),
+]
@@ -0,0 +1,99 @@
+# utils/protocol.py
+"""
+Receiver CSV protocol decoder (shared by the service and the Qt reader)
+-----------------------------------------------------------------------
+Frames from the ESP32 receiver, one per line:
+
+  R,1                               -> ReceiverFrame()
+  O,<sid>,<0|1>                     -> OnlineFrame(sid, online)
+                                       ("0,<sid>,<0|1>" too when zero_online:
+                                        the service always took it, the Qt
+                                        reader never did)
+  S,<sid>,<motion>,<ramp>,<seq>     -> StateFrame(sid, motion, ramp, seq)
+
+decode_frame() works on raw bytes in a single pass:
+  • dispatch on the first byte
+  • split once on b","
+  • parse integer fields straight from bytes (no str decode, no regex)
+
+Malformed input never raises; it returns Reject(reason, raw).
+"""
+
+from typing import NamedTuple
+
+
+# Reject reasons
+REJECT_EMPTY = "empty"
+REJECT_UNKNOWN = "unknown_type"
+REJECT_FIELDS = "bad_field_count"
+REJECT_INT = "bad_int"
+REJECT_VALUE = "bad_value"
+
+
+class ReceiverFrame(NamedTuple):
+    pass
+
+
+class OnlineFrame(NamedTuple):
+    sid: int
+    online: bool
+
+
+class StateFrame(NamedTuple):
+    sid: int
+    motion: int
+    ramp: int
+    seq: int
+
+
+class Reject(NamedTuple):
+    reason: str
+    raw: bytes
+
+
+_RECEIVER = ReceiverFrame()
+
+_B_R = ord("R")
+_B_O = ord("O")
+_B_ZERO = ord("0")
+_B_S = ord("S")
+
+_WS = b" \t\r\n"
+
+
+def decode_frame(line: bytes, *, zero_online: bool = True):
+    """Decode one receiver line (with or without trailing newline)."""
+    line = line.strip(_WS)
+    if not line:
+        return Reject(REJECT_EMPTY, line)
+
+    head = line[0]
+
+    if head == _B_S:
+        parts = line.split(b",")
+        if len(parts) != 5 or parts[0] != b"S":
+            return Reject(REJECT_FIELDS, line)
+        sid, motion, ramp, seq = parts[1], parts[2], parts[3], parts[4]
+        if not (sid.isdigit() and motion.isdigit() and ramp.isdigit() and seq.isdigit()):
+            return Reject(REJECT_INT, line)
+        return StateFrame(int(sid), int(motion), int(ramp), int(seq))
+
+    if head == _B_O or (head == _B_ZERO and zero_online):
+        parts = line.split(b",")
+        if len(parts) != 3 or len(parts[0]) != 1:
+            return Reject(REJECT_FIELDS, line)
+        sid, flag = parts[1], parts[2]
+        if not sid.isdigit():
+            return Reject(REJECT_INT, line)
+        if flag == b"1":
+            return OnlineFrame(int(sid), True)
+        if flag == b"0":
+            return OnlineFrame(int(sid), False)
+        return Reject(REJECT_VALUE, line)
+
+    if head == _B_R:
+        if line == b"R,1":
+            return _RECEIVER
+        return Reject(REJECT_VALUE, line)
+
+    return Reject(REJECT_UNKNOWN, line)
@@ -0,0 +1,338 @@
+# utils/retention.py
+"""
+Retention for motion_sessions: monthly archive files + incremental vacuum
+-------------------------------------------------------------------------
+Keeps the hot sim_monitor.db bounded without losing history:
+
+  • rows whose end_ts is older than RETENTION_DAYS move to
+    archive/sessions_YYYY_MM.db (month of end_ts, UTC) with ATTACH and
+    INSERT ... SELECT, BATCH_ROWS rows per batch
+  • a transaction spanning the WAL-mode main DB and an ATTACHed file is not
+    atomic (main can be durable while the archive is not), so each batch is
+    two transactions: the archive copy commits first, on its own; only then
+    are rows deleted from main, and only those whose exact copy (id, sim_id,
+    start_ts, end_ts) is present in the archive. A failed or interrupted
+    archive write leaves the rows in main; original ids are kept and the
+    archive insert is INSERT OR IGNORE, so the next run just repeats it
+  • freed pages are handed back with PRAGMA incremental_vacuum in small
+    steps (needs auto_vacuum=INCREMENTAL: set on new files by utils.db;
+    older files need one full VACUUM, --enable-incremental-vacuum)
+  • last_session is untouched, so the GUI still shows the newest session
+
+Reading across archives: attach_history(conn, start_ts, end_ts) attaches the
+months that overlap the range and creates the TEMP view
+motion_sessions_all (main UNION ALL archives) on that connection. SQLite
+allows MAX_ATTACHED (10 by default) files per connection, so for longer
+ranges only the newest MAX_ATTACHED months stay attached; the older ones are
+attached MAX_ATTACHED at a time, their rows in range copied into the TEMP
+table motion_sessions_hist, and detached again -- the view covers that too.
+
+The service runs run_retention() every RETENTION_INTERVAL_SEC on a
+background thread while its writer queue is idle; should_yield() lets it
+pause between batches when ingest gets busy.
+
+CLI (from sim_monitor/NEW):
+  python -m utils.retention [--days 365] [--dry-run] [--enable-incremental-vacuum] [--db FILE]
+"""
+
+import time, datetime, calendar, pathlib
+
+from utils import db, migrations
+
+
+RETENTION_DAYS = 365
+BATCH_ROWS = 5000
+BATCH_PAUSE_SEC = 0.05
+VACUUM_STEP_PAGES = 256
+MAX_ATTACHED = 10
+
+ARCHIVE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS {schema}.motion_sessions (
+    id INTEGER PRIMARY KEY,
+    sim_id INTEGER,
+    start_ts INTEGER,
+    end_ts INTEGER,
+    duration_sec INTEGER
+)
+"""
+ARCHIVE_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS {schema}.idx_motion_sessions_sim_end
+    ON motion_sessions (sim_id, end_ts)
+"""
+COLUMNS = "id, sim_id, start_ts, end_ts, duration_sec"
+
+
+def archive_dir() -> pathlib.Path:
+    return db.DB_PATH.parent / "archive"
+
+
+def _month_start(ts: float) -> int:
+    d = datetime.datetime.fromtimestamp(ts, datetime.timezone.utc)
+    return calendar.timegm((d.year, d.month, 1, 0, 0, 0))
+
+
+def _next_month(month_start: int) -> int:
+    d = datetime.datetime.fromtimestamp(month_start, datetime.timezone.utc)
+    y, m = (d.year + 1, 1) if d.month == 12 else (d.year, d.month + 1)
+    return calendar.timegm((y, m, 1, 0, 0, 0))
+
+
+def archive_path(month_start: int, directory=None) -> pathlib.Path:
+    d = datetime.datetime.fromtimestamp(month_start, datetime.timezone.utc)
+    return pathlib.Path(directory or archive_dir()) / f"sessions_{d.year:04d}_{d.month:02d}.db"
+
+
+def list_archives(directory=None) -> list:
+    return sorted(pathlib.Path(directory or archive_dir()).glob("sessions_*.db"))
+
+
+# -----------------------------
+# Move old rows into archives
+# -----------------------------
+def run_retention(conn=None, *, days: float = RETENTION_DAYS, now: float | None = None, directory=None,
+                  batch_rows: int = BATCH_ROWS, pause: float = BATCH_PAUSE_SEC,
+                  should_yield=None, dry_run: bool = False) -> dict:
+    """
+    Archive motion_sessions rows with end_ts < now - days, then vacuum.
+    Returns {"moved": rows, "kept": rows left in main because the archive
+    did not hold an identical copy, "months": [...], "freed_pages": n}.
+    """
+    conn = conn or db.get_conn()
+    cutoff = int((now if now is not None else time.time()) - days * 86400)
+    directory = pathlib.Path(directory or archive_dir())
+    result = {"moved": 0, "kept": 0, "months": [], "freed_pages": 0}
+
+    if not dry_run and migrations.migration_running(conn):
+        print("[Retention] Schema migration in progress; skipping this run")
+        return result
+
+    if dry_run:
+        rows = conn.execute(
+            "SELECT end_ts FROM motion_sessions WHERE end_ts < ? ORDER BY end_ts", (cutoff,)
+        ).fetchall()
+        months = {}
+        for (end_ts,) in rows:
+            key = archive_path(_month_start(end_ts), directory).name
+            months[key] = months.get(key, 0) + 1
+        result["moved"] = len(rows)
+        result["months"] = sorted(months.items())
+        return result
+
+    floor = -1 << 63
+    while True:
+        oldest = conn.execute(
+            "SELECT MIN(end_ts) FROM motion_sessions WHERE end_ts >= ? AND end_ts < ?", (floor, cutoff)
+        ).fetchone()[0]
+        if oldest is None:
+            break
+
+        m0 = _month_start(oldest)
+        m1 = floor = min(_next_month(m0), cutoff)
+        path = archive_path(m0, directory)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("ATTACH DATABASE ? AS arch", (str(path),))
+        try:
+            conn.execute(ARCHIVE_TABLE_SQL.format(schema="arch"))
+            conn.execute(ARCHIVE_INDEX_SQL.format(schema="arch"))
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS _retention_ids (id INTEGER PRIMARY KEY)")
+            conn.commit()
+
+            last_id = -1 << 63
+            while True:
+                if should_yield is not None:
+                    while should_yield():
+                        time.sleep(1.0)
+
+                # 1. copy the batch into the archive; main is only read
+                conn.execute("BEGIN")
+                conn.execute("DELETE FROM temp._retention_ids")
+                n = conn.execute("""
+                    INSERT INTO temp._retention_ids
+                    SELECT id FROM main.motion_sessions
+                    WHERE end_ts >= ? AND end_ts < ? AND id > ?
+                    ORDER BY id
+                    LIMIT ?
+                """, (m0, m1, last_id, batch_rows)).rowcount
+                if n <= 0:
+                    conn.rollback()
+                    break
+                last_id = conn.execute("SELECT MAX(id) FROM temp._retention_ids").fetchone()[0]
+                conn.execute(f"""
+                    INSERT OR IGNORE INTO arch.motion_sessions ({COLUMNS})
+                    SELECT {COLUMNS} FROM main.motion_sessions
+                    WHERE id IN (SELECT id FROM temp._retention_ids)
+                """)
+                conn.commit()
+
+                # 2. delete from main only what the archive now holds
+                conn.execute("BEGIN IMMEDIATE")
+                moved = conn.execute("""
+                    DELETE FROM main.motion_sessions
+                    WHERE id IN (SELECT id FROM temp._retention_ids)
+                      AND EXISTS (
+                          SELECT 1 FROM arch.motion_sessions a
+                          WHERE a.id = motion_sessions.id
+                            AND a.sim_id IS motion_sessions.sim_id
+                            AND a.start_ts IS motion_sessions.start_ts
+                            AND a.end_ts IS motion_sessions.end_ts
+                      )
+                """).rowcount
+                conn.commit()
+                result["moved"] += moved
+                if moved < n:
+                    result["kept"] += n - moved
+                    print(f"[Retention] {n - moved} rows not confirmed in {path.name}; kept in main")
+                if pause:
+                    time.sleep(pause)
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.execute("DETACH DATABASE arch")
+
+        result["months"].append(path.name)
+
+    if result["moved"]:
+        result["freed_pages"] = incremental_vacuum(conn, should_yield=should_yield)
+    return result
+
+
+def incremental_vacuum(conn=None, *, step_pages: int = VACUUM_STEP_PAGES, should_yield=None) -> int:
+    """Return free pages to the OS a few hundred at a time; returns pages freed."""
+    conn = conn or db.get_conn()
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return 0
+    if conn.in_transaction:
+        conn.commit()
+
+    freed = 0
+    while True:
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if free <= 0:
+            break
+        if should_yield is not None:
+            while should_yield():
+                time.sleep(1.0)
+        # executescript steps the pragma to completion; execute() frees a single page
+        conn.executescript(f"PRAGMA incremental_vacuum({min(free, step_pages)})")
+        freed += min(free, step_pages)
+    return freed
+
+
+def enable_incremental_vacuum(conn=None):
+    """One-off for DBs created before auto_vacuum was set: a full VACUUM (rewrites the file)."""
+    conn = conn or db.get_conn()
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("VACUUM")
+
+
+# -----------------------------
+# Reading across archives
+# -----------------------------
+def _detach_history(conn):
+    if conn.in_transaction:
+        conn.commit()                           # DETACH is refused inside a transaction
+    for name, in conn.execute("SELECT name FROM pragma_database_list WHERE name LIKE 'hist_%'").fetchall():
+        conn.execute(f"DETACH DATABASE {name}")
+
+
+def _copy_months(conn, paths: list, start_ts, end_ts) -> int:
+    """Copy the in-range rows of archive months into temp.motion_sessions_hist, MAX_ATTACHED files at a time."""
+    where, params = [], []
+    if start_ts is not None:
+        where.append("end_ts >= ?")
+        params.append(start_ts)
+    if end_ts is not None:
+        where.append("start_ts < ?")
+        params.append(end_ts)
+    cond = f" WHERE {' AND '.join(where)}" if where else ""
+
+    copied = 0
+    for i in range(0, len(paths), MAX_ATTACHED):
+        group = paths[i:i + MAX_ATTACHED]
+        for p in group:
+            conn.execute(f"ATTACH DATABASE ? AS hist_{p.stem[9:]}", (str(p),))
+        try:
+            for p in group:
+                copied += conn.execute(
+                    f"INSERT INTO temp.motion_sessions_hist ({COLUMNS}) "
+                    f"SELECT {COLUMNS} FROM hist_{p.stem[9:]}.motion_sessions{cond}", params
+                ).rowcount
+        finally:
+            _detach_history(conn)
+    return copied
+
+
+def attach_history(conn, start_ts: float | None = None, end_ts: float | None = None) -> str:
+    """
+    Attach the archive months overlapping [start_ts, end_ts) and (re)create
+    TEMP VIEW motion_sessions_all = main UNION ALL archives. Returns the view name.
+    Months beyond MAX_ATTACHED (the oldest) are read through a TEMP copy.
+    """
+    _detach_history(conn)
+
+    paths = []
+    for p in list_archives():
+        y, m = int(p.stem[9:13]), int(p.stem[14:16])
+        m0 = calendar.timegm((y, m, 1, 0, 0, 0))
+        if (end_ts is None or m0 < end_ts) and (start_ts is None or _next_month(m0) > start_ts):
+            paths.append(p)
+    copied, paths = paths[:-MAX_ATTACHED], paths[-MAX_ATTACHED:]
+
+    # the view and the copy live in the temp schema; query_only (read-only pool conns) would refuse even that
+    query_only = conn.execute("PRAGMA query_only").fetchone()[0]
+    conn.execute("PRAGMA query_only=OFF")
+    try:
+        conn.execute("DROP VIEW IF EXISTS temp.motion_sessions_all")
+        conn.execute("DROP TABLE IF EXISTS temp.motion_sessions_hist")
+        selects = [f"SELECT {COLUMNS} FROM main.motion_sessions"]
+        if copied:
+            conn.execute(f"CREATE TEMP TABLE motion_sessions_hist AS SELECT {COLUMNS} FROM main.motion_sessions WHERE 0")
+            n = _copy_months(conn, copied, start_ts, end_ts)
+            print(f"[Retention] {len(copied)} older archive months read via a temp copy ({n:,} rows)")
+            selects.append(f"SELECT {COLUMNS} FROM temp.motion_sessions_hist")
+
+        for p in paths:
+            schema = f"hist_{p.stem[9:]}"
+            conn.execute(f"ATTACH DATABASE ? AS {schema}", (str(p),))
+            selects.append(f"SELECT {COLUMNS} FROM {schema}.motion_sessions")
+
+        conn.execute("CREATE TEMP VIEW motion_sessions_all AS " + " UNION ALL ".join(selects))
+        if conn.in_transaction:
+            conn.commit()
+    finally:
+        conn.execute(f"PRAGMA query_only={query_only}")
+    return "motion_sessions_all"
+
+
+def main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Archive old motion_sessions rows into monthly files")
+    ap.add_argument("--days", type=float, default=RETENTION_DAYS, help="keep this many days in the hot DB")
+    ap.add_argument("--dry-run", action="store_true", help="only report what would move")
+    ap.add_argument("--enable-incremental-vacuum", action="store_true",
+                    help="one-off full VACUUM switching an older DB to auto_vacuum=INCREMENTAL")
+    ap.add_argument("--db", help="SQLite file (default sim_monitor.db)")
+    args = ap.parse_args(argv)
+
+    if args.db:
+        db.DB_PATH = pathlib.Path(args.db)
+    db.init_db()
+
+    if args.enable_incremental_vacuum:
+        t0 = time.perf_counter()
+        enable_incremental_vacuum()
+        print(f"[Retention] auto_vacuum=INCREMENTAL after full VACUUM ({time.perf_counter() - t0:.1f}s)")
+
+    t0 = time.perf_counter()
+    result = run_retention(days=args.days, dry_run=args.dry_run)
+    print(f"[Retention] {result} ({time.perf_counter() - t0:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+# utils/rollups.py
+"""
+Hourly / daily utilization rollups per simulator
+------------------------------------------------
+  usage_hourly(sim_id, bucket_start, motion_seconds, session_count)
+  usage_daily (sim_id, bucket_start, motion_seconds, session_count)
+
+  • WITHOUT ROWID, PK (sim_id, bucket_start): a month for one sim is a
+    ~30-row (daily) or ~720-row (hourly) range scan
+  • hour buckets are epoch hours; day buckets are local midnights (23/25 h
+    on DST change days)
+  • a session crossing bucket boundaries is split: each bucket gets the
+    seconds that fall inside it
+  • session_count counts a session in the bucket where it STARTED, so
+    counts add up exactly at any granularity
+
+Every code path that closes a motion session writes it with
+record_session(), which inserts the motion_sessions row and adds it to both
+rollups in the caller's transaction -- the ingest service (queued on the DB
+writer), the Qt serial reader and the debug panel. A trigger cannot do the
+bucket split (local-midnight days, no CTEs inside triggers). The bulk
+importer uses add_sessions(). rebuild() regenerates both tables from raw
+history, including retention archives, in one transaction (CLI / repair);
+the schema migration uses backfill(), which does the same in short chunk
+transactions so ingest keeps writing meanwhile.
+
+CLI (from sim_monitor/NEW):
+  python -m utils.rollups rebuild [--db FILE]
+  python -m utils.rollups report --sim 7 [--days 30] [--hourly] [--db FILE]
+"""
+
+import time, datetime, sqlite3, pathlib
+
+
+HOUR = 3600
+READ_CHUNK = 10000
+BACKFILL_PAUSE_SEC = 0.01      # let other writers in between backfill chunks
+
+_UPSERT = """
+    INSERT INTO {table} (sim_id, bucket_start, motion_seconds, session_count)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(sim_id, bucket_start) DO UPDATE SET
+        motion_seconds = motion_seconds + excluded.motion_seconds,
+        session_count = session_count + excluded.session_count
+"""
+
+
+def hour_start(ts: float) -> int:
+    return int(ts // HOUR) * HOUR
+
+
+def day_start(ts: float) -> int:
+    d = datetime.datetime.fromtimestamp(ts)
+    return int(datetime.datetime(d.year, d.month, d.day).timestamp())
+
+
+def next_hour(bucket: int) -> int:
+    return bucket + HOUR
+
+
+def next_day(bucket: int) -> int:
+    d = datetime.date.fromtimestamp(bucket) + datetime.timedelta(days=1)
+    return int(datetime.datetime(d.year, d.month, d.day).timestamp())
+
+
+GRANULARITIES = {
+    "hourly": ("usage_hourly", hour_start, next_hour),
+    "daily": ("usage_daily", day_start, next_day),
+}
+
+
+def split_session(start_ts: int, end_ts: int, floor, step) -> list:
+    """[(bucket_start, seconds, sessions_started)] for one session."""
+    out = []
+    bucket = floor(start_ts)
+    first = True
+    while True:
+        nxt = step(bucket)
+        seconds = min(end_ts, nxt) - max(start_ts, bucket)
+        out.append((bucket, max(0, seconds), 1 if first else 0))
+        if end_ts <= nxt:
+            break
+        bucket = nxt
+        first = False
+    return out
+
+
+def add_session(cur, sim_id: int, start_ts: int, end_ts: int):
+    """DBWriter op: add one closed session to both rollup tables."""
+    if start_ts is None or end_ts is None or end_ts < start_ts:
+        return
+    for table, floor, step in GRANULARITIES.values():
+        cur.executemany(_UPSERT.format(table=table),
+                        [(sim_id, b, sec, n) for b, sec, n in split_session(start_ts, end_ts, floor, step)])
+
+
+def record_session(cur, sim_id: int, start_ts: int, end_ts: int):
+    """Insert one closed motion session and add it to the rollups (same transaction)."""
+    cur.execute("""
+        INSERT INTO motion_sessions (sim_id, start_ts, end_ts, duration_sec)
+        VALUES (?, ?, ?, ?)
+    """, (sim_id, start_ts, end_ts, max(0, end_ts - start_ts)))
+    add_session(cur, sim_id, start_ts, end_ts)
+
+
+def add_sessions(cur, sessions):
+    """Bulk form of add_session() for (sim_id, start_ts, end_ts) rows: totals per bucket, one upsert each."""
+    acc = {name: {} for name in GRANULARITIES}
+    _accumulate(acc, ((None, sim_id, s, e) for sim_id, s, e in sessions), None)
+    for name, (table, _, _) in GRANULARITIES.items():
+        cur.executemany(_UPSERT.format(table=table),
+                        [(sim_id, b, sec, n) for (sim_id, b), (sec, n) in sorted(acc[name].items())])
+
+
+# -----------------------------
+# Rebuild from raw history
+# -----------------------------
+def _accumulate(acc: dict, rows, seen: set | None):
+    for row_id, sim_id, start_ts, end_ts in rows:
+        if seen is not None:
+            if row_id in seen:
+                continue                # interrupted retention run: row in main + archive
+            seen.add(row_id)
+        if start_ts is None or end_ts is None or end_ts < start_ts:
+            continue
+        for name, (_, floor, step) in GRANULARITIES.items():
+            bucket_acc = acc[name]
+            for b, sec, n in split_session(start_ts, end_ts, floor, step):
+                key = (sim_id, b)
+                prev = bucket_acc.get(key)
+                bucket_acc[key] = (prev[0] + sec, prev[1] + n) if prev else (sec, n)
+
+
+def _read_sessions(conn, acc: dict, seen: set | None = None):
+    cur = conn.execute("SELECT id, sim_id, start_ts, end_ts FROM motion_sessions")
+    while True:
+        rows = cur.fetchmany(READ_CHUNK)
+        if not rows:
+            break
+        _accumulate(acc, rows, seen)
+
+
+def rebuild(conn, *, include_archives: bool = True) -> dict:
+    """
+    Replace both rollup tables with totals recomputed from motion_sessions
+    (+ archive files). Runs in the caller's transaction if one is open.
+    Returns {table: rows written}.
+    """
+    acc = {name: {} for name in GRANULARITIES}
+    archives = []
+    if include_archives:
+        from utils import retention
+        archives = retention.list_archives()
+
+    seen = set() if archives else None
+    _read_sessions(conn, acc, seen)
+    for path in archives:
+        arch = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            _read_sessions(arch, acc, seen)
+        finally:
+            arch.close()
+
+    own_txn = not conn.in_transaction
+    if own_txn:
+        conn.execute("BEGIN IMMEDIATE")
+    try:
+        written = {}
+        for name, (table, _, _) in GRANULARITIES.items():
+            conn.execute(f"DELETE FROM {table}")
+            conn.executemany(
+                f"INSERT INTO {table} (sim_id, bucket_start, motion_seconds, session_count) VALUES (?, ?, ?, ?)",
+                [(sim_id, b, sec, n) for (sim_id, b), (sec, n) in sorted(acc[name].items())]
+            )
+            written[table] = len(acc[name])
+        if own_txn:
+            conn.commit()
+    except Exception:
+        if own_txn:
+            conn.rollback()
+        raise
+    return written
+
+
+def backfill(conn, *, include_archives: bool = True, chunk_rows: int = READ_CHUNK,
+             pause: float = BACKFILL_PAUSE_SEC, on_chunk=None) -> int:
+    """
+    rebuild() without one long write transaction. Call inside a write
+    transaction: both tables are emptied and the high-water id fixed there,
+    and that is committed -- sessions above it reach the rollups live through
+    record_session(). Everything up to it (main, then archive months) is
+    added in chunk_rows id ranges, each its own short transaction;
+    on_chunk() runs inside each one (migration heartbeat). Returns with no
+    transaction open; returns the sessions added.
+    """
+    for table, _, _ in GRANULARITIES.values():
+        conn.execute(f"DELETE FROM {table}")
+    high = conn.execute("SELECT COALESCE(MAX(id), 0) FROM motion_sessions").fetchone()[0]
+    conn.commit()
+
+    def add_chunk(rows):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            add_sessions(conn, [(sim_id, s, e) for _, sim_id, s, e in rows])
+            if on_chunk is not None:
+                on_chunk()
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        if pause:
+            time.sleep(pause)
+
+    added = 0
+    last = -1 << 63
+    while True:
+        rows = conn.execute(
+            "SELECT id, sim_id, start_ts, end_ts FROM motion_sessions WHERE id > ? AND id <= ? ORDER BY id LIMIT ?",
+            (last, high, chunk_rows)
+        ).fetchall()
+        if not rows:
+            break
+        add_chunk(rows)
+        added += len(rows)
+        last = rows[-1][0]
+
+    if include_archives:
+        from utils import retention
+        for path in retention.list_archives():
+            arch = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+            try:
+                cur = arch.execute("SELECT id, sim_id, start_ts, end_ts FROM motion_sessions ORDER BY id")
+                while True:
+                    rows = cur.fetchmany(chunk_rows)
+                    if not rows:
+                        break
+                    # interrupted retention run: row still in main too, already counted there
+                    in_main = {r[0] for r in conn.execute(
+                        "SELECT id FROM motion_sessions WHERE id BETWEEN ? AND ?", (rows[0][0], rows[-1][0])
+                    )}
+                    rows = [r for r in rows if r[0] not in in_main]
+                    if rows:
+                        add_chunk(rows)
+                        added += len(rows)
+            finally:
+                arch.close()
+    return added
+
+
+# -----------------------------
+# Queries
+# -----------------------------
+def usage(conn, sim_id: int, start_ts: float, end_ts: float, *, granularity: str = "daily") -> list:
+    """[(bucket_start, motion_seconds, session_count)] for buckets starting in [start_ts, end_ts)."""
+    table = GRANULARITIES[granularity][0]
+    return conn.execute(f"""
+        SELECT bucket_start, motion_seconds, session_count FROM {table}
+        WHERE sim_id = ? AND bucket_start >= ? AND bucket_start < ?
+        ORDER BY bucket_start
+    """, (sim_id, int(start_ts), int(end_ts))).fetchall()
+
+
+def main(argv=None):
+    import argparse
+    from utils import db
+
+    ap = argparse.ArgumentParser(description="Hourly/daily motion rollups")
+    ap.add_argument("--db", help="SQLite file (default sim_monitor.db)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    rb = sub.add_parser("rebuild", help="regenerate rollups from raw history (incl. archives)")
+    rb.add_argument("--no-archives", action="store_true")
+    rp = sub.add_parser("report", help="print one sim's usage")
+    rp.add_argument("--sim", type=int, required=True)
+    rp.add_argument("--days", type=float, default=30)
+    rp.add_argument("--hourly", action="store_true")
+    args = ap.parse_args(argv)
+
+    if args.db:
+        db.DB_PATH = pathlib.Path(args.db)
+    db.init_db()
+
+    if args.cmd == "rebuild":
+        t0 = time.perf_counter()
+        written = rebuild(db.get_conn(), include_archives=not args.no_archives)
+        print(f"[Rollups] Rebuilt {written} in {time.perf_counter() - t0:.2f}s")
+        return
+
+    now = time.time()
+    gran = "hourly" if args.hourly else "daily"
+    rows = usage(db.get_conn(readonly=True), args.sim, now - args.days * 86400, now, granularity=gran)
+    total = sum(r[1] for r in rows)
+    fmt = "%Y-%m-%d %H:00" if args.hourly else "%Y-%m-%d"
+    for bucket, seconds, count in rows:
+        print(f"{time.strftime(fmt, time.localtime(bucket))}  {seconds / 3600:7.2f} h  {count:4d} sessions")
+    print(f"SIM {args.sim}: {total / 3600:.2f} h in motion over {args.days:g} days ({gran})")
+
+
+if __name__ == "__main__":
+    main()
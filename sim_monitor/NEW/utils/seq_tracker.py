@@ -0,0 +1,171 @@
+# utils/seq_tracker.py
+"""
+Per-sender sequence tracking for S frames
+-----------------------------------------
+Every S,<sid>,<motion>,<ramp>,<seq> frame carries a 16-bit seq. For each
+sender we keep the newest seq plus a 64-frame "seen" bitmap behind it:
+
+  newer (1..32767 ahead, mod 2^16)   -> ACCEPT   (gap > 1 => lost frames)
+  same / already seen in the window  -> DUPLICATE (e.g. relayed twice)
+  behind but never seen              -> REORDERED (late; stale state, dropped)
+  further behind than the window     -> ACCEPT as a sender restart
+  RESTART_RUN consecutive seqs that
+  all land behind the window          -> ACCEPT as a sender restart (reboot
+                                         with a small counter)
+
+Reboots: the firmware starts seq_counter at 0 on boot. A small seq
+(< RESTART_SEQ_MAX) that is not a normal step forward is a restart, not
+loss or reorder, when either
+  • it jumps more than FORWARD_SLACK ahead (last_seq >= 32768: 0 would
+    otherwise look ~25k frames "ahead"), or
+  • it lands behind last_seq after RESTART_SILENCE_SEC of silence from
+    that sender (a late reorder arrives within milliseconds; a reboot
+    takes seconds) -- so the first post-boot frames are never dropped
+
+Only ACCEPT frames should reach the DB.
+
+Counters are kept per sender for the current stats window and for the
+lifetime of the process; take_window() hands back the window rows for the
+link_stats table and starts a new window.
+"""
+
+import time
+
+
+ACCEPT = 0
+DUPLICATE = 1
+REORDERED = 2
+
+SEQ_HALF = 0x8000
+WINDOW = 64
+RESTART_RUN = 3
+RESTART_SEQ_MAX = 32            # seqs a freshly booted sender can be at
+FORWARD_SLACK = 1024            # larger forward jumps onto a fresh seq => reboot
+RESTART_SILENCE_SEC = 1.0       # quiet this long + fresh seq behind => reboot
+_WINDOW_MASK = (1 << WINDOW) - 1
+
+
+class LinkStats:
+    __slots__ = ("last_seq", "last_ts", "seen", "stale_seq", "stale_run", "received", "lost", "duplicates", "reordered", "gaps", "restarts",
+                 "total_received", "total_lost", "total_duplicates", "total_reordered", "total_gaps")
+
+    def __init__(self):
+        self.last_seq = None
+        self.last_ts = None             # when any frame was last heard from the sender
+        self.seen = 0                   # bit i => (last_seq - i) seen
+        self.stale_seq = None           # last rejected seq (restart detection)
+        self.stale_run = 0
+        self.received = self.lost = self.duplicates = self.reordered = self.gaps = self.restarts = 0
+        self.total_received = self.total_lost = self.total_duplicates = 0
+        self.total_reordered = self.total_gaps = 0
+
+
+class SeqTracker:
+    def __init__(self):
+        self.links = {}                 # sim_id -> LinkStats
+
+    def check(self, sim_id: int, seq: int, now: float | None = None) -> int:
+        link = self.links.get(sim_id)
+        if link is None:
+            link = self.links[sim_id] = LinkStats()
+
+        now = time.time() if now is None else now
+        seq &= 0xFFFF
+        last = link.last_seq
+        silent = link.last_ts is None or now - link.last_ts >= RESTART_SILENCE_SEC
+        link.last_ts = now
+
+        if last is None:
+            link.last_seq = seq
+            link.seen = 1
+            return self._accept(link)
+
+        ahead = (seq - last) & 0xFFFF
+
+        if seq < RESTART_SEQ_MAX and ahead and (
+                FORWARD_SLACK < ahead < SEQ_HALF or (ahead >= SEQ_HALF and silent)):
+            return self._restart(link, seq)
+
+        if 0 < ahead < SEQ_HALF:
+            if ahead > 1:
+                link.gaps += 1
+                link.total_gaps += 1
+                link.lost += ahead - 1
+                link.total_lost += ahead - 1
+            link.seen = ((link.seen << ahead) | 1) & _WINDOW_MASK if ahead < WINDOW else 1
+            link.last_seq = seq
+            return self._accept(link)
+
+        behind = (last - seq) & 0xFFFF
+        if behind < WINDOW and not self._restarting(link, seq):
+            bit = 1 << behind
+            if link.seen & bit:
+                link.duplicates += 1
+                link.total_duplicates += 1
+                return DUPLICATE
+            # late arrival of a frame we already counted as lost
+            link.seen |= bit
+            link.reordered += 1
+            link.total_reordered += 1
+            if link.lost:
+                link.lost -= 1
+            if link.total_lost:
+                link.total_lost -= 1
+            return REORDERED
+
+        # far behind => sender rebooted and restarted its counter
+        return self._restart(link, seq)
+
+    def _restart(self, link: LinkStats, seq: int) -> int:
+        link.restarts += 1
+        link.last_seq = seq
+        link.seen = 1
+        return self._accept(link)
+
+    @staticmethod
+    def _restarting(link: LinkStats, seq: int) -> bool:
+        """A rebooted sender counts up again from 0: a run of consecutive stale seqs."""
+        if link.stale_seq is not None and seq == ((link.stale_seq + 1) & 0xFFFF):
+            link.stale_run += 1
+        elif seq != link.stale_seq:
+            link.stale_run = 1
+        link.stale_seq = seq
+        return link.stale_run >= RESTART_RUN
+
+    @staticmethod
+    def _accept(link: LinkStats) -> int:
+        link.stale_seq = None
+        link.stale_run = 0
+        link.received += 1
+        link.total_received += 1
+        return ACCEPT
+
+    # ------------------------------------------------------------------
+    # Persistence / stats
+    # ------------------------------------------------------------------
+    def take_window(self) -> list:
+        """
+        Rows (sim_id, received, lost, duplicates, reordered, gaps, restarts)
+        for senders active in the window; window counters are reset.
+        """
+        rows = []
+        for sim_id, link in self.links.items():
+            if not (link.received or link.duplicates or link.reordered):
+                continue
+            rows.append((sim_id, link.received, link.lost, link.duplicates,
+                         link.reordered, link.gaps, link.restarts))
+            link.received = link.lost = link.duplicates = link.reordered = link.gaps = link.restarts = 0
+        return rows
+
+    def stats(self) -> dict:
+        received = sum(l.total_received for l in self.links.values())
+        lost = sum(l.total_lost for l in self.links.values())
+        return {
+            "senders": len(self.links),
+            "received": received,
+            "lost": lost,
+            "duplicates": sum(l.total_duplicates for l in self.links.values()),
+            "reordered": sum(l.total_reordered for l in self.links.values()),
+            "gaps": sum(l.total_gaps for l in self.links.values()),
+            "loss_pct": round(100.0 * lost / (received + lost), 2) if (received + lost) else 0.0,
+        }
@@ -2,7 +2,7 @@
 """
 DB-backed Serial Monitor for the Sim-Monitor GUI (Option A)
 -----------------------------------------------------------
-Your GUI updates ONLY from SQLite via MainWindow.refresh_from_db().
+Your GUI updates ONLY from SQLite (utils.db_poller -> MainWindow.apply_snapshot()).
 Therefore this module must write parsed serial frames into the DB.
 
 Frames from ESP32 receiver (CSV):
@@ -19,14 +19,17 @@ Sender Online Logic:
 • Sender OFFLINE on O=0 or inactivity > SENDER_TIMEOUT seconds
 """
 
-import logging, threading, time, re
+import logging, threading, time
 
 try:
     import serial, serial.tools.list_ports
 except ImportError:
     serial = None
 
-from utils.db import get_conn  # MUST match the same DB your GUI reads
+from utils.db import get_conn, close_thread_conns  # MUST match the same DB your GUI reads
+from utils.protocol import decode_frame, Reject, OnlineFrame, StateFrame
+from utils.deadline_heap import DeadlineHeap
+from utils.rollups import record_session
 
 
 # ===============================================================
@@ -75,14 +78,6 @@ logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 
 
-# ===============================================================
-#   CSV FRAME REGEX
-# ===============================================================
-receiver_regex = re.compile(r"^R,1$")
-online_regex   = re.compile(r"^O,(\d+),(0|1)$")
-state_regex    = re.compile(r"^S,(\d+),(\d+),(\d+),(\d+)$")
-
-
 # ===============================================================
 #   PUBLIC API used by main_qt
 # ===============================================================
@@ -123,6 +118,13 @@ def _db_set_sim_online(conn, sim_id: int, online: bool):
     """, (1 if online else 0, int(time.time()), sim_id))
     conn.commit()
 
+def _db_set_sims_offline(conn, sim_ids: list):
+    marks = ",".join("?" * len(sim_ids))
+    cur = conn.cursor()
+    cur.execute(f"UPDATE simulators SET online=0, last_update_ts=? WHERE sim_id IN ({marks})",
+                (int(time.time()), *sim_ids))
+    conn.commit()
+
 def _db_update_sim_state(conn, sim_id: int, motion: int, ramp: int):
     """
     Update simulators + manage active_motion / motion_sessions.
@@ -151,15 +153,8 @@ def _db_update_sim_state(conn, sim_id: int, motion: int, ramp: int):
         cur.execute("INSERT OR REPLACE INTO active_motion (sim_id, start_ts) VALUES (?, ?)", (sim_id, now_ts))
 
     if (not in_motion) and active:
-        start_ts = int(active[0])
-        end_ts = now_ts
-        dur = max(0, end_ts - start_ts)
-
         cur.execute("DELETE FROM active_motion WHERE sim_id=?", (sim_id,))
-        cur.execute("""
-            INSERT INTO motion_sessions (sim_id, start_ts, end_ts, duration_sec)
-            VALUES (?, ?, ?, ?)
-        """, (sim_id, start_ts, end_ts, dur))
+        record_session(cur, sim_id, int(active[0]), now_ts)
 
     conn.commit()
 
@@ -230,7 +225,7 @@ def start_serial_thread(sim_cards: dict, *, update_sim_fn=None, mark_offline_fn=
         ser = None
         conn = None
 
-        last_seen_sender = {}   # sid -> time.time()
+        sender_deadlines = DeadlineHeap()   # sid -> time.time() + SENDER_TIMEOUT
         last_seen_receiver = 0.0
         receiver_online = False
 
@@ -257,60 +252,55 @@ def start_serial_thread(sim_cards: dict, *, update_sim_fn=None, mark_offline_fn=
                 pass
 
             while _RUN_FLAG:
-                raw = ser.readline().decode(errors="replace").strip()
+                raw = ser.readline()
                 now = time.time()
 
                 # Receiver timeout
                 if receiver_online and last_seen_receiver and (now - last_seen_receiver > RECEIVER_TIMEOUT):
                     set_receiver(False)
 
-                # Sender inactivity timeout
-                for sid, last in list(last_seen_sender.items()):
-                    if last and (now - last > SENDER_TIMEOUT):
-                        try:
-                            _db_set_sim_online(conn, int(sid), False)
-                        except Exception as e:
-                            logger.error(f"DB sender offline update failed sid={sid}: {e}")
+                # Sender inactivity timeout (only senders that actually expired)
+                expired = sender_deadlines.pop_expired(now)
+                if expired:
+                    try:
+                        _db_set_sims_offline(conn, expired)
+                    except Exception as e:
+                        logger.error(f"DB sender offline update failed sids={expired}: {e}")
 
                 if not raw:
                     continue
 
-                mR = receiver_regex.match(raw)
-                mO = online_regex.match(raw)
-                mS = state_regex.match(raw)
-
-                if not (mR or mO or mS):
+                # CSV frame decode (utils.protocol); "0,..." O-frames were never valid here
+                frame = decode_frame(raw, zero_online=False)
+                if isinstance(frame, Reject):
                     continue
 
                 # Any valid frame => receiver online
                 last_seen_receiver = now
                 set_receiver(True)
 
-                if mR:
-                    continue
-
-                if mO:
-                    sid = int(mO.group(1))
-                    online = int(mO.group(2))
+                if isinstance(frame, OnlineFrame):
+                    sid = frame.sid
 
                     if serial_debug.disconnect_flags.get(sid, False):
                         continue
 
-                    last_seen_sender[sid] = now
-                    _db_set_sim_online(conn, sid, bool(online))
+                    if frame.online:
+                        sender_deadlines.arm(sid, now + SENDER_TIMEOUT)
+                    else:
+                        sender_deadlines.disarm(sid)
+                    _db_set_sim_online(conn, sid, frame.online)
                     continue
 
-                if mS:
-                    sid = int(mS.group(1))
-                    motion = int(mS.group(2))
-                    ramp = int(mS.group(3))
-                    # seq = int(mS.group(4))
+                if isinstance(frame, StateFrame):
+                    sid = frame.sid
+                    # seq = frame.seq
 
                     if serial_debug.disconnect_flags.get(sid, False):
                         continue
 
-                    last_seen_sender[sid] = now
-                    _db_update_sim_state(conn, sid, motion, ramp)
+                    sender_deadlines.arm(sid, now + SENDER_TIMEOUT)
+                    _db_update_sim_state(conn, sid, frame.motion, frame.ramp)
                     continue
 
         except Exception as exc:
@@ -332,7 +322,7 @@ def start_serial_thread(sim_cards: dict, *, update_sim_fn=None, mark_offline_fn=
             if conn:
                 try:
                     _db_set_receiver_online(conn, False)
-                    conn.close()
+                    close_thread_conns()
                 except Exception:
                     pass
 
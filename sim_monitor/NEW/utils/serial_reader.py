@@ -0,0 +1,130 @@
+# utils/serial_reader.py
+"""
+Serial line readers for the receiver stream
+-------------------------------------------
+Both readers expose the same two calls so the service loop does not care
+which one is in use:
+
+  n = reader.poll(timeout)     # wait up to timeout, pull bytes; returns bytes read
+  for line in reader.frames(): # complete lines (no newline), partials kept
+      ...
+
+BulkLineReader (default)
+  • select() on the port fd, then os.readv() whatever the OS has buffered into
+    ONE reusable chunk bytearray (no per-line syscalls)
+  • appends to a rolling bytearray and splits on b"\\n" with find(); each
+    line is one bytes() copy out of a memoryview, and the consumed prefix is
+    dropped once per poll, not once per line
+  • partial lines stay buffered across polls
+  • falls back to in_waiting/read() where the port has no usable fileno()
+
+ReadlineReader
+  • the previous ser.readline() behaviour (one line per poll, port timeout)
+
+poll() returns quickly (timeout is short), so callers drive their timers
+from time.monotonic() instead of from read timeouts.
+"""
+
+import os, select
+
+
+READ_CHUNK = 4096
+MAX_LINE = 512          # partial lines longer than this are garbage; dropped
+
+
+class BulkLineReader:
+    def __init__(self, ser, *, chunk_size: int = READ_CHUNK, max_line: int = MAX_LINE):
+        self.ser = ser
+        self.max_line = max_line
+        self.buf = bytearray()
+        self._chunk = bytearray(chunk_size)
+        self._chunk_view = memoryview(self._chunk)
+
+        self.bytes_in = 0
+        self.reads = 0
+        self.dropped_partials = 0
+
+        try:
+            self._fd = ser.fileno()
+        except Exception:
+            self._fd = None
+        if self._fd is not None and not hasattr(os, "readv"):
+            self._fd = None
+
+    def poll(self, timeout: float) -> int:
+        if self._fd is not None:
+            ready, _, _ = select.select([self._fd], [], [], timeout)
+            if not ready:
+                return 0
+            n = os.readv(self._fd, [self._chunk])
+            if n == 0:
+                # readable but no data => device went away (USB unplug)
+                raise OSError("serial device disconnected")
+            self.buf += self._chunk_view[:n]
+        else:
+            self.ser.timeout = timeout
+            data = self.ser.read(max(1, self.ser.in_waiting))
+            n = len(data)
+            if not n:
+                return 0
+            self.buf += data
+
+        self.bytes_in += n
+        self.reads += 1
+        return n
+
+    def frames(self):
+        buf = self.buf
+        start = 0
+        find = buf.find
+        # slicing the view copies nothing; bytes() is the only copy per line
+        view = memoryview(buf)
+        try:
+            while True:
+                nl = find(b"\n", start)
+                if nl < 0:
+                    break
+                line_start, start = start, nl + 1
+                if nl > line_start:
+                    yield bytes(view[line_start:nl])
+        finally:
+            view.release()          # a bytearray with a live export cannot be resized
+            if start:
+                del buf[:start]
+            if len(buf) > self.max_line:
+                buf.clear()
+                self.dropped_partials += 1
+
+    def stats(self) -> dict:
+        return {
+            "bytes_in": self.bytes_in,
+            "reads": self.reads,
+            "avg_read": round(self.bytes_in / self.reads, 1) if self.reads else 0.0,
+            "dropped_partials": self.dropped_partials,
+        }
+
+
+class ReadlineReader:
+    """Legacy mode: one ser.readline() per poll (port timeout applies)."""
+
+    def __init__(self, ser):
+        self.ser = ser
+        self._line = b""
+        self.bytes_in = 0
+        self.reads = 0
+
+    def poll(self, timeout: float) -> int:
+        self._line = self.ser.readline()
+        n = len(self._line)
+        if n:
+            self.bytes_in += n
+            self.reads += 1
+        return n
+
+    def frames(self):
+        line, self._line = self._line, b""
+        if line.strip():
+            yield line
+
+    def stats(self) -> dict:
+        return {"bytes_in": self.bytes_in, "reads": self.reads}
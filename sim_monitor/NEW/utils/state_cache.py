@@ -0,0 +1,199 @@
+# utils/state_cache.py
+"""
+In-memory state cache for the Sim Monitor service
+-------------------------------------------------
+Authoritative copy of receiver + simulator state, warmed from SQLite at
+startup. The service asks the cache before every DB write; the cache answers
+whether the write is needed:
+
+  • Real transitions (online flip, motion/ramp change, motion start/stop)
+    are always written.
+  • Unchanged frames only refresh last_seen / last_update_ts once every
+    LAST_SEEN_REFRESH_SEC.
+  • Everything else is suppressed.
+
+Receivers are tracked per serial port; the aggregate system_status flag is
+"any port online".
+
+Sender timeouts run off a DeadlineHeap (utils.deadline_heap) armed on every
+frame, so expire_senders() only touches senders that actually expired.
+
+Counters (written / suppressed) are exposed via stats(). Each input is
+counted once, by the decision that owns it: sender_online (O frame),
+sender_state (S frame), receiver_port (receiver activity). motion_edge and
+receiver (the "any port" aggregate) are derived from those same inputs and
+do not count again; expire_senders counts its offline writes.
+"""
+
+
+from utils.deadline_heap import DeadlineHeap
+
+
+LAST_SEEN_REFRESH_SEC = 15.0   # must stay well below the sender/receiver timeouts
+SENDER_TIMEOUT = 180.0
+
+
+class SimState:
+    __slots__ = ("motion", "ramp", "online", "last_update_ts", "last_written_ts", "motion_start_ts")
+
+    def __init__(self, motion=None, ramp=None, online=False, last_update_ts=0, motion_start_ts=None):
+        self.motion = motion
+        self.ramp = ramp
+        self.online = online
+        self.last_update_ts = last_update_ts        # last frame seen (in memory)
+        self.last_written_ts = last_update_ts       # last_update_ts as stored in DB
+        self.motion_start_ts = motion_start_ts      # mirrors active_motion
+
+
+class StateCache:
+    def __init__(self, *, last_seen_refresh: float = LAST_SEEN_REFRESH_SEC, sender_timeout: float = SENDER_TIMEOUT):
+        self.last_seen_refresh = last_seen_refresh
+        self.sender_timeout = sender_timeout
+        self.deadlines = DeadlineHeap()             # sim_id -> offline deadline (online sims only)
+
+        self.receiver_online = None
+        self.receiver_last_written = 0
+        self.ports = {}                             # port -> [online, last_written_ts]
+        self.sims = {}                              # sim_id -> SimState
+
+        self.written = 0
+        self.suppressed = 0
+
+    # ------------------------------------------------------------------
+    # Warm-up
+    # ------------------------------------------------------------------
+    def warm(self, conn):
+        """Load current DB state so the first frames after a restart are diffed correctly."""
+        cur = conn.cursor()
+
+        cur.execute("SELECT receiver_online, last_seen FROM system_status WHERE id=1")
+        row = cur.fetchone()
+        if row:
+            self.receiver_online = bool(row[0])
+            self.receiver_last_written = int(row[1] or 0)
+
+        cur.execute("SELECT port, online, last_seen FROM receivers")
+        for port, online, last_seen in cur.fetchall():
+            self.ports[port] = [bool(online), int(last_seen or 0)]
+
+        cur.execute("SELECT sim_id, motion_state, ramp_state, online, last_update_ts FROM simulators")
+        for sim_id, motion, ramp, online, last_ts in cur.fetchall():
+            self.sims[sim_id] = SimState(motion, ramp, bool(online), int(last_ts or 0))
+            if online and last_ts:
+                self.deadlines.arm(sim_id, int(last_ts) + self.sender_timeout)
+
+        cur.execute("SELECT sim_id, start_ts FROM active_motion")
+        for sim_id, start_ts in cur.fetchall():
+            self._sim(sim_id).motion_start_ts = start_ts
+
+    def _sim(self, sim_id: int) -> SimState:
+        st = self.sims.get(sim_id)
+        if st is None:
+            st = self.sims[sim_id] = SimState()
+        return st
+
+    def _count(self, write: bool) -> bool:
+        if write:
+            self.written += 1
+        else:
+            self.suppressed += 1
+        return write
+
+    # ------------------------------------------------------------------
+    # Decisions (True => emit the DB write)
+    # ------------------------------------------------------------------
+    def receiver(self, online: bool, ts: int) -> bool:
+        # aggregate of the receiver_port decisions: not counted on its own
+        changed = self.receiver_online != online
+        due = (ts - self.receiver_last_written) >= self.last_seen_refresh
+        self.receiver_online = online
+        if changed or due:
+            self.receiver_last_written = ts
+            return True
+        return False
+
+    def receiver_port(self, port: str, online: bool, ts: int) -> bool:
+        entry = self.ports.get(port)
+        if entry is None:
+            entry = self.ports[port] = [None, 0]
+        changed = entry[0] != online
+        due = (ts - entry[1]) >= self.last_seen_refresh
+        entry[0] = online
+        if changed or due:
+            entry[1] = ts
+            return self._count(True)
+        return self._count(False)
+
+    def any_receiver_online(self) -> bool:
+        return any(online for online, _ in self.ports.values())
+
+    def sender_online(self, sim_id: int, online: bool, ts: int) -> bool:
+        st = self._sim(sim_id)
+        changed = st.online != online
+        due = (ts - st.last_written_ts) >= self.last_seen_refresh
+        st.online = online
+        st.last_update_ts = ts
+        if online:
+            self.deadlines.arm(sim_id, ts + self.sender_timeout)
+        else:
+            self.deadlines.disarm(sim_id)
+        if changed or due:
+            st.last_written_ts = ts
+            return self._count(True)
+        return self._count(False)
+
+    def sender_state(self, sim_id: int, motion: int, ramp: int, ts: int) -> bool:
+        st = self._sim(sim_id)
+        changed = (st.motion != motion) or (st.ramp != ramp) or not st.online
+        due = (ts - st.last_written_ts) >= self.last_seen_refresh
+        st.motion = motion
+        st.ramp = ramp
+        st.online = True
+        st.last_update_ts = ts
+        self.deadlines.arm(sim_id, ts + self.sender_timeout)
+        if changed or due:
+            st.last_written_ts = ts
+            return self._count(True)
+        return self._count(False)
+
+    def motion_edge(self, sim_id: int, motion_state: int, ts: int):
+        """
+        Returns ("start", ts) when a motion session opens,
+                ("stop", start_ts) when it closes,
+                None otherwise.
+        Motion sessions run while motion_state == 2. The S frame was already
+        counted by sender_state, so edges are not counted here.
+        """
+        st = self._sim(sim_id)
+        if motion_state == 2 and st.motion_start_ts is None:
+            st.motion_start_ts = ts
+            return ("start", ts)
+        if motion_state != 2 and st.motion_start_ts is not None:
+            start = st.motion_start_ts
+            st.motion_start_ts = None
+            return ("stop", start)
+        return None
+
+    def expire_senders(self, now: int) -> list:
+        """Flip senders silent for longer than sender_timeout to offline; returns flipped sim_ids."""
+        expired = []
+        for sim_id in self.deadlines.pop_expired(now):
+            st = self.sims[sim_id]
+            if st.online:
+                st.online = False
+                expired.append(sim_id)
+        self.written += len(expired)
+        return expired
+
+    # ------------------------------------------------------------------
+    # Stats
+    # ------------------------------------------------------------------
+    def stats(self) -> dict:
+        total = self.written + self.suppressed
+        return {
+            "ports": len(self.ports),
+            "sims": len(self.sims),
+            "written": self.written,
+            "suppressed": self.suppressed,
+            "suppressed_pct": round(100.0 * self.suppressed / total, 1) if total else 0.0,
+        }